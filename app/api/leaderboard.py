@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.leaderboard import METRICS, PERIODS, wallet_leaderboards
+from app.utils.logger import logger
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+
+@router.get("/{period}")
+async def get_wallet_leaderboard(
+        period: str,
+        metric: str = Query(default="pnl", description="pnl (realized) or volume (MON)"),
+        limit: int = Query(default=100, ge=1, le=500)
+):
+    """
+    Get top wallets over a time window
+
+    Served from in-memory rankings maintained during ingestion - no
+    database access per request.
+
+    Path Parameters:
+        - period: 1d, 7d or 30d
+
+    Query Parameters:
+        - metric: pnl (realized PnL) or volume (MON volume), default pnl
+        - limit: Number of results (1-500, default 100)
+
+    Returns:
+        Ranked wallets with their PnL or volume in MON
+    """
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"Invalid period: {period}. Must be one of {list(PERIODS)}")
+
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {metric}. Must be one of {list(METRICS)}")
+
+    try:
+        return wallet_leaderboards.top(period, metric, limit)
+
+    except Exception as e:
+        logger.error("leaderboard_api", "Failed to get wallet leaderboard", error=e, context={
+            "period": period,
+            "metric": metric
+        })
+        raise HTTPException(status_code=500, detail="Internal server error")
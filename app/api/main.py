@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from sqlalchemy.orm import Session
+from typing import Any, Callable
+
+from app.api import leaderboard, positions, wallets, webhook
+from app.api.rpc_async import async_rpc
+from app.config.config import config
+from app.db.database import SessionLocal
+from app.services.ingest_pause import sync_ingest_pause
+from app.services.ingest_queue import run_ingest_consumer
+from app.services.kv_sync import flush_wallet_list, reconcile_wallet_list, wallet_list_sync
+from app.services.leaderboard import warm_leaderboards
+from app.services.position_cache import flush_position_cache
+from app.services.pools import warm_pool_registry
+from app.services.prices import mark_positions_to_market
+from app.services.reorg import prune_position_deltas, warm_chain_tracker
+from app.services.tokens import warm_token_registry
+from app.services.wallets import warm_wallet_index
+from app.utils.logger import logger
+
+
+def _run_with_session(task: Callable[[Session], Any]) -> Any:
+    """Run a blocking DB task with its own session"""
+    db = SessionLocal()
+    try:
+        return task(db)
+    finally:
+        db.close()
+
+
+async def run_periodically(interval: float, task: Callable[[Session], Any]) -> None:
+    """Run a blocking DB task off the event loop every `interval` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_run_with_session, task)
+        except Exception as e:
+            logger.error("main", f"Periodic task {task.__name__} failed", error=e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    logger.info("main", "Starting nadsscan API")
+
+    _run_with_session(warm_pool_registry)
+    _run_with_session(warm_token_registry)
+    _run_with_session(warm_wallet_index)
+    _run_with_session(warm_chain_tracker)
+    _run_with_session(warm_leaderboards)
+
+    tasks = [
+        asyncio.create_task(async_rpc.run_health_probes(config.RPC_PROBE_INTERVAL)),
+        asyncio.create_task(run_periodically(config.REORG_PRUNE_INTERVAL, prune_position_deltas)),
+        asyncio.create_task(run_periodically(config.PRICE_MARK_INTERVAL, mark_positions_to_market)),
+        asyncio.create_task(run_periodically(config.KV_SYNC_INTERVAL, flush_wallet_list)),
+        asyncio.create_task(run_periodically(config.KV_RECONCILE_INTERVAL, reconcile_wallet_list)),
+        asyncio.create_task(run_periodically(config.POSITION_CACHE_FLUSH_INTERVAL, flush_position_cache)),
+        asyncio.create_task(run_periodically(config.INGEST_PAUSE_POLL_INTERVAL, sync_ingest_pause)),
+    ]
+    if config.INGEST_QUEUE_ENABLED:
+        tasks.append(asyncio.create_task(
+            run_ingest_consumer(webhook.ingest_payload, config.INGEST_POLL_INTERVAL)
+        ))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Don't lose wallet list changes queued since the last flush
+    await asyncio.to_thread(wallet_list_sync.flush)
+
+    webhook.shutdown_executor()
+    # Workers are done - write the positions they left in the cache
+    _run_with_session(flush_position_cache)
+    await async_rpc.close()
+    logger.info("main", "Stopped nadsscan API")
+
+
+app = FastAPI(title="nadsscan", lifespan=lifespan)
+
+app.include_router(webhook.router)
+app.include_router(positions.router)
+app.include_router(leaderboard.router)
+app.include_router(wallets.router)
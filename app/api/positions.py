@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Dict, Optional
 from decimal import Decimal
 
 from app.db.database import get_db
+from app.services.nfts import get_wallet_nft_summary
 from app.services.positions import (
+    decode_leaderboard_cursor,
+    encode_leaderboard_cursor,
     get_wallet_portfolio,
     get_position_details,
     get_top_positions_by_pnl,
+    reprice_positions,
     update_unrealized_pnl_for_token
 )
 from app.utils.logger import logger
@@ -90,9 +95,40 @@ async def get_position(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get("/wallet/{wallet_address}/nfts")
+async def get_wallet_nfts(
+        wallet_address: str,
+        period: Optional[str] = Query(default=None, description="1d, 7d or 30d (all time if omitted)"),
+        db: Session = Depends(get_db)
+):
+    """
+    Get NFT trading statistics for a wallet
+
+    Returns:
+        - NFT trade counts, buy/sell volume and realized PnL
+        - Swap volume of the same period, for comparison
+    """
+    wallet_address = normalize_address(wallet_address)
+
+    if not wallet_address:
+        raise HTTPException(status_code=400, detail="Invalid wallet address")
+
+    try:
+        return get_wallet_nft_summary(wallet_address, db, period)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("positions_api", "Failed to get wallet NFT stats", error=e, context={
+            "wallet": wallet_address
+        })
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.get("/leaderboard")
 async def get_leaderboard(
         limit: int = Query(default=100, ge=1, le=500),
+        cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
         db: Session = Depends(get_db)
 ):
     """
@@ -100,17 +136,24 @@ async def get_leaderboard(
 
     Query Parameters:
         - limit: Number of results (1-500, default 100)
+        - cursor: Keyset cursor from the previous page's next_cursor
 
     Returns:
-        List of top positions sorted by PnL descending
+        List of top positions sorted by PnL descending, and the cursor of the next page
     """
     try:
-        top_positions = get_top_positions_by_pnl(limit=limit, db=db)
+        after = decode_leaderboard_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        top_positions = get_top_positions_by_pnl(limit=limit, db=db, after=after)
 
         return {
             "count": len(top_positions),
             "limit": limit,
-            "positions": top_positions
+            "positions": top_positions,
+            "next_cursor": encode_leaderboard_cursor(top_positions[-1]) if len(top_positions) == limit else None
         }
 
     except Exception as e:
@@ -164,4 +207,56 @@ async def update_unrealized_pnl(
             "token": token_address,
             "price": current_price_mon
         })
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+class RepriceRequest(BaseModel):
+    prices: Dict[str, str] = Field(..., description="Token address -> current price per token in MON")
+
+
+@router.post("/reprice")
+async def reprice(
+        request: RepriceRequest,
+        db: Session = Depends(get_db)
+):
+    """
+    Mark positions of many tokens to market in one transaction
+
+    Body:
+        - prices: {token_address: current_price_mon, ...}
+
+    Returns:
+        Number of positions updated per token
+    """
+    prices = {}
+    for token_address, current_price_mon in request.prices.items():
+        token = normalize_address(token_address)
+        if not token:
+            raise HTTPException(status_code=400, detail=f"Invalid token address: {token_address}")
+
+        try:
+            price = Decimal(current_price_mon)
+            if not price.is_finite() or price <= 0:
+                raise ValueError("Price must be positive")
+        except (ValueError, TypeError, ArithmeticError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid price for {token_address}: {str(e)}")
+
+        prices[token] = price
+
+    if not prices:
+        raise HTTPException(status_code=400, detail="No prices given")
+
+    try:
+        counts = reprice_positions(prices, db)
+
+        return {
+            "tokens": len(prices),
+            "positions_updated": sum(counts.values()),
+            "by_token": counts
+        }
+
+    except Exception as e:
+        logger.error("positions_api", "Failed to reprice positions", error=e, context={
+            "tokens": len(prices)
+        })
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,76 +1,203 @@
+import random
+import time
 import requests
-from typing import Any, List, Tuple
-from time import sleep
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from app.api.rpc_endpoints import UNTIMED_METHODS, EndpointPool, RpcEndpoint
 from app.config.config import config
 from app.utils.logger import logger
 
 FUNC_TOKEN0 = "0x0dfe1681"
 FUNC_TOKEN1 = "0xd21220a7"
+FUNC_DECIMALS = "0x313ce567"
+FUNC_SYMBOL = "0x95d89b41"
 
 MAX_RETRIES = 3
-RETRY_DELAY = 1  # seconds
+RETRY_DELAY = 0.5  # seconds, base for exponential backoff
+RETRY_MAX_DELAY = 4  # seconds, backoff cap
+MAX_BATCH_SIZE = 100  # calls per JSON-RPC batch request
 
+# Shared keep-alive session - avoids a new TCP/TLS handshake per call
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=config.RPC_POOL_MAXSIZE))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=config.RPC_POOL_MAXSIZE))
 
-def call_rpc(method: str, params: List[Any], retry_count: int = 0) -> Any:
+
+class RpcUnavailableError(Exception):
+    """Raised without a network call while every endpoint is ejected"""
+
+
+rpc_endpoints = EndpointPool(
+    config.rpc_urls,
+    max_concurrency=config.RPC_MAX_CONCURRENCY,
+    failure_threshold=config.RPC_BREAKER_THRESHOLD,
+    reset_timeout=config.RPC_BREAKER_RESET_TIMEOUT,
+    slow_threshold=config.RPC_SLOW_THRESHOLD
+)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for retry `attempt` (0-based)"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_DELAY * (2 ** attempt)))
+
+
+def _next_endpoint(tried: List[RpcEndpoint], description: str) -> RpcEndpoint:
+    """
+    Pick the endpoint for the next attempt, preferring ones not yet tried
+
+    Raises:
+        RpcUnavailableError: If every endpoint is ejected
+    """
+    endpoint = rpc_endpoints.select(exclude=tried) or rpc_endpoints.select()
+    if endpoint is None:
+        raise RpcUnavailableError(f"No RPC endpoint available for {description}")
+    return endpoint
+
+
+def _post(payload: Any, description: str) -> Any:
     """
-    Sends a json rpc to the official monad rpc endpoint with retry logic.
+    POST a JSON-RPC payload (single call or batch array) with failover and retry logic.
+
+    A failed attempt fails over to another endpoint right away; backoff is
+    only applied when retrying an endpoint that was already tried.
+    Blocking - only call from worker threads, never from the event loop.
+
+    Args:
+        payload: JSON-RPC request object or list of request objects
+        description: Method name(s) for logging
+
+    Returns:
+        Decoded JSON response
+
+    Raises:
+        RpcUnavailableError: If every endpoint is ejected
+        Exception: For connection/timeout errors after retries
+    """
+    tried: List[RpcEndpoint] = []
+
+    for attempt in range(MAX_RETRIES + 1):
+        endpoint = _next_endpoint(tried, description)
+
+        try:
+            with endpoint.semaphore:
+                endpoint.begin()
+                started = time.monotonic()
+                try:
+                    response = _session.post(endpoint.url, json=payload, timeout=10)
+                finally:
+                    endpoint.end()
+            response.raise_for_status()
+            result = response.json()
+            endpoint.record_success(time.monotonic() - started if description not in UNTIMED_METHODS else None)
+            return result
+
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.ReadTimeout) and description in UNTIMED_METHODS:
+                # Too much asked of the endpoint, not a failing one - the caller narrows the request
+                endpoint.record_inconclusive()
+                raise
+
+            endpoint.record_failure()
+
+            if attempt >= MAX_RETRIES:
+                logger.error("rpc", f"RPC failed after {MAX_RETRIES} retries", error=e, context={
+                    "method": description,
+                    "endpoint": endpoint.url
+                })
+                raise
+
+            tried.append(endpoint)
+            failover = any(candidate not in tried and candidate.healthy for candidate in rpc_endpoints.endpoints)
+            delay = 0 if failover else backoff_delay(attempt)
+            logger.warn("rpc", f"RPC error, retrying ({attempt + 1}/{MAX_RETRIES})", {
+                "method": description,
+                "endpoint": endpoint.url,
+                "error": str(e),
+                "failover": failover,
+                "delay": round(delay, 3)
+            })
+            if delay:
+                time.sleep(delay)
+
+
+def _parse_result(response: Dict[str, Any]) -> Any:
+    """Get the result of a single JSON-RPC response, raising ValueError on RPC errors"""
+    if "error" in response:
+        error_msg = response["error"].get("message", "Unknown RPC error")
+        raise ValueError(f"RPC error: {error_msg}")
+    return response.get("result")
+
+
+def _batch_chunks(calls: List[Tuple[str, List[Any]]]) -> Iterable[Tuple[int, List[Dict[str, Any]], str]]:
+    """
+    Split calls into JSON-RPC batch payloads of MAX_BATCH_SIZE
+
+    Yields:
+        (start index, payload, description) per batch; request ids are call indexes
+    """
+    for start in range(0, len(calls), MAX_BATCH_SIZE):
+        chunk = calls[start:start + MAX_BATCH_SIZE]
+        payload = [
+            {"jsonrpc": "2.0", "id": start + offset, "method": method, "params": params}
+            for offset, (method, params) in enumerate(chunk)
+        ]
+        yield start, payload, ",".join(sorted({method for method, _ in chunk}))
+
+
+def _parse_batch_response(response: Any, start: int, size: int, results: List[Any]) -> None:
+    """
+    Write the entries of a JSON-RPC batch response into `results` by request id
+
+    Calls that errored or got no response get a ValueError in their slot.
+
+    Raises:
+        ValueError: If the provider rejected the whole batch
+    """
+    if not isinstance(response, list):
+        # Some providers answer a rejected batch with a single error object
+        error_msg = response.get("error", {}).get("message", "Invalid batch response")
+        raise ValueError(f"RPC batch error: {error_msg}")
+
+    answered = set()
+    for item in response:
+        call_id = item.get("id")
+        if not isinstance(call_id, int) or not start <= call_id < start + size:
+            continue
+        answered.add(call_id)
+        try:
+            results[call_id] = _parse_result(item)
+        except ValueError as e:
+            results[call_id] = e
+
+    for call_id in range(start, start + size):
+        if call_id not in answered:
+            results[call_id] = ValueError("RPC error: missing response in batch")
+
+
+def call_rpc(method: str, params: List[Any]) -> Any:
+    """
+    Sends a json rpc to the configured monad rpc endpoints with failover and retry logic.
 
     Args:
         method: RPC method name
         params: List of parameters
-        retry_count: Current retry attempt (internal use)
 
     Returns:
         Result from RPC call
 
     Raises:
         ValueError: If RPC returns an error
+        RpcUnavailableError: If every endpoint is ejected
         Exception: For connection/timeout errors after retries
     """
     try:
-        response = requests.post(
-            config.MONAD_RPC_URL,
-            json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params},
-            timeout=10,
+        return _parse_result(
+            _post({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, method)
         )
-        response.raise_for_status()
-        result = response.json()
 
-        if "error" in result:
-            error_msg = result["error"].get("message", "Unknown RPC error")
-            raise ValueError(f"RPC error: {error_msg}")
-
-        return result.get("result")
-
-    except requests.exceptions.Timeout as e:
-        if retry_count < MAX_RETRIES:
-            logger.warn("rpc", f"RPC timeout, retrying ({retry_count + 1}/{MAX_RETRIES})", {
-                "method": method
-            })
-            sleep(RETRY_DELAY * (retry_count + 1))
-            return call_rpc(method, params, retry_count + 1)
-        else:
-            logger.error("rpc", f"RPC timeout after {MAX_RETRIES} retries", error=e, context={
-                "method": method,
-                "params": params
-            })
-            raise
-
-    except requests.exceptions.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            logger.warn("rpc", f"RPC connection error, retrying ({retry_count + 1}/{MAX_RETRIES})", {
-                "method": method,
-                "error": str(e)
-            })
-            sleep(RETRY_DELAY * (retry_count + 1))
-            return call_rpc(method, params, retry_count + 1)
-        else:
-            logger.error("rpc", f"RPC failed after {MAX_RETRIES} retries", error=e, context={
-                "method": method,
-                "params": params
-            })
-            raise
+    except (requests.exceptions.RequestException, RpcUnavailableError):
+        raise
 
     except Exception as e:
         logger.error("rpc", "Unexpected RPC error", error=e, context={
@@ -80,10 +207,71 @@ def call_rpc(method: str, params: List[Any], retry_count: int = 0) -> Any:
         raise
 
 
+def call_rpc_batch(calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+    """
+    Sends many json rpc calls as JSON-RPC batch requests over the shared session.
+
+    Calls are split into batches of MAX_BATCH_SIZE; each batch is one HTTP round trip.
+
+    Args:
+        calls: List of (method, params) tuples
+
+    Returns:
+        One entry per call, in call order: the result, or a ValueError
+        if that individual call returned an RPC error
+
+    Raises:
+        RpcUnavailableError: If every endpoint is ejected
+        Exception: For connection/timeout errors after retries
+    """
+    results: List[Any] = [None] * len(calls)
+
+    for start, payload, description in _batch_chunks(calls):
+        _parse_batch_response(_post(payload, description), start, len(payload), results)
+
+    return results
+
+
+def _decode_address(result_hex: str) -> str:
+    """Extract an address from an eth_call result (last 40 chars = 20 bytes)"""
+    return ("0x" + result_hex[-40:]).lower()
+
+
+def _pool_token_calls(pool_addresses: List[str]) -> List[Tuple[str, List[Any]]]:
+    """Build token0()/token1() eth_calls, two per pool in pool order"""
+    calls = []
+    for pool_address in pool_addresses:
+        calls.append(("eth_call", [{"to": pool_address, "data": FUNC_TOKEN0}, "latest"]))
+        calls.append(("eth_call", [{"to": pool_address, "data": FUNC_TOKEN1}, "latest"]))
+    return calls
+
+
+def _parse_pool_tokens(pool_addresses: List[str], results: List[Any]) -> Dict[str, Tuple[str, str]]:
+    """Map token0()/token1() batch results back to pools, skipping failed pools"""
+    resolved = {}
+    for index, pool_address in enumerate(pool_addresses):
+        token0_hex = results[2 * index]
+        token1_hex = results[2 * index + 1]
+
+        if isinstance(token0_hex, Exception) or isinstance(token1_hex, Exception) \
+                or not token0_hex or not token1_hex or token0_hex == "0x" or token1_hex == "0x":
+            logger.warn("rpc", f"Could not resolve pool tokens for {pool_address}", {
+                "token0": str(token0_hex),
+                "token1": str(token1_hex)
+            })
+            continue
+
+        resolved[pool_address] = (_decode_address(token0_hex), _decode_address(token1_hex))
+
+    return resolved
+
+
 def get_pool_tokens(pool_address: str) -> Tuple[str, str]:
     """
     Get token0 and token1 addresses from a pool contract via RPC.
 
+    Both calls are sent in one JSON-RPC batch.
+
     Args:
         pool_address: Pool contract address
 
@@ -97,29 +285,13 @@ def get_pool_tokens(pool_address: str) -> Tuple[str, str]:
     pool_address = pool_address.lower()
 
     try:
-        # Call token0() function
-        token0_hex = call_rpc("eth_call", [
-            {"to": pool_address, "data": FUNC_TOKEN0},
-            "latest"
-        ])
-
-        # Call token1() function
-        token1_hex = call_rpc("eth_call", [
-            {"to": pool_address, "data": FUNC_TOKEN1},
-            "latest"
-        ])
+        resolved = _parse_pool_tokens([pool_address], call_rpc_batch(_pool_token_calls([pool_address])))
 
         # Validate responses
-        if not token0_hex or not token1_hex:
+        if pool_address not in resolved:
             raise ValueError(f"Empty result from RPC for pool {pool_address}")
 
-        # Extract addresses from hex response (last 40 chars = 20 bytes = address)
-        token0 = "0x" + token0_hex[-40:]
-        token1 = "0x" + token1_hex[-40:]
-
-        # Normalize to lowercase
-        token0 = token0.lower()
-        token1 = token1.lower()
+        token0, token1 = resolved[pool_address]
 
         logger.info("rpc", f"Resolved pool tokens via RPC", {
             "pool": pool_address,
@@ -135,4 +307,107 @@ def get_pool_tokens(pool_address: str) -> Tuple[str, str]:
 
     except Exception as e:
         logger.error("rpc", f"Failed to fetch pool tokens for {pool_address}", error=e)
-        raise
\ No newline at end of file
+        raise
+
+
+def get_pool_tokens_many(pool_addresses: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Get token0 and token1 for many pools in a single JSON-RPC batch.
+
+    Args:
+        pool_addresses: Pool contract addresses
+
+    Returns:
+        Dictionary of pool address -> (token0, token1).
+        Pools whose calls failed or returned empty data are left out.
+
+    Raises:
+        Exception: For RPC connection errors
+    """
+    pools = sorted({address.lower() for address in pool_addresses if address})
+    if not pools:
+        return {}
+
+    resolved = _parse_pool_tokens(pools, call_rpc_batch(_pool_token_calls(pools)))
+
+    logger.info("rpc", "Resolved pool tokens via RPC batch", {
+        "requested": len(pools),
+        "resolved": len(resolved)
+    })
+
+    return resolved
+
+
+def _token_metadata_calls(token_addresses: List[str]) -> List[Tuple[str, List[Any]]]:
+    """Build decimals()/symbol() eth_calls, two per token in token order"""
+    calls = []
+    for token_address in token_addresses:
+        calls.append(("eth_call", [{"to": token_address, "data": FUNC_DECIMALS}, "latest"]))
+        calls.append(("eth_call", [{"to": token_address, "data": FUNC_SYMBOL}, "latest"]))
+    return calls
+
+
+def _decode_symbol(result_hex: Any) -> Optional[str]:
+    """Decode a symbol() result - ABI string, or bytes32 for older tokens"""
+    if isinstance(result_hex, Exception) or not result_hex or result_hex == "0x":
+        return None
+
+    try:
+        data = bytes.fromhex(result_hex[2:])
+        if len(data) >= 64 and int.from_bytes(data[:32], "big") == 32:
+            length = int.from_bytes(data[32:64], "big")
+            raw = data[64:64 + length]
+        else:
+            raw = data[:32].rstrip(b"\x00")
+        return raw.decode("utf-8", errors="ignore").strip() or None
+    except ValueError:
+        return None
+
+
+def _parse_token_metadata(token_addresses: List[str], results: List[Any]) -> Dict[str, Tuple[int, Optional[str]]]:
+    """Map decimals()/symbol() batch results back to tokens, skipping tokens without decimals()"""
+    resolved = {}
+    for index, token_address in enumerate(token_addresses):
+        decimals_hex = results[2 * index]
+
+        try:
+            if isinstance(decimals_hex, Exception) or not decimals_hex or decimals_hex == "0x":
+                raise ValueError(str(decimals_hex))
+            decimals = int(decimals_hex, 16)
+            if decimals > 255:
+                raise ValueError(f"decimals out of range: {decimals}")
+        except ValueError as e:
+            logger.warn("rpc", f"Could not resolve decimals for {token_address}", {"error": str(e)})
+            continue
+
+        resolved[token_address] = (decimals, _decode_symbol(results[2 * index + 1]))
+
+    return resolved
+
+
+def get_token_metadata_many(token_addresses: Iterable[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+    """
+    Get decimals and symbol for many tokens in a single JSON-RPC batch.
+
+    Args:
+        token_addresses: Token contract addresses
+
+    Returns:
+        Dictionary of token address -> (decimals, symbol).
+        Tokens whose decimals() call failed are left out.
+
+    Raises:
+        Exception: For RPC connection errors
+    """
+    tokens = sorted({address.lower() for address in token_addresses if address})
+    if not tokens:
+        return {}
+
+    resolved = _parse_token_metadata(tokens, call_rpc_batch(_token_metadata_calls(tokens)))
+
+    logger.info("rpc", "Resolved token metadata via RPC batch", {
+        "requested": len(tokens),
+        "resolved": len(resolved)
+    })
+
+    return resolved
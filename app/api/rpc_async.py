@@ -0,0 +1,311 @@
+import asyncio
+import time
+import httpx
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.api.rpc import (
+    MAX_RETRIES,
+    RpcUnavailableError,
+    backoff_delay,
+    rpc_endpoints,
+    _batch_chunks,
+    _parse_batch_response,
+    _parse_pool_tokens,
+    _parse_result,
+    _parse_token_metadata,
+    _pool_token_calls,
+    _token_metadata_calls,
+)
+from app.api.rpc_endpoints import UNTIMED_METHODS, EndpointPool, RpcEndpoint
+from app.config.config import config
+from app.utils.logger import logger
+
+
+class AsyncRpcClient:
+    """
+    asyncio-native JSON-RPC client
+
+    - Latency-aware endpoint selection with immediate failover
+    - Non-blocking retries with exponential backoff and full jitter
+    - Concurrency limit for in-flight requests per endpoint
+    - Shares the endpoint pool (and its circuit breakers) with the sync
+      client, so both fast-fail while an endpoint is degraded
+    """
+
+    def __init__(self, endpoints: EndpointPool, max_concurrency: int, timeout: float = 10):
+        self.endpoints = endpoints
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the HTTP client lazily, inside the running event loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * len(self.endpoints.endpoints),
+                    max_keepalive_connections=self.max_concurrency * len(self.endpoints.endpoints)
+                )
+            )
+            self._semaphores = {
+                endpoint.url: asyncio.Semaphore(self.max_concurrency)
+                for endpoint in self.endpoints.endpoints
+            }
+        return self._client
+
+    async def close(self) -> None:
+        """Close pooled connections (call on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphores = {}
+
+    async def _send(self, endpoint: RpcEndpoint, payload: Any, description: str) -> Any:
+        """Send one request to an endpoint, recording its latency (except for UNTIMED_METHODS)"""
+        client = self._get_client()
+
+        async with self._semaphores[endpoint.url]:
+            endpoint.begin()
+            started = time.monotonic()
+            try:
+                response = await client.post(endpoint.url, json=payload)
+            finally:
+                endpoint.end()
+
+        response.raise_for_status()
+        try:
+            result = response.json()
+        except ValueError as e:
+            # An HTML error page or garbage body is a failure of the endpoint
+            raise httpx.DecodingError(f"Invalid JSON-RPC response body: {e}", request=response.request)
+        endpoint.record_success(time.monotonic() - started if description not in UNTIMED_METHODS else None)
+        return result
+
+    async def _post(self, payload: Any, description: str) -> Any:
+        """
+        POST a JSON-RPC payload with failover and non-blocking retries
+
+        Raises:
+            RpcUnavailableError: If every endpoint is ejected
+            httpx.HTTPError: For connection/timeout errors after retries
+            httpx.ReadTimeout: Right away for UNTIMED_METHODS
+        """
+        tried: List[RpcEndpoint] = []
+
+        for attempt in range(MAX_RETRIES + 1):
+            endpoint = self.endpoints.select(exclude=tried) or self.endpoints.select()
+            if endpoint is None:
+                raise RpcUnavailableError(f"No RPC endpoint available for {description}")
+
+            try:
+                return await self._send(endpoint, payload, description)
+
+            except httpx.HTTPError as e:
+                if isinstance(e, httpx.ReadTimeout) and description in UNTIMED_METHODS:
+                    # Too much asked of the endpoint, not a failing one - the caller narrows the request
+                    endpoint.record_inconclusive()
+                    raise
+
+                endpoint.record_failure()
+
+                if attempt >= MAX_RETRIES:
+                    logger.error("rpc", f"Async RPC failed after {MAX_RETRIES} retries", error=e, context={
+                        "method": description,
+                        "endpoint": endpoint.url
+                    })
+                    raise
+
+                tried.append(endpoint)
+                failover = any(
+                    candidate not in tried and candidate.healthy for candidate in self.endpoints.endpoints
+                )
+                delay = 0 if failover else backoff_delay(attempt)
+                logger.warn("rpc", f"Async RPC error, retrying ({attempt + 1}/{MAX_RETRIES})", {
+                    "method": description,
+                    "endpoint": endpoint.url,
+                    "error": str(e),
+                    "failover": failover,
+                    "delay": round(delay, 3)
+                })
+                if delay:
+                    await asyncio.sleep(delay)
+
+    async def probe(self, endpoint: RpcEndpoint) -> bool:
+        """
+        Health-probe an endpoint with eth_blockNumber, bypassing selection
+
+        Returns:
+            True if the endpoint answered and was reinstated
+        """
+        client = self._get_client()
+        started = time.monotonic()
+
+        try:
+            response = await client.post(
+                endpoint.url,
+                json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+            )
+            response.raise_for_status()
+            _parse_result(response.json())
+        except Exception as e:
+            logger.warn("rpc", "RPC endpoint failed health probe", {
+                "endpoint": endpoint.url,
+                "error": str(e)
+            })
+            return False
+
+        latency = time.monotonic() - started
+        # A slow endpoint is still better than none
+        if latency > endpoint.slow_threshold and self.endpoints.has_other_healthy(endpoint):
+            return False
+
+        endpoint.reinstate(latency)
+        return True
+
+    async def run_health_probes(self, interval: float) -> None:
+        """Probe ejected endpoints every `interval` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            unhealthy = self.endpoints.unhealthy()
+            if unhealthy:
+                await asyncio.gather(*[self.probe(endpoint) for endpoint in unhealthy])
+
+    async def call(self, method: str, params: List[Any]) -> Any:
+        """
+        Send a single JSON-RPC call
+
+        Raises:
+            ValueError: If RPC returns an error
+        """
+        return _parse_result(
+            await self._post({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, method)
+        )
+
+    async def call_batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """
+        Send many calls as JSON-RPC batch requests (MAX_BATCH_SIZE per request)
+
+        Returns:
+            One entry per call, in call order: the result, or a ValueError
+            if that individual call returned an RPC error
+        """
+        results: List[Any] = [None] * len(calls)
+        chunks = list(_batch_chunks(calls))
+
+        responses = await asyncio.gather(*[
+            self._post(payload, description) for _, payload, description in chunks
+        ])
+
+        for (start, payload, _), response in zip(chunks, responses):
+            _parse_batch_response(response, start, len(payload), results)
+
+        return results
+
+    async def get_pool_tokens(self, pool_address: str) -> Tuple[str, str]:
+        """
+        Get token0 and token1 of a pool in one batch request
+
+        Raises:
+            ValueError: If RPC returns invalid data
+        """
+        pool_address = pool_address.lower()
+        resolved = await self.get_pool_tokens_many([pool_address])
+
+        if pool_address not in resolved:
+            raise ValueError(f"Empty result from RPC for pool {pool_address}")
+
+        return resolved[pool_address]
+
+    async def get_pool_tokens_many(self, pool_addresses: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Get token0 and token1 for many pools
+
+        Returns:
+            Dictionary of pool address -> (token0, token1); failed pools are left out
+        """
+        pools = sorted({address.lower() for address in pool_addresses if address})
+        if not pools:
+            return {}
+
+        resolved = _parse_pool_tokens(pools, await self.call_batch(_pool_token_calls(pools)))
+
+        logger.info("rpc", "Resolved pool tokens via async RPC batch", {
+            "requested": len(pools),
+            "resolved": len(resolved)
+        })
+
+        return resolved
+
+    async def get_token_metadata_many(self, token_addresses: Iterable[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """
+        Get decimals and symbol for many tokens
+
+        Returns:
+            Dictionary of token address -> (decimals, symbol); tokens without decimals() are left out
+        """
+        tokens = sorted({address.lower() for address in token_addresses if address})
+        if not tokens:
+            return {}
+
+        resolved = _parse_token_metadata(tokens, await self.call_batch(_token_metadata_calls(tokens)))
+
+        logger.info("rpc", "Resolved token metadata via async RPC batch", {
+            "requested": len(tokens),
+            "resolved": len(resolved)
+        })
+
+        return resolved
+
+    async def get_block_number(self) -> int:
+        """Get the number of the latest block"""
+        return int(await self.call("eth_blockNumber", []), 16)
+
+    async def get_block_timestamps(self, block_numbers: Iterable[int]) -> Dict[int, int]:
+        """
+        Get the timestamps of many blocks with batched eth_getBlockByNumber calls
+
+        Returns:
+            Dictionary of block number -> unix seconds
+
+        Raises:
+            ValueError: If a block can't be fetched
+        """
+        numbers = sorted(set(block_numbers))
+        results = await self.call_batch([("eth_getBlockByNumber", [hex(number), False]) for number in numbers])
+
+        timestamps = {}
+        for number, result in zip(numbers, results):
+            if isinstance(result, Exception):
+                raise result
+            if not result or "timestamp" not in result:
+                raise ValueError(f"Block {number} not found")
+            timestamps[number] = int(result["timestamp"], 16)
+        return timestamps
+
+    async def get_logs(
+            self,
+            from_block: int,
+            to_block: int,
+            topics: List[Any],
+            address: Optional[Any] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the logs of a block range (inclusive) matching a topic filter
+
+        Raises:
+            ValueError: If RPC returns an error (e.g. the provider's range or result limit)
+        """
+        log_filter: Dict[str, Any] = {
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "topics": topics
+        }
+        if address is not None:
+            log_filter["address"] = address
+
+        return await self.call("eth_getLogs", [log_filter]) or []
+
+
+async_rpc = AsyncRpcClient(rpc_endpoints, config.RPC_MAX_CONCURRENCY)
@@ -0,0 +1,254 @@
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Any
+
+from app.utils.logger import logger
+
+EWMA_ALPHA = 0.2  # weight of the newest latency sample
+
+# Methods whose latency grows with the request (e.g. the block range of
+# eth_getLogs) rather than with endpoint load - kept out of the EWMA, and
+# their read timeouts aren't counted as endpoint failures
+UNTIMED_METHODS = frozenset({"eth_getLogs"})
+
+
+class CircuitBreaker:
+    """
+    Fast-fails calls while an endpoint is degraded
+
+    - closed: calls go through; consecutive failures are counted
+    - open: after `failure_threshold` failures, calls fail immediately
+    - half-open: after `reset_timeout` seconds, one trial call is let
+      through; success closes the breaker, failure re-opens it
+
+    Safe to use from any thread.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, name: str = "rpc"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Check if a call may be attempted now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("rpc", "Circuit breaker closed - endpoint recovered", {"endpoint": self.name})
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warn("rpc", "Circuit breaker opened - endpoint degraded", {
+                        "endpoint": self.name,
+                        "failures": self._failures,
+                        "reset_timeout": self.reset_timeout
+                    })
+                self._opened_at = time.monotonic()
+
+    def cancel_trial(self) -> None:
+        """Let another half-open trial through - the last one was inconclusive"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def trip(self) -> None:
+        """Open the breaker immediately (e.g. endpoint too slow)"""
+        with self._lock:
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RpcEndpoint:
+    """A single JSON-RPC endpoint with its health and latency state"""
+
+    def __init__(self, url: str, max_concurrency: int, failure_threshold: int,
+                 reset_timeout: float, slow_threshold: float, pool: 'EndpointPool'):
+        self.url = url
+        self.pool = pool
+        self.slow_threshold = slow_threshold
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, name=url)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.latency: Optional[float] = None  # EWMA, seconds
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state == "closed"
+
+    def score(self) -> float:
+        """Expected wait for a new request - lower is better"""
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + self.in_flight)
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+
+    def end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_success(self, latency: Optional[float]) -> None:
+        """
+        Record a successful request
+
+        Args:
+            latency: Seconds the request took, or None for UNTIMED_METHODS
+        """
+        if latency is None:
+            self.breaker.record_success()
+            return
+
+        with self._lock:
+            self.latency = latency if self.latency is None else (
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+            )
+            too_slow = self.latency > self.slow_threshold
+
+        if too_slow and self.pool.eject_slow(self):
+            logger.warn("rpc", "Ejecting slow RPC endpoint", {
+                "endpoint": self.url,
+                "latency": round(self.latency, 3)
+            })
+        else:
+            self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    def record_inconclusive(self) -> None:
+        """Record a request that says nothing about endpoint health (e.g. an oversized query timing out)"""
+        self.breaker.cancel_trial()
+
+    def reinstate(self, latency: float) -> None:
+        """Bring an ejected endpoint back after a successful health probe"""
+        with self._lock:
+            self.latency = latency
+        if not self.healthy:
+            logger.info("rpc", "RPC endpoint passed health probe", {
+                "endpoint": self.url,
+                "latency": round(latency, 3)
+            })
+        self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+class EndpointPool:
+    """
+    Spreads RPC calls across endpoints with latency-aware selection
+
+    Selection is "power of two choices": two random available endpoints
+    are compared and the one with the lower score (EWMA latency weighted
+    by in-flight requests) wins. Failing endpoints are ejected by their
+    circuit breaker; slow ones are ejected when their EWMA latency
+    crosses the slow threshold, unless no other endpoint is healthy - a
+    slow endpoint beats fast-failing every call. Ejected endpoints come
+    back through health probes or a half-open trial call.
+    """
+
+    def __init__(self, urls: Iterable[str], max_concurrency: int, failure_threshold: int,
+                 reset_timeout: float, slow_threshold: float):
+        self.endpoints: List[RpcEndpoint] = [
+            RpcEndpoint(url, max_concurrency, failure_threshold, reset_timeout, slow_threshold, self)
+            for url in urls
+        ]
+        if not self.endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        self._lock = threading.Lock()
+
+    def has_other_healthy(self, endpoint: RpcEndpoint) -> bool:
+        return any(other is not endpoint and other.healthy for other in self.endpoints)
+
+    def eject_slow(self, endpoint: RpcEndpoint) -> bool:
+        """
+        Trip the breaker of a slow endpoint, unless it is the last healthy one
+
+        Returns:
+            True if the endpoint was ejected
+        """
+        with self._lock:
+            if not self.has_other_healthy(endpoint):
+                return False
+            endpoint.breaker.trip()
+            return True
+
+    def select(self, exclude: Iterable[RpcEndpoint] = ()) -> Optional[RpcEndpoint]:
+        """
+        Pick an endpoint for the next attempt
+
+        Args:
+            exclude: Endpoints that already failed this call
+
+        Returns:
+            An endpoint admitted by its breaker, or None if all are unavailable
+        """
+        excluded = set(id(endpoint) for endpoint in exclude)
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if id(endpoint) not in excluded and endpoint.healthy
+        ]
+
+        if len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        candidates.sort(key=lambda endpoint: endpoint.score())
+
+        for endpoint in candidates:
+            if endpoint.breaker.allow():
+                return endpoint
+
+        # No healthy endpoint left - allow a half-open trial on an ejected one
+        for endpoint in self.endpoints:
+            if id(endpoint) not in excluded and not endpoint.healthy and endpoint.breaker.allow():
+                return endpoint
+
+        return None
+
+    def unhealthy(self) -> List[RpcEndpoint]:
+        return [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
@@ -0,0 +1,175 @@
+import asyncio
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional
+
+from app.config.config import config
+from app.db.database import get_db
+from app.services.kv_sync import wallet_list_sync
+from app.services.wallets import export_wallets, import_wallets
+from app.utils.logger import logger
+
+router = APIRouter(prefix="/wallets", tags=["wallets"])
+
+FIELDS = ("address", "twitter_name", "twitter_pfp")
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _check_auth(auth: Optional[str]) -> None:
+    """Wallet management changes the stream filter - require the security token"""
+    if auth != config.QUICKNODE_SECURITY_TOKEN:
+        logger.warn("wallets_api", "Unauthorized wallet request rejected", {
+            "auth_header_present": auth is not None
+        })
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+def parse_csv_wallets(text: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Parse a CSV wallet list
+
+    With a header row, columns are matched by name (address, twitter_name,
+    twitter_pfp); without one they are taken in that order.
+    """
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "address" in header:
+        columns = {field: header.index(field) for field in FIELDS if field in header}
+        rows = rows[1:]
+    else:
+        columns = {field: position for position, field in enumerate(FIELDS)}
+
+    return [
+        {field: row[position].strip() if position < len(row) else None for field, position in columns.items()}
+        for row in rows
+    ]
+
+
+def parse_json_wallets(payload) -> List[Dict[str, Optional[str]]]:
+    """
+    Parse a JSON wallet list: addresses or objects, bare or under "wallets"
+
+    Raises:
+        ValueError: If the payload has another shape
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("wallets")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a list of wallets")
+
+    entries = []
+    for item in payload:
+        if isinstance(item, str):
+            entries.append({"address": item})
+        elif isinstance(item, dict):
+            entries.append({field: item.get(field) for field in FIELDS})
+        else:
+            raise ValueError(f"Invalid wallet entry: {item!r}")
+    return entries
+
+
+@router.post("/bulk")
+async def import_wallet_list(
+        request: Request,
+        auth: Optional[str] = Header(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Track a list of wallets
+
+    Body (by Content-Type):
+        - text/csv: address,twitter_name,twitter_pfp (header row optional)
+        - application/json: ["0x..", ...], [{"address": .., "twitter_name": .., "twitter_pfp": ..}, ...]
+          or {"wallets": [...]}
+
+    Existing wallets keep their twitter metadata unless the list provides
+    it. New wallets are pushed to the QuickNode filter list right away.
+
+    Returns:
+        Import statistics, invalid addresses and whether the filter list was updated
+    """
+    _check_auth(auth)
+
+    try:
+        body = (await request.body()).decode("utf-8-sig")
+        if "csv" in request.headers.get("content-type", ""):
+            entries = parse_csv_wallets(body)
+        else:
+            entries = parse_json_wallets(json.loads(body))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid wallet list: {str(e)}")
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="No wallets given")
+
+    try:
+        stats = await asyncio.to_thread(import_wallets, entries, db)
+    except Exception as e:
+        logger.error("wallets_api", "Failed to import wallets", error=e, context={
+            "entries": len(entries)
+        })
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    # Don't wait for the periodic flush - reconcile repairs the list if this fails
+    sync = await asyncio.to_thread(wallet_list_sync.flush)
+
+    return {
+        **stats,
+        "invalid": stats["invalid"][:100],
+        "filter_list_synced": sync["failed"] == 0
+    }
+
+
+def _export_lines(export_format: str) -> Iterator[str]:
+    if export_format == "ndjson":
+        for address, twitter_name, twitter_pfp, created_at in export_wallets():
+            yield json.dumps({
+                "address": address,
+                "twitter_name": twitter_name,
+                "twitter_pfp": twitter_pfp,
+                "created_at": created_at.isoformat() if created_at else None
+            }) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow((*FIELDS, "created_at"))
+    for count, (address, twitter_name, twitter_pfp, created_at) in enumerate(export_wallets(), 1):
+        writer.writerow((address, twitter_name or "", twitter_pfp or "", created_at.isoformat() if created_at else ""))
+        if count % 1000 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/bulk")
+async def export_wallet_list(
+        format: str = Query(default="csv", description="csv or ndjson"),
+        auth: Optional[str] = Header(None)
+):
+    """
+    Export every tracked wallet
+
+    Streamed straight from a database cursor, so the table is never held in memory.
+
+    Query Parameters:
+        - format: csv (default, same columns as the import) or ndjson
+    """
+    _check_auth(auth)
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format: {format}. Must be one of {list(EXPORT_FORMATS)}")
+
+    return StreamingResponse(
+        _export_lines(format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=wallets.{format}"}
+    )
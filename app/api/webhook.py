@@ -1,19 +1,85 @@
-from fastapi import APIRouter, Request, Header, HTTPException
+from fastapi import APIRouter, Depends, Request, Header, HTTPException, Query
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
 from typing import Optional, List
 import asyncio
+import json
 
 from app.config.config import config
-from app.db.database import SessionLocal
-from app.services.swaps import process_swap_event
+from app.db.database import SessionLocal, get_db
+from app.services.ingest_pause import IngestPausedError, ingest_gate
+from app.services.ingest_queue import enqueue_payload, get_queue_stats, replay
+from app.services.nfts import process_nft_batch
+from app.services.pools import get_pools_info, pool_registry, prefetch_pools
+from app.services.scheduler import PartitionedScheduler
+from app.services.swaps import (
+    event_order_key,
+    handle_batch_reorg,
+    position_key,
+    process_swap_batch,
+    process_swap_event,
+)
+from app.services.tokens import prefetch_tokens
 from app.utils.logger import logger
+from app.utils.utils import normalize_address
 
 router = APIRouter()
 
+EXECUTION_MODES = ("batch", "partitioned", "sequential")
 
-async def process_swap_with_session(swap: dict) -> dict:
+_executor: Optional[ThreadPoolExecutor] = None
+_scheduler: Optional[PartitionedScheduler] = None
+
+
+def get_max_workers() -> int:
+    """
+    Number of concurrent swap workers
+
+    Each worker holds its own database session, so the worker count is
+    capped by the connections the engine pool can hand out.
+    """
+    workers = config.WEBHOOK_MAX_WORKERS or config.DB_POOL_SIZE
+    return max(1, min(workers, config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get (or lazily create) the shared webhook worker pool"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_max_workers(),
+            thread_name_prefix="webhook-worker"
+        )
+        logger.info("webhook", "Started webhook worker pool", {
+            "mode": config.WEBHOOK_EXECUTION_MODE,
+            "workers": get_max_workers()
+        })
+    return _executor
+
+
+def get_scheduler() -> PartitionedScheduler:
+    """Get (or lazily create) the (wallet, token) scheduler - one partition per worker"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PartitionedScheduler(get_max_workers())
+    return _scheduler
+
+
+def shutdown_executor() -> None:
+    """Wait for in-flight swaps and stop the worker pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        logger.info("webhook", "Stopped webhook worker pool")
+
+
+def process_swap_with_session(swap: dict) -> dict:
     """
     Process a single swap event with its own database session
 
+    Blocking - runs on a worker thread, never on the event loop
+
     Args:
         swap: Swap event data
 
@@ -41,36 +107,151 @@ async def process_swap_with_session(swap: dict) -> dict:
         db.close()
 
 
-@router.post("/webhook")
-async def quicknode_webhook(
-        request: Request,
-        auth: Optional[str] = Header(None)
-):
+def process_swap_batch_with_session(swaps: List[dict]) -> List[dict]:
+    """Ingest a whole batch in a single transaction with one database session"""
+    db = SessionLocal()
+    try:
+        return process_swap_batch(swaps, db)
+    finally:
+        db.close()
+
+
+def process_nft_batch_with_session(nft_trades: List[dict]) -> List[dict]:
+    """Ingest a batch of NFT trades in a single transaction with one database session"""
+    db = SessionLocal()
+    try:
+        return process_nft_batch(nft_trades, db)
+    finally:
+        db.close()
+
+
+def process_swaps_sequentially(swaps: List[dict]) -> List[dict]:
+    """Process a batch of swaps one after another in payload order"""
+    return [process_swap_with_session(swap) for swap in swaps]
+
+
+def handle_batch_reorg_with_session(swaps: List[dict]) -> None:
+    """Roll back a reorg for the whole batch before it is fanned out"""
+    db = SessionLocal()
+    try:
+        handle_batch_reorg(swaps, db)
+    finally:
+        db.close()
+
+
+def resolve_pools_with_session(swaps: List[dict]) -> None:
+    """Resolve pools the async prefetch missed (DB, then RPC) so swaps can be partitioned"""
+    db = SessionLocal()
+    try:
+        get_pools_info([normalize_address(swap.get("pool", "")) for swap in swaps], db)
+    finally:
+        db.close()
+
+
+async def run_partitioned(swaps: List[dict]) -> list:
     """
-    QuickNode Webhook Endpoint
+    Run swaps in parallel, sharded by the (wallet, token) position they change
 
-    - Receives Swap and NFT events from QuickNode stream
-    - Authenticates using security token
-    - Processes events concurrently with individual database sessions
+    Each shard applies its swaps in (block_number, log_index) order, so the
+    weighted-average-cost math sees trades in chain order and no two
+    workers read-modify-write the same position row. Swaps of pools that
+    still can't be resolved could change any position; they run last,
+    while no partition runs.
 
     Returns:
-        JSON with processing statistics
+        One result (dict or exception) per swap, in payload order
     """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    scheduler = get_scheduler()
 
-    # --- Authentication ---
-    if auth != config.QUICKNODE_SECURITY_TOKEN:
-        logger.warn("webhook", "Unauthorized webhook request rejected", {
-            "auth_header_present": auth is not None
-        })
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    await loop.run_in_executor(executor, resolve_pools_with_session, swaps)
+    await loop.run_in_executor(executor, handle_batch_reorg_with_session, swaps)
 
-    # --- Parse Payload ---
+    lanes = scheduler.split(swaps, position_key, event_order_key)
+    unresolved = lanes.pop(None, None)
+    lane_results = await asyncio.gather(*[
+        loop.run_in_executor(executor, scheduler.run_lane, partition, lane, process_swap_with_session)
+        for partition, lane in lanes.items()
+    ], return_exceptions=True)
+
+    if unresolved:
+        lanes[None] = unresolved
+        try:
+            lane_results.append(await loop.run_in_executor(
+                executor, scheduler.run_exclusive, unresolved, process_swap_with_session
+            ))
+        except Exception as e:
+            lane_results.append(e)
+
+    results: list = [None] * len(swaps)
+    for (partition, lane), lane_result in zip(lanes.items(), lane_results):
+        if isinstance(lane_result, Exception):
+            for index, _ in lane:
+                results[index] = lane_result
+            continue
+        for index, result in lane_result:
+            results[index] = result
+
+    return results
+
+
+async def run_swap_batch(swaps: List[dict]) -> list:
+    """
+    Run a batch of swaps on the worker pool without blocking the event loop
+
+    Modes (config.WEBHOOK_EXECUTION_MODE):
+        - batch: the whole batch is ingested in bulk in one transaction
+        - partitioned: swaps are sharded by (wallet, token) across the worker pool
+        - sequential: the whole batch runs in payload order on one worker
+
+    Returns:
+        One result (dict or exception) per swap
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    mode = config.WEBHOOK_EXECUTION_MODE
+
+    if mode not in EXECUTION_MODES:
+        logger.warn("webhook", f"Unknown execution mode {mode}, falling back to batch")
+        mode = "batch"
+
+    if mode == "partitioned":
+        return await run_partitioned(swaps)
+
+    runner = process_swap_batch_with_session if mode == "batch" else process_swaps_sequentially
     try:
-        payload = await request.json()
+        return await loop.run_in_executor(executor, runner, swaps)
     except Exception as e:
-        logger.error("webhook", "Invalid JSON payload received", error=e)
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+        return [e] * len(swaps)
+
+
+async def run_nft_batch(nft_trades: List[dict]) -> list:
+    """
+    Run a batch of NFT trades on the worker pool without blocking the event loop
 
+    NFT trades don't touch token positions, so every execution mode
+    ingests them in bulk in one transaction.
+
+    Returns:
+        One result (dict or exception) per NFT trade
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_executor(), process_nft_batch_with_session, nft_trades)
+    except Exception as e:
+        return [e] * len(nft_trades)
+
+
+async def ingest_payload(payload: dict) -> dict:
+    """
+    Ingest a webhook payload: resolve pools, then process its swaps and NFT trades
+
+    Used inline by the webhook and by the ingestion queue consumer.
+
+    Returns:
+        JSON-serializable processing statistics
+    """
     swaps: List[dict] = payload.get("swaps", [])
     nft_trades: List[dict] = payload.get("nftTrades", [])
 
@@ -89,14 +270,21 @@ async def quicknode_webhook(
             "errors": 0
         }
 
-    # Create tasks for concurrent processing
-    # Each task gets its own database session
-    tasks = []
-    for swap in swaps:
-        tasks.append(asyncio.create_task(process_swap_with_session(swap)))
+    # Unknown pools are resolved with non-blocking RPC first; the rest of
+    # the blocking work (SQLAlchemy) runs on worker threads so other
+    # endpoints stay responsive while the batch is ingested
+    results = []
+    if swaps:
+        pools = [normalize_address(swap.get("pool", "")) for swap in swaps]
+        await prefetch_pools(pools)
+        await prefetch_tokens(
+            token for tokens in (pool_registry.get(pool) for pool in set(pools)) if tokens for token in tokens
+        )
+        results.extend(await run_swap_batch(swaps))
 
-    # Wait for all tasks to complete
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # --- Process NFT Trades ---
+    if nft_trades:
+        results.extend(await run_nft_batch(nft_trades))
 
     # --- Analyze Results ---
     success_count = 0
@@ -127,6 +315,7 @@ async def quicknode_webhook(
 
     logger.info("webhook", f"Webhook processing completed", {
         "total_swaps": len(swaps),
+        "total_nft_trades": len(nft_trades),
         "successful": success_count,
         "failed": error_count
     })
@@ -134,6 +323,7 @@ async def quicknode_webhook(
     response = {
         "status": "ok",
         "processed_swaps": len(swaps),
+        "processed_nfts": len(nft_trades),
         "successful": success_count,
         "errors": error_count
     }
@@ -142,4 +332,100 @@ async def quicknode_webhook(
     if error_details and len(error_details) <= 10:  # Only include if not too many
         response["error_details"] = error_details
 
-    return response
\ No newline at end of file
+    return response
+
+
+def _check_auth(auth: Optional[str]) -> None:
+    """Reject requests without the QuickNode security token"""
+    if auth != config.QUICKNODE_SECURITY_TOKEN:
+        logger.warn("webhook", "Unauthorized webhook request rejected", {
+            "auth_header_present": auth is not None
+        })
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+@router.post("/webhook")
+async def quicknode_webhook(
+        request: Request,
+        auth: Optional[str] = Header(None)
+):
+    """
+    QuickNode Webhook Endpoint
+
+    - Receives Swap and NFT events from QuickNode stream
+    - Authenticates using security token
+    - With INGEST_QUEUE_ENABLED, appends the raw payload to the durable
+      ingestion queue and acknowledges right away; otherwise processes
+      events on a bounded worker pool with individual database sessions
+
+    Returns:
+        JSON with processing statistics (or the queue id)
+    """
+
+    # --- Authentication ---
+    _check_auth(auth)
+
+    # --- Parse Payload ---
+    try:
+        raw_payload = await request.body()
+        payload = json.loads(raw_payload)
+    except Exception as e:
+        logger.error("webhook", "Invalid JSON payload received", error=e)
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    # --- Acknowledge, process later ---
+    if config.INGEST_QUEUE_ENABLED:
+        try:
+            queue_id = await asyncio.to_thread(enqueue_payload, raw_payload.decode())
+        except Exception as e:
+            logger.error("webhook", "Failed to enqueue payload", error=e)
+            raise HTTPException(status_code=503, detail="Failed to enqueue payload")
+
+        return {"status": "queued", "queue_id": queue_id}
+
+    # --- Process now, unless a maintenance job paused ingestion (the stream retries) ---
+    try:
+        with ingest_gate.admit():
+            return await ingest_payload(payload)
+    except IngestPausedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/webhook/queue")
+async def get_ingest_queue_stats(
+        auth: Optional[str] = Header(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Ingestion queue depth and lag
+
+    Returns:
+        Counts per status, age of the oldest pending payload and consumer counters
+    """
+    _check_auth(auth)
+    return get_queue_stats(db)
+
+
+@router.post("/webhook/queue/replay")
+async def replay_ingest_queue(
+        from_id: int = Query(..., ge=1, description="First queue id to replay"),
+        to_id: Optional[int] = Query(None, ge=1, description="Last queue id to replay"),
+        failed_only: bool = Query(False, description="Only replay payloads that failed"),
+        auth: Optional[str] = Header(None),
+        db: Session = Depends(get_db)
+):
+    """
+    Requeue stored payloads so the consumer ingests them again
+
+    Ingestion skips transactions that are already processed, so replaying
+    is safe for payloads that were ingested before.
+    """
+    _check_auth(auth)
+
+    if to_id is not None and to_id < from_id:
+        raise HTTPException(status_code=400, detail="to_id must be >= from_id")
+
+    return {
+        "status": "ok",
+        "requeued": replay(db, from_id, to_id, failed_only)
+    }
@@ -1,3 +1,4 @@
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,6 +10,65 @@ class Config(BaseSettings):
     MON_ADDRESS: str = "0x760AfE86e5de5fa0Ee542fc7B7B713e1c5425701"
     MONAD_RPC_URL: str
 
+    # Webhook batch execution
+    WEBHOOK_EXECUTION_MODE: str = "batch"  # "batch", "partitioned" or "sequential"
+    WEBHOOK_MAX_WORKERS: int = 0  # 0 = match DB_POOL_SIZE
+    INGEST_QUEUE_ENABLED: bool = False  # acknowledge webhooks, ingest from a durable queue
+    INGEST_POLL_INTERVAL: float = 1.0  # seconds between polls of a drained queue
+    INGEST_MAX_ATTEMPTS: int = 5  # attempts before a queued payload is marked failed
+    INGEST_PAUSE_POLL_INTERVAL: float = 1.0  # seconds between checks of maintenance pauses
+    INGEST_PAUSE_TIMEOUT: float = 120.0  # seconds a maintenance job waits for ingestion to pause
+
+    # RPC
+    RPC_POOL_MAXSIZE: int = 20  # keep-alive connections per RPC host
+    RPC_MAX_CONCURRENCY: int = 16  # in-flight requests per RPC endpoint
+    RPC_BREAKER_THRESHOLD: int = 5  # consecutive failures before fast-failing
+    RPC_BREAKER_RESET_TIMEOUT: int = 30  # seconds before a trial call is let through
+    RPC_URLS: str = ""  # extra comma-separated RPC endpoints
+    RPC_SLOW_THRESHOLD: float = 3.0  # seconds of EWMA latency before an endpoint is ejected
+    RPC_PROBE_INTERVAL: int = 15  # seconds between health probes of ejected endpoints
+
+    # Pool registry
+    POOL_NEGATIVE_CACHE_TTL: int = 300  # seconds before a failed pool is retried over RPC
+
+    # Reorg handling
+    REORG_MAX_DEPTH: int = 256  # blocks of position undo history to keep
+    REORG_PRUNE_INTERVAL: int = 60  # seconds between undo history prunes
+    CHAIN_TRACKER_CAPACITY: int = 1024  # recent block hashes kept for reorg detection
+
+    # Price oracle
+    PRICE_VWAP_WINDOW: int = 300  # seconds of trades in the VWAP
+    PRICE_MARK_INTERVAL: int = 30  # seconds between mark-to-market runs
+    PRICE_MARK_SOURCE: str = "vwap"  # "vwap" or "last"
+
+    # Write-behind position cache (batch mode): positions are written every
+    # flush interval instead of per trade. Single ingesting process only - the
+    # table lags by up to one interval, and after a crash it must be rebuilt
+    # with python -m app.services.rebuild
+    POSITION_CACHE_ENABLED: bool = False
+    POSITION_CACHE_FLUSH_INTERVAL: float = 5.0  # seconds between flushes
+    POSITION_CACHE_MAX_DIRTY: int = 5000  # flush early once this many positions wait
+    POSITION_CACHE_MAX_ENTRIES: int = 100000  # clean positions kept in memory
+
+    # QuickNode KV wallet list sync
+    KV_SYNC_INTERVAL: float = 2.0  # seconds between flushes of pending adds/removes
+    KV_SYNC_BATCH_SIZE: int = 1000  # adds and removes per PATCH
+    KV_RECONCILE_INTERVAL: int = 600  # seconds between diffs of the KV list and the wallets table
+
+    # Historical backfill
+    BACKFILL_CHUNK_BLOCKS: int = 2000  # blocks per eth_getLogs range (split further on provider limits)
+    BACKFILL_CONCURRENCY: int = 8  # ranges fetched in parallel
+    BACKFILL_WALLETS_PER_FILTER: int = 100  # wallet topics OR-ed in one eth_getLogs filter
+
+    # Positions rebuild
+    REBUILD_WORKERS: int = 4  # worker processes, each owning a wallet shard
+    REBUILD_FETCH_SIZE: int = 10000  # swaps per server-side cursor round trip
+    REBUILD_FLUSH_SIZE: int = 5000  # rebuilt positions per staging INSERT
+
+    # Database connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
     model_config = SettingsConfigDict(env_file=".env")
 
     def __init__(self, **kwargs):
@@ -16,5 +76,11 @@ class Config(BaseSettings):
         # Normalize MON address on initialization
         self.MON_ADDRESS = self.MON_ADDRESS.lower()
 
+    @property
+    def rpc_urls(self) -> List[str]:
+        """All configured RPC endpoints, deduplicated, primary first"""
+        urls = [self.MONAD_RPC_URL, self.QUICKNODE_RPC_URL] + self.RPC_URLS.split(",")
+        return list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+
 
 config = Config()
\ No newline at end of file
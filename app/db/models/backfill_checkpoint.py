@@ -0,0 +1,85 @@
+from sqlalchemy import (
+    Column,
+    String,
+    BigInteger,
+    DateTime,
+    func,
+)
+from app.db.database import Base
+from sqlalchemy.orm import Session
+from typing import Optional
+
+
+class BackfillCheckpoint(Base):
+    """Progress of a historical backfill job - every block below next_block is ingested"""
+    __tablename__ = "backfill_checkpoints"
+
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+
+    job = Column(String, primary_key=True)
+    from_block = Column(BigInteger, nullable=False)
+    to_block = Column(BigInteger, nullable=False)
+    next_block = Column(BigInteger, nullable=False)
+    status = Column(String, nullable=False, default=STATUS_RUNNING)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    @classmethod
+    def get_checkpoint(cls, db: Session, job: str) -> Optional['BackfillCheckpoint']:
+        """Get the checkpoint of a job"""
+        return db.query(cls).filter(cls.job == job).first()
+
+    @classmethod
+    def start(cls, db: Session, job: str, from_block: int, to_block: int,
+              restart: bool = False) -> 'BackfillCheckpoint':
+        """
+        Create a job's checkpoint, or resume an existing one
+
+        A resumed job keeps its progress and extends its range to `to_block`.
+
+        Args:
+            db: Database session
+            job: Job name
+            from_block: First block of the job (ignored when resuming)
+            to_block: Last block of the job (inclusive)
+            restart: Discard existing progress and start at from_block
+
+        Returns:
+            The job's checkpoint
+        """
+        try:
+            checkpoint = cls.get_checkpoint(db, job)
+
+            if checkpoint is None:
+                checkpoint = cls(job=job, from_block=from_block, to_block=to_block, next_block=from_block)
+                db.add(checkpoint)
+            elif restart:
+                checkpoint.from_block = from_block
+                checkpoint.next_block = from_block
+            checkpoint.to_block = max(to_block, checkpoint.next_block - 1)
+            checkpoint.status = cls.STATUS_RUNNING if checkpoint.next_block <= checkpoint.to_block else cls.STATUS_DONE
+
+            db.commit()
+            db.refresh(checkpoint)
+            return checkpoint
+
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    @classmethod
+    def advance(cls, db: Session, job: str, next_block: int) -> None:
+        """Record that every block below next_block is ingested, and commit"""
+        try:
+            checkpoint = cls.get_checkpoint(db, job)
+            checkpoint.next_block = next_block
+            if next_block > checkpoint.to_block:
+                checkpoint.status = cls.STATUS_DONE
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
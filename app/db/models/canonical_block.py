@@ -0,0 +1,69 @@
+from sqlalchemy import (
+    Column,
+    String,
+    BigInteger,
+)
+from app.db.database import Base
+from app.db.repository import insert_ignore
+from sqlalchemy.orm import Session
+from typing import Dict, List
+
+
+class CanonicalBlock(Base):
+    """Recent canonical block hashes - persists the in-memory chain tracker across restarts"""
+    __tablename__ = "canonical_blocks"
+
+    block_number = Column(BigInteger, primary_key=True)
+    block_hash = Column(String, nullable=False)
+
+    @classmethod
+    def get_recent(cls, db: Session, limit: int) -> Dict[int, str]:
+        """
+        Get the newest block hashes
+
+        Returns:
+            Dictionary of block_number -> block_hash
+        """
+        rows = db.query(cls).order_by(cls.block_number.desc()).limit(limit).all()
+        return {row.block_number: row.block_hash for row in rows}
+
+    @classmethod
+    def add_blocks_bulk(cls, db: Session, blocks: Dict[int, str]) -> int:
+        """
+        Insert many blocks, skipping blocks a concurrent writer already stored
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Number of rows inserted
+        """
+        if not blocks:
+            return 0
+
+        rows: List[Dict] = [
+            {"block_number": number, "block_hash": block_hash}
+            for number, block_hash in blocks.items()
+        ]
+        return len(insert_ignore(db, cls, rows))
+
+    @classmethod
+    def remove_from_block(cls, db: Session, from_block: int) -> int:
+        """
+        Delete blocks from a block onwards (orphaned by a reorg)
+
+        Does not commit - the caller owns the transaction.
+        """
+        return db.query(cls).filter(
+            cls.block_number >= from_block
+        ).delete(synchronize_session=False)
+
+    @classmethod
+    def prune(cls, db: Session, below_block: int) -> int:
+        """
+        Delete blocks older than the tracked window
+
+        Does not commit - the caller owns the transaction.
+        """
+        return db.query(cls).filter(
+            cls.block_number < below_block
+        ).delete(synchronize_session=False)
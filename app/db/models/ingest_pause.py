@@ -0,0 +1,73 @@
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    func,
+)
+from app.db.database import Base
+from app.db.repository import insert_ignore_one
+from sqlalchemy.orm import Session
+from typing import List
+
+
+class IngestPause(Base):
+    """
+    Request to pause ingestion while a maintenance job rewrites positions
+
+    A job (positions rebuild, backfill replay) inserts a row; the API
+    process stops taking new payloads, waits for in-flight ones, and sets
+    drained_at. The job then owns the positions until it deletes the row.
+    """
+    __tablename__ = "ingest_pauses"
+
+    name = Column(String, primary_key=True)  # job holding the pause
+    acquired_at = Column(DateTime(timezone=True), server_default=func.now())
+    drained_at = Column(DateTime(timezone=True), nullable=True)
+
+    @classmethod
+    def acquire(cls, db: Session, name: str) -> bool:
+        """
+        Request a pause and commit
+
+        Returns:
+            False if a job of the same name already holds the pause
+        """
+        try:
+            acquired = insert_ignore_one(db, cls, {"name": name}) is not None
+            db.commit()
+            return acquired
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    @classmethod
+    def release(cls, db: Session, name: str) -> None:
+        """Delete a job's pause and commit"""
+        try:
+            db.query(cls).filter(cls.name == name).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    @classmethod
+    def get_all(cls, db: Session) -> List['IngestPause']:
+        """Get every pause requested"""
+        return db.query(cls).all()
+
+    @classmethod
+    def is_drained(cls, db: Session, name: str) -> bool:
+        """Whether ingestion acknowledged a job's pause"""
+        return db.query(cls.drained_at).filter(cls.name == name).scalar() is not None
+
+    @classmethod
+    def mark_drained(cls, db: Session, names: List[str]) -> None:
+        """Record that no ingestion runs anymore for the given pauses, and commit"""
+        try:
+            db.query(cls).filter(cls.name.in_(names), cls.drained_at.is_(None)).update(
+                {cls.drained_at: func.now()}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
@@ -0,0 +1,173 @@
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    BigInteger,
+    Text,
+    DateTime,
+    func,
+    Index,
+)
+from app.db.database import Base
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional
+
+
+class IngestQueueItem(Base):
+    """
+    Raw webhook payload waiting to be ingested
+
+    The webhook appends payloads here and acknowledges right away; a
+    background consumer drains the queue in id order. Rows are kept after
+    processing so any range can be replayed.
+    """
+    __tablename__ = "ingest_queue"
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    payload = Column(Text, nullable=False)  # raw JSON body
+    status = Column(String, nullable=False, default=STATUS_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_ingest_queue_status_id', 'status', 'id'),
+    )
+
+    @classmethod
+    def enqueue(cls, db: Session, payload: str) -> int:
+        """
+        Append a raw payload and commit
+
+        Returns:
+            Queue id of the payload
+        """
+        item = cls(payload=payload, status=cls.STATUS_PENDING, attempts=0)
+        db.add(item)
+        db.commit()
+        return item.id
+
+    @classmethod
+    def claim_next(cls, db: Session) -> Optional['IngestQueueItem']:
+        """
+        Claim the oldest pending payload
+
+        The claim is a conditional UPDATE, so two consumers never take the
+        same row. Commits.
+
+        Returns:
+            The claimed item, or None if the queue is drained
+        """
+        while True:
+            item_id = db.query(cls.id).filter(
+                cls.status == cls.STATUS_PENDING
+            ).order_by(cls.id).limit(1).scalar()
+
+            if item_id is None:
+                return None
+
+            claimed = db.query(cls).filter(
+                cls.id == item_id,
+                cls.status == cls.STATUS_PENDING
+            ).update({
+                cls.status: cls.STATUS_PROCESSING,
+                cls.attempts: cls.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+
+            if claimed:
+                return db.get(cls, item_id)
+
+    @classmethod
+    def mark_done(cls, db: Session, item_id: int) -> None:
+        """Mark a payload as ingested and commit"""
+        db.query(cls).filter(cls.id == item_id).update({
+            cls.status: cls.STATUS_DONE,
+            cls.error: None,
+            cls.processed_at: func.now()
+        }, synchronize_session=False)
+        db.commit()
+
+    @classmethod
+    def mark_failed(cls, db: Session, item_id: int, error: str, retry: bool) -> None:
+        """Record a failed attempt - back to pending if it will be retried - and commit"""
+        db.query(cls).filter(cls.id == item_id).update({
+            cls.status: cls.STATUS_PENDING if retry else cls.STATUS_FAILED,
+            cls.error: error,
+            cls.processed_at: None if retry else func.now()
+        }, synchronize_session=False)
+        db.commit()
+
+    @classmethod
+    def release_claimed(cls, db: Session) -> int:
+        """
+        Put payloads claimed by a consumer that died back in the queue (call at startup)
+
+        Returns:
+            Number of payloads released
+        """
+        released = db.query(cls).filter(
+            cls.status == cls.STATUS_PROCESSING
+        ).update({cls.status: cls.STATUS_PENDING}, synchronize_session=False)
+        db.commit()
+        return released
+
+    @classmethod
+    def requeue(cls, db: Session, from_id: int, to_id: Optional[int] = None,
+                failed_only: bool = False) -> int:
+        """
+        Mark a range of payloads pending again for replay and commit
+
+        Ingestion is idempotent (processed transactions are skipped), so
+        replaying already ingested payloads is safe.
+
+        Returns:
+            Number of payloads requeued
+        """
+        query = db.query(cls).filter(
+            cls.id >= from_id,
+            cls.status != cls.STATUS_PROCESSING
+        )
+        if to_id is not None:
+            query = query.filter(cls.id <= to_id)
+        if failed_only:
+            query = query.filter(cls.status == cls.STATUS_FAILED)
+
+        requeued = query.update({
+            cls.status: cls.STATUS_PENDING,
+            cls.attempts: 0,
+            cls.error: None,
+            cls.processed_at: None
+        }, synchronize_session=False)
+        db.commit()
+        return requeued
+
+    @classmethod
+    def get_stats(cls, db: Session) -> Dict[str, Any]:
+        """
+        Queue depth per status and the oldest pending payload
+
+        Returns:
+            Dictionary with counts per status, oldest pending id and received_at
+        """
+        counts = dict(db.query(cls.status, func.count(cls.id)).group_by(cls.status).all())
+
+        oldest = db.query(cls.id, cls.received_at).filter(
+            cls.status.in_([cls.STATUS_PENDING, cls.STATUS_PROCESSING])
+        ).order_by(cls.id).first()
+
+        return {
+            "counts": {
+                status: counts.get(status, 0)
+                for status in (cls.STATUS_PENDING, cls.STATUS_PROCESSING, cls.STATUS_DONE, cls.STATUS_FAILED)
+            },
+            "oldest_pending_id": oldest.id if oldest else None,
+            "oldest_pending_received_at": oldest.received_at if oldest else None,
+            "last_id": db.query(func.max(cls.id)).scalar()
+        }
@@ -3,24 +3,33 @@ from sqlalchemy import (
     Column,
     String,
     BigInteger,
+    Integer,
     Numeric,
     Boolean,
     DateTime,
     func,
     Index,
+    UniqueConstraint,
+    tuple_,
 )
 from app.db.database import Base
+from app.db.repository import insert_ignore, insert_ignore_one
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Session
+from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Any, Dict, Iterable, List, Tuple
+
+# Columns of uq_nft_trade_side
+NFT_TRADE_KEY = ("tx_hash", "log_index", "is_sell")
 
 
 class NFTTrade(Base):
     __tablename__ = "nft_trades"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    tx_hash = Column(String, index=True, nullable=False, unique=True)
+    tx_hash = Column(String, index=True, nullable=False)
+    log_index = Column(Integer, nullable=False, default=0)
     block_number = Column(BigInteger, nullable=False, index=True)
     block_hash = Column(String, nullable=False)
 
@@ -30,12 +39,15 @@ class NFTTrade(Base):
     value_mon = Column(Numeric, nullable=False)
 
     is_sell = Column(Boolean, nullable=False, default=False)
+    realized_pnl_mon = Column(Numeric, nullable=True)  # sale value - cost of the wallet's last buy (sells)
 
     wallet = Column(String, index=True, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Composite indexes for common queries
+    # A sale is stored twice: a buy row for the buyer and a sell row for the seller
     __table_args__ = (
+        UniqueConstraint('tx_hash', 'log_index', 'is_sell', name='uq_nft_trade_side'),
         Index('ix_nft_wallet_timestamp', 'wallet', 'timestamp'),
         Index('ix_nft_contract_token', 'contract', 'token_id'),
         Index('ix_nft_block', 'block_number', 'block_hash'),
@@ -66,38 +78,137 @@ class NFTTrade(Base):
                       token_id: str,
                       value_mon: Decimal,
                       is_sell: bool,
-                      is_buy: bool,
-                      wallet: str) -> Optional['NFTTrade']:
+                      wallet: str,
+                      log_index: int = 0,
+                      realized_pnl_mon: Optional[Decimal] = None,
+                      timestamp: Optional[datetime] = None) -> Optional['NFTTrade']:
         """
         Add new NFT trade to database
 
+        Args:
+            timestamp: Block time of the sale (default: now)
+
         Returns:
             NFTTrade object if successful, existing trade if already exists
         """
         try:
-            if cls.exists(db, tx_hash):
-                return cls.get_nft_trade(db, tx_hash)
-
-            trade = cls(
-                tx_hash=tx_hash,
-                block_number=block_number,
-                block_hash=block_hash,
-                contract=contract,
-                token_id=token_id,
-                value_mon=value_mon,
-                is_sell=is_sell,
-                is_buy=is_buy,
-                wallet=wallet
-            )
-            db.add(trade)
+            values = {
+                "tx_hash": tx_hash,
+                "log_index": log_index,
+                "block_number": block_number,
+                "block_hash": block_hash,
+                "contract": contract,
+                "token_id": token_id,
+                "value_mon": value_mon,
+                "is_sell": is_sell,
+                "wallet": wallet,
+                "realized_pnl_mon": realized_pnl_mon
+            }
+            if timestamp is not None:
+                values["timestamp"] = timestamp
+            trade = insert_ignore_one(db, cls, values, conflict_columns=NFT_TRADE_KEY)
             db.commit()
-            db.refresh(trade)
-            return trade
+            if trade is not None:
+                return trade
+            return db.query(cls).filter_by(tx_hash=tx_hash, log_index=log_index, is_sell=is_sell).first()
 
         except Exception as e:
             db.rollback()
             raise e
 
+    @classmethod
+    def add_nft_trades_bulk(cls, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many NFT trades with INSERT ... ON CONFLICT DO NOTHING
+
+        Does not commit - the caller owns the transaction.
+
+        Args:
+            db: Database session
+            rows: Dictionaries with the NFT trade column values
+
+        Returns:
+            Number of rows inserted
+        """
+        return len(insert_ignore(db, cls, rows, conflict_columns=NFT_TRADE_KEY))
+
+    @classmethod
+    def get_last_buys(
+            cls,
+            db: Session,
+            items: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str, str], Decimal]:
+        """
+        Get the price each current holder paid for the given NFTs (single query)
+
+        Looks the NFTs up by (contract, token_id), i.e. on ix_nft_contract_token,
+        and replays their trades in chain order: a buy sets the wallet's cost,
+        a sell clears it.
+
+        Args:
+            db: Database session
+            items: (contract, token_id) pairs
+
+        Returns:
+            Dictionary of (wallet, contract, token_id) -> value_mon of the
+            wallet's latest buy, for wallets that haven't sold since
+        """
+        items = list(set(items))
+        if not items:
+            return {}
+
+        rows = db.query(
+            cls.wallet, cls.contract, cls.token_id, cls.value_mon, cls.is_sell
+        ).filter(
+            tuple_(cls.contract, cls.token_id).in_(items)
+        ).order_by(cls.block_number, cls.log_index).all()
+
+        costs = {}
+        for row in rows:
+            key = (row.wallet, row.contract, row.token_id)
+            if row.is_sell:
+                costs.pop(key, None)
+            else:
+                costs[key] = row.value_mon
+        return costs
+
+    @classmethod
+    def get_wallet_stats(cls, db: Session, wallet: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Aggregate a wallet's NFT trades in one query
+
+        Args:
+            db: Database session
+            wallet: Wallet address
+            since: Only count trades at or after this time
+
+        Returns:
+            Dictionary with trade counts, buy/sell volume and realized PnL in MON
+        """
+        query = db.query(
+            func.count(cls.id).label("trades"),
+            func.count(cls.id).filter(cls.is_sell.is_(True)).label("sells"),
+            func.sum(cls.value_mon).filter(cls.is_sell.is_(False)).label("buy_volume"),
+            func.sum(cls.value_mon).filter(cls.is_sell.is_(True)).label("sell_volume"),
+            func.sum(cls.realized_pnl_mon).label("realized_pnl")
+        ).filter(cls.wallet == wallet)
+
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+
+        row = query.one()
+        trades = int(row.trades or 0)
+        sells = int(row.sells or 0)
+
+        return {
+            "trades": trades,
+            "buys": trades - sells,
+            "sells": sells,
+            "buy_volume_mon": Decimal(row.buy_volume or 0),
+            "sell_volume_mon": Decimal(row.sell_volume or 0),
+            "realized_pnl_mon": Decimal(row.realized_pnl or 0)
+        }
+
     @classmethod
     def remove_nft_trade(cls, db: Session, tx_hash: str) -> bool:
         """
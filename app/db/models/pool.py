@@ -6,8 +6,9 @@ from sqlalchemy import (
     Index,
 )
 from app.db.database import Base
+from app.db.repository import insert_ignore, insert_ignore_one
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Dict, Iterable, Tuple
 
 
 class Pool(Base):
@@ -43,6 +44,24 @@ class Pool(Base):
         except Exception:
             return None
 
+    @classmethod
+    def get_pools(cls, db: Session, addresses: Iterable[str]) -> Dict[str, 'Pool']:
+        """
+        Get many pools in a single query
+
+        Returns:
+            Dictionary of address -> Pool for the pools that exist
+        """
+        addresses = list(set(addresses))
+        if not addresses:
+            return {}
+
+        try:
+            pools = db.query(cls).filter(cls.address.in_(addresses)).all()
+            return {pool.address: pool for pool in pools}
+        except Exception:
+            return {}
+
     @classmethod
     def add_pool(cls, db: Session, address: str, token0: str, token1: str) -> Optional['Pool']:
         """
@@ -55,21 +74,39 @@ class Pool(Base):
             token1: Second token address
 
         Returns:
-            Pool object if successful, None otherwise
+            Pool object, the existing one if the pool is already stored
         """
         try:
-            if cls.exists(db, address):
-                return cls.get_pool(db, address)
-
-            pool = cls(
-                address=address,
-                token0=token0,
-                token1=token1
-            )
-            db.add(pool)
+            pool = insert_ignore_one(db, cls, {"address": address, "token0": token0, "token1": token1})
+            db.commit()
+            return pool if pool is not None else cls.get_pool(db, address)
+
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    @classmethod
+    def add_pools_bulk(cls, db: Session, pools: Dict[str, Tuple[str, str]]) -> int:
+        """
+        Add many pools with INSERT ... ON CONFLICT DO NOTHING
+
+        Args:
+            db: Database session
+            pools: Dictionary of address -> (token0, token1)
+
+        Returns:
+            Number of pools inserted
+        """
+        if not pools:
+            return 0
+
+        try:
+            inserted = insert_ignore(db, cls, [
+                {"address": address, "token0": token0, "token1": token1}
+                for address, (token0, token1) in pools.items()
+            ])
             db.commit()
-            db.refresh(pool)
-            return pool
+            return len(inserted)
 
         except Exception as e:
             db.rollback()
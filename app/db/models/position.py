@@ -5,11 +5,20 @@ from sqlalchemy import (
     DateTime,
     func,
     Index,
+    MetaData,
+    Table,
+    case,
+    delete,
+    insert,
+    select,
+    tuple_,
+    update,
 )
 from app.db.database import Base
+from app.db.repository import dialect_insert, insert_ignore_one
 from sqlalchemy.orm import Session
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Optional, Dict, Iterable, List, Tuple
 
 
 class Position(Base):
@@ -27,6 +36,8 @@ class Position(Base):
 
     # PnL tracking
     realized_pnl_mon = Column(Numeric(precision=36, scale=18), nullable=False, default=0)
+    unrealized_pnl_mon = Column(Numeric(precision=36, scale=18), nullable=False, default=0)  # at the last reprice
+    total_pnl_mon = Column(Numeric(precision=36, scale=18), nullable=False, default=0)  # realized + unrealized, for ranking
 
     # Trade statistics
     total_bought = Column(Numeric(precision=36, scale=18), nullable=False, default=0)
@@ -41,9 +52,25 @@ class Position(Base):
         onupdate=func.now()
     )
 
+    # Realized PnL of the last trade (0 for buys) - returned by the atomic trade upserts
+    last_trade_pnl_mon = Column(Numeric(precision=36, scale=18), nullable=False, default=0, server_default="0")
+
+    # Columns that make up the position state (everything but keys and timestamps)
+    STATE_FIELDS = (
+        "amount",
+        "average_entry_price_mon",
+        "total_cost_mon",
+        "realized_pnl_mon",
+        "unrealized_pnl_mon",
+        "total_bought",
+        "total_sold",
+        "trade_count",
+    )
+
     __table_args__ = (
         Index('ix_position_wallet_token', 'wallet', 'token'),
         Index('ix_position_amount', 'amount'),  # For filtering non-zero positions
+        Index('ix_position_total_pnl', 'total_pnl_mon', 'wallet', 'token'),  # Leaderboard keyset scans
     )
 
     @classmethod
@@ -62,6 +89,162 @@ class Position(Base):
         except Exception:
             return None
 
+    @classmethod
+    def get_positions(cls, db: Session, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], 'Position']:
+        """
+        Get many positions in a single query
+
+        Args:
+            db: Database session
+            keys: (wallet, token) pairs
+
+        Returns:
+            Dictionary of (wallet, token) -> Position for the rows that exist
+        """
+        keys = list(set(keys))
+        if not keys:
+            return {}
+
+        rows = db.query(cls).filter(tuple_(cls.wallet, cls.token).in_(keys)).all()
+        return {(row.wallet, row.token): row for row in rows}
+
+    @classmethod
+    def get_leaderboard_page(
+            cls,
+            db: Session,
+            limit: int,
+            after: Optional[Tuple[Decimal, str, str]] = None
+    ) -> List['Position']:
+        """
+        Get open positions ranked by total PnL, one page at a time
+
+        Ordered by (total_pnl_mon, wallet, token) descending, so the page is
+        a backward scan of ix_position_total_pnl and `after` is a keyset
+        cursor rather than an offset.
+
+        Args:
+            db: Database session
+            limit: Page size
+            after: (total_pnl_mon, wallet, token) of the last row of the previous page
+
+        Returns:
+            Positions of the page, best first
+        """
+        query = db.query(cls).filter(cls.amount > 0)
+
+        if after is not None:
+            query = query.filter(tuple_(cls.total_pnl_mon, cls.wallet, cls.token) < tuple_(*after))
+
+        return query.order_by(
+            cls.total_pnl_mon.desc(),
+            cls.wallet.desc(),
+            cls.token.desc()
+        ).limit(limit).all()
+
+    @classmethod
+    def new_position(
+            cls,
+            wallet: str,
+            token: str,
+            initial_amount: Decimal,
+            entry_price_mon: Decimal
+    ) -> 'Position':
+        """
+        Build a position from its first trade without touching the session
+
+        Args:
+            wallet: Wallet address
+            token: Token address
+            initial_amount: Initial token amount
+            entry_price_mon: Price per token in MON
+
+        Returns:
+            Transient Position object
+        """
+        return cls(
+            wallet=wallet,
+            token=token,
+            amount=initial_amount,
+            average_entry_price_mon=entry_price_mon,
+            total_cost_mon=initial_amount * entry_price_mon,
+            realized_pnl_mon=Decimal(0),
+            unrealized_pnl_mon=Decimal(0),
+            total_bought=initial_amount,
+            total_sold=Decimal(0),
+            total_pnl_mon=Decimal(0),
+            trade_count=1,
+            last_trade_pnl_mon=Decimal(0)
+        )
+
+    def refresh_total_pnl(self) -> None:
+        """Recompute the stored total PnL after realized or unrealized PnL changed"""
+        self.total_pnl_mon = self.get_total_pnl(self)
+
+    def apply_buy(self, buy_amount: Decimal, buy_price_mon: Decimal) -> None:
+        """
+        Apply a buy in memory - recalculates weighted average entry price
+
+        Args:
+            buy_amount: Amount of tokens bought
+            buy_price_mon: Price per token in MON
+        """
+        additional_cost = buy_amount * buy_price_mon
+        new_total_cost = self.total_cost_mon + additional_cost
+        new_amount = self.amount + buy_amount
+
+        self.average_entry_price_mon = new_total_cost / new_amount if new_amount > 0 else Decimal(0)
+        self.total_cost_mon = new_total_cost
+        self.amount = new_amount
+        self.total_bought += buy_amount
+        self.trade_count += 1
+        self.last_trade_pnl_mon = Decimal(0)
+        self.refresh_total_pnl()
+
+    def apply_sell(self, sell_amount: Decimal, sell_price_mon: Decimal) -> Decimal:
+        """
+        Apply a sell in memory - realizes PnL against the average entry price
+
+        Args:
+            sell_amount: Amount of tokens sold
+            sell_price_mon: Price per token in MON received
+
+        Returns:
+            Realized PnL of this sell in MON
+        """
+        # PnL = (sell_price - avg_entry_price) * sell_amount
+        pnl = (sell_price_mon - self.average_entry_price_mon) * sell_amount
+        self.realized_pnl_mon += pnl
+
+        # Update position size
+        new_amount = self.amount - sell_amount
+
+        if new_amount > 0:
+            # Partial sell - reduce cost basis proportionally
+            cost_of_sold_portion = self.average_entry_price_mon * sell_amount
+            self.total_cost_mon -= cost_of_sold_portion
+            self.amount = new_amount
+        elif new_amount == 0:
+            # Complete close - position is flat
+            self.amount = Decimal(0)
+            self.total_cost_mon = Decimal(0)
+            self.average_entry_price_mon = Decimal(0)
+        else:
+            # Oversell - went short or error
+            self.amount = new_amount
+            # Keep entry price for tracking, but cost basis is zero
+            self.total_cost_mon = Decimal(0)
+
+        if new_amount <= 0:
+            # Nothing left to mark to market - drop the last reprice
+            self.unrealized_pnl_mon = Decimal(0)
+
+        self.total_sold += sell_amount
+        self.trade_count += 1
+        self.last_trade_pnl_mon = pnl
+        self.refresh_total_pnl()
+
+        return pnl
+
     @classmethod
     def create_position(
             cls,
@@ -82,32 +265,85 @@ class Position(Base):
             entry_price_mon: Price per token in MON
 
         Returns:
-            Position object if successful
+            Position object, the existing one if the position was created concurrently
         """
         try:
-            if cls.exists(db, wallet, token):
-                return cls.get_position(db, wallet, token)
-
-            total_cost = initial_amount * entry_price_mon
-
-            position = cls(
-                wallet=wallet,
-                token=token,
-                amount=initial_amount,
-                average_entry_price_mon=entry_price_mon,
-                total_cost_mon=total_cost,
-                total_bought=initial_amount,
-                trade_count=1
-            )
-            db.add(position)
+            row = cls.new_position(wallet, token, initial_amount, entry_price_mon).to_row()
+            row.pop("first_trade_at")  # server default
+
+            position = insert_ignore_one(db, cls, row)
             db.commit()
-            db.refresh(position)
-            return position
+            return position if position is not None else cls.get_position(db, wallet, token)
 
         except Exception as e:
             db.rollback()
             raise e
 
+    @classmethod
+    def upsert_trade_states(cls, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write positions whose trades were applied in memory (write-behind flush)
+
+        One INSERT ... ON CONFLICT DO UPDATE executemany. Unrealized PnL is
+        owned by mark-to-market, so existing open rows keep theirs (flat or
+        short ones drop it) and the total PnL is recomputed from it. Does
+        not commit - the caller owns the transaction.
+
+        Args:
+            db: Database session
+            rows: Position.to_row() dictionaries
+
+        Returns:
+            Number of positions written
+        """
+        if not rows:
+            return 0
+
+        rows = [{key: value for key, value in row.items() if key != "first_trade_at"} for row in rows]
+
+        stmt = dialect_insert(db, cls)
+        set_ = {
+            field: stmt.excluded[field]
+            for field in cls.STATE_FIELDS + ("last_trade_pnl_mon",)
+            if field != "unrealized_pnl_mon"
+        }
+        unrealized = case((stmt.excluded.amount > 0, cls.unrealized_pnl_mon), else_=0)
+        set_["unrealized_pnl_mon"] = unrealized
+        set_["total_pnl_mon"] = stmt.excluded.realized_pnl_mon + unrealized
+        set_["last_updated"] = func.now()
+
+        db.execute(stmt.on_conflict_do_update(index_elements=[cls.wallet, cls.token], set_=set_), rows)
+        return len(rows)
+
+    @classmethod
+    def _upsert_trade(
+            cls,
+            db: Session,
+            wallet: str,
+            token: str,
+            initial_amount: Decimal,
+            price_mon: Decimal,
+            set_: Dict[str, Any]
+    ) -> 'Position':
+        """
+        Open a position from its first trade, or apply `set_` to the existing row
+
+        One INSERT ... ON CONFLICT DO UPDATE ... RETURNING: the new state is
+        computed by the database from the row as it is when the statement
+        runs, so concurrent writers of a position can't lose each other's
+        updates. Does not commit - the caller owns the transaction.
+        """
+        row = cls.new_position(wallet, token, initial_amount, price_mon).to_row()
+        row.pop("first_trade_at")  # server default
+
+        stmt = dialect_insert(db, cls).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.wallet, cls.token],
+            set_={**set_, "last_updated": func.now()}
+        ).returning(cls)
+
+        return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
     @classmethod
     def update_on_buy(
             cls,
@@ -118,9 +354,10 @@ class Position(Base):
             buy_price_mon: Decimal
     ) -> Optional['Position']:
         """
-        Update position when buying more tokens
+        Update position when buying more tokens (creates it on the first buy)
 
-        Recalculates weighted average entry price
+        Recalculates weighted average entry price in SQL, like apply_buy.
+        Does not commit - the caller owns the transaction.
 
         Args:
             db: Database session
@@ -132,31 +369,18 @@ class Position(Base):
         Returns:
             Updated Position object
         """
-        try:
-            position = cls.get_position(db, wallet, token)
-
-            if not position:
-                # Create new position if it doesn't exist
-                return cls.create_position(db, wallet, token, buy_amount, buy_price_mon)
-
-            # Calculate new weighted average entry price
-            additional_cost = buy_amount * buy_price_mon
-            new_total_cost = position.total_cost_mon + additional_cost
-            new_amount = position.amount + buy_amount
-
-            position.average_entry_price_mon = new_total_cost / new_amount if new_amount > 0 else Decimal(0)
-            position.total_cost_mon = new_total_cost
-            position.amount = new_amount
-            position.total_bought += buy_amount
-            position.trade_count += 1
-
-            db.commit()
-            db.refresh(position)
-            return position
-
-        except Exception as e:
-            db.rollback()
-            raise e
+        new_amount = cls.amount + buy_amount
+        new_total_cost = cls.total_cost_mon + buy_amount * buy_price_mon
+
+        return cls._upsert_trade(db, wallet, token, buy_amount, buy_price_mon, {
+            "amount": new_amount,
+            "total_cost_mon": new_total_cost,
+            "average_entry_price_mon": case((new_amount > 0, new_total_cost / new_amount), else_=0),
+            "total_bought": cls.total_bought + buy_amount,
+            "trade_count": cls.trade_count + 1,
+            "last_trade_pnl_mon": 0,
+            "total_pnl_mon": cls.realized_pnl_mon + cls.unrealized_pnl_mon,
+        })
 
     @classmethod
     def update_on_sell(
@@ -170,7 +394,9 @@ class Position(Base):
         """
         Update position when selling tokens
 
-        Calculates realized PnL based on average entry price
+        Realizes PnL against the average entry price in SQL, like
+        apply_sell. Without a position the sell opens it short, with no
+        PnL. Does not commit - the caller owns the transaction.
 
         Args:
             db: Database session
@@ -182,52 +408,26 @@ class Position(Base):
         Returns:
             Updated Position object
         """
-        try:
-            position = cls.get_position(db, wallet, token)
-
-            if not position:
-                # No position exists - this shouldn't happen normally
-                # Create position with negative amount (short position)
-                position = cls.create_position(db, wallet, token, -sell_amount, sell_price_mon)
-                position.realized_pnl_mon = Decimal(0)  # No PnL on first sell
-                db.commit()
-                db.refresh(position)
-                return position
-
-            # Calculate realized PnL
-            # PnL = (sell_price - avg_entry_price) * sell_amount
-            pnl = (sell_price_mon - position.average_entry_price_mon) * sell_amount
-            position.realized_pnl_mon += pnl
-
-            # Update position size
-            new_amount = position.amount - sell_amount
-
-            if new_amount > 0:
-                # Partial sell - reduce cost basis proportionally
-                cost_of_sold_portion = position.average_entry_price_mon * sell_amount
-                position.total_cost_mon -= cost_of_sold_portion
-                position.amount = new_amount
-            elif new_amount == 0:
-                # Complete close - position is flat
-                position.amount = Decimal(0)
-                position.total_cost_mon = Decimal(0)
-                position.average_entry_price_mon = Decimal(0)
-            else:
-                # Oversell - went short or error
-                position.amount = new_amount
-                # Keep entry price for tracking, but cost basis is zero
-                position.total_cost_mon = Decimal(0)
-
-            position.total_sold += sell_amount
-            position.trade_count += 1
-
-            db.commit()
-            db.refresh(position)
-            return position
-
-        except Exception as e:
-            db.rollback()
-            raise e
+        # PnL = (sell_price - avg_entry_price) * sell_amount
+        pnl = (sell_price_mon - cls.average_entry_price_mon) * sell_amount
+        new_amount = cls.amount - sell_amount
+
+        return cls._upsert_trade(db, wallet, token, -sell_amount, sell_price_mon, {
+            "amount": new_amount,
+            # Partial sell reduces the cost basis proportionally; flat or short has none
+            "total_cost_mon": case(
+                (new_amount > 0, cls.total_cost_mon - cls.average_entry_price_mon * sell_amount), else_=0
+            ),
+            # Entry price is kept when short, for tracking
+            "average_entry_price_mon": case((new_amount == 0, 0), else_=cls.average_entry_price_mon),
+            "realized_pnl_mon": cls.realized_pnl_mon + pnl,
+            "total_sold": cls.total_sold + sell_amount,
+            "trade_count": cls.trade_count + 1,
+            "last_trade_pnl_mon": pnl,
+            # Flat or short has nothing to mark to market - drop the last reprice
+            "unrealized_pnl_mon": case((new_amount > 0, cls.unrealized_pnl_mon), else_=0),
+            "total_pnl_mon": cls.realized_pnl_mon + pnl + case((new_amount > 0, cls.unrealized_pnl_mon), else_=0),
+        })
 
     @classmethod
     def update_unrealized_pnl(
@@ -261,6 +461,7 @@ class Position(Base):
             position.unrealized_pnl_mon = (
                     (current_price_mon - position.average_entry_price_mon) * position.amount
             )
+            position.refresh_total_pnl()
 
             db.commit()
             db.refresh(position)
@@ -270,6 +471,100 @@ class Position(Base):
             db.rollback()
             raise e
 
+    @classmethod
+    def reprice_tokens(cls, db: Session, prices: Dict[str, Decimal]) -> Dict[str, int]:
+        """
+        Mark every open position of each token to a new price
+
+        One set-based UPDATE per token, no rows loaded into Python:
+        unrealized = (price - avg_entry_price) * amount, and the stored
+        total PnL follows. Does not commit - the caller owns the transaction.
+
+        Args:
+            db: Database session
+            prices: Token address -> current price per token in MON
+
+        Returns:
+            Dictionary of token -> number of positions repriced
+        """
+        table = cls.__table__
+        counts = {}
+
+        for token, price in prices.items():
+            unrealized = (price - table.c.average_entry_price_mon) * table.c.amount
+            result = db.execute(
+                update(table)
+                .where(table.c.token == token, table.c.amount > 0)
+                .values(
+                    unrealized_pnl_mon=unrealized,
+                    total_pnl_mon=table.c.realized_pnl_mon + unrealized
+                )
+            )
+            counts[token] = result.rowcount
+
+        return counts
+
+    def to_row(self) -> Dict[str, Any]:
+        """Column values of this position, for bulk inserts"""
+        row = {field: getattr(self, field) for field in self.STATE_FIELDS}
+        row.update(
+            wallet=self.wallet,
+            token=self.token,
+            total_pnl_mon=self.total_pnl_mon,
+            last_trade_pnl_mon=self.last_trade_pnl_mon,
+            first_trade_at=self.first_trade_at
+        )
+        return row
+
+    @classmethod
+    def staging_table(cls, name: str = "positions_rebuild") -> Table:
+        """
+        Table with the positions columns (primary key only, no secondary indexes)
+
+        Rebuilds fill it, then replace_all copies it over the live table.
+        """
+        table = cls.__table__.to_metadata(MetaData(), name=name)
+        table.indexes.clear()
+        return table
+
+    @classmethod
+    def replace_all(cls, db: Session, source: Table) -> int:
+        """
+        Replace every position with the rows of a staging table
+
+        Does not commit - the caller owns the transaction, so readers see
+        either the old or the new positions.
+
+        Returns:
+            Number of positions inserted
+        """
+        columns = [column.name for column in source.columns if column.name != "last_updated"]
+        db.execute(delete(cls))
+        result = db.execute(
+            insert(cls).from_select(columns, select(*[source.c[column] for column in columns]))
+        )
+        return result.rowcount
+
+    @classmethod
+    def replace_wallets(cls, db: Session, wallets: List[str], rows: List[Dict[str, Any]]) -> int:
+        """
+        Replace every position of some wallets with rebuilt rows
+
+        Does not commit - the caller owns the transaction.
+
+        Args:
+            db: Database session
+            wallets: Wallet addresses
+            rows: Position.to_row() dictionaries of those wallets
+
+        Returns:
+            Number of positions inserted
+        """
+        db.execute(delete(cls).where(cls.wallet.in_(wallets)))
+        if rows:
+            db.execute(insert(cls), rows)
+        return len(rows)
+
     @classmethod
     def get_total_pnl(cls, position: 'Position') -> Decimal:
         """
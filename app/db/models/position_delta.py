@@ -0,0 +1,147 @@
+from sqlalchemy import (
+    Column,
+    String,
+    BigInteger,
+    Numeric,
+    Boolean,
+    Index,
+)
+from app.db.database import Base
+from app.db.repository import insert_ignore
+from app.db.models.position import Position
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class PositionDelta(Base):
+    """
+    Undo record for a position, one per (block, wallet, token)
+
+    Holds the position state from before the first trade of the block
+    touched it, so a reorg can restore exactly the pre-fork state of the
+    affected positions. Only the last REORG_MAX_DEPTH blocks are kept.
+    """
+    __tablename__ = "position_deltas"
+
+    block_number = Column(BigInteger, primary_key=True)
+    wallet = Column(String, primary_key=True)
+    token = Column(String, primary_key=True)
+
+    # False = position didn't exist before this block (undo deletes it)
+    existed = Column(Boolean, nullable=False, default=True)
+
+    amount = Column(Numeric(precision=36, scale=18), nullable=True)
+    average_entry_price_mon = Column(Numeric(precision=36, scale=18), nullable=True)
+    total_cost_mon = Column(Numeric(precision=36, scale=18), nullable=True)
+    realized_pnl_mon = Column(Numeric(precision=36, scale=18), nullable=True)
+    unrealized_pnl_mon = Column(Numeric(precision=36, scale=18), nullable=True)
+    total_bought = Column(Numeric(precision=36, scale=18), nullable=True)
+    total_sold = Column(Numeric(precision=36, scale=18), nullable=True)
+    trade_count = Column(Numeric, nullable=True)
+
+    __table_args__ = (
+        Index('ix_position_delta_block', 'block_number'),
+    )
+
+    @classmethod
+    def build(cls, block_number: int, wallet: str, token: str,
+              position: Optional[Position]) -> Dict[str, Any]:
+        """
+        Build an undo row from the position state before a block's first trade
+
+        Args:
+            block_number: Block whose trades are about to change the position
+            wallet: Wallet address
+            token: Token address
+            position: Current position, or None if it doesn't exist yet
+
+        Returns:
+            Column values for a PositionDelta row
+        """
+        row = {"block_number": block_number, "wallet": wallet, "token": token, "existed": position is not None}
+        for field in Position.STATE_FIELDS:
+            row[field] = getattr(position, field) if position is not None else None
+        return row
+
+    @classmethod
+    def get_recorded_keys(cls, db: Session, block_numbers: Iterable[int]) -> Set[Tuple[int, str, str]]:
+        """
+        Get which (block, wallet, token) undo records already exist (single query)
+
+        Args:
+            db: Database session
+            block_numbers: Blocks to check
+
+        Returns:
+            Set of (block_number, wallet, token)
+        """
+        block_numbers = list(set(block_numbers))
+        if not block_numbers:
+            return set()
+
+        rows = db.query(cls.block_number, cls.wallet, cls.token).filter(
+            cls.block_number.in_(block_numbers)
+        ).all()
+        return {(row.block_number, row.wallet, row.token) for row in rows}
+
+    @classmethod
+    def add_deltas_bulk(cls, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many undo records, keeping the earlier record on conflict
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Number of rows inserted
+        """
+        if not rows:
+            return 0
+
+        return len(insert_ignore(db, cls, rows))
+
+    @classmethod
+    def get_from_block(cls, db: Session, from_block: int) -> List['PositionDelta']:
+        """Get undo records from a block onwards, oldest block first"""
+        return db.query(cls).filter(
+            cls.block_number >= from_block
+        ).order_by(cls.block_number).all()
+
+    @classmethod
+    def remove_from_block(cls, db: Session, from_block: int) -> int:
+        """
+        Delete undo records from a block onwards
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Number of rows deleted
+        """
+        return db.query(cls).filter(
+            cls.block_number >= from_block
+        ).delete(synchronize_session=False)
+
+    @classmethod
+    def remove_wallets(cls, db: Session, wallets: List[str]) -> int:
+        """
+        Delete the undo records of some wallets (their positions were rebuilt)
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Number of rows deleted
+        """
+        return db.query(cls).filter(cls.wallet.in_(wallets)).delete(synchronize_session=False)
+
+    @classmethod
+    def prune(cls, db: Session, below_block: int) -> int:
+        """
+        Delete undo records older than the reorg window
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Number of rows deleted
+        """
+        return db.query(cls).filter(
+            cls.block_number < below_block
+        ).delete(synchronize_session=False)
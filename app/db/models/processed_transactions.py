@@ -7,8 +7,9 @@ from sqlalchemy import (
     Index,
 )
 from app.db.database import Base
+from app.db.repository import insert_ignore, insert_ignore_one
 from sqlalchemy.orm import Session
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Iterable, List, Set
 
 
 class ProcessedTransaction(Base):
@@ -41,10 +42,63 @@ class ProcessedTransaction(Base):
             return None
 
     @classmethod
-    def add_processed(cls, db: Session, tx_hash: str, block_number: int, block_hash: str) -> Optional[
-        'ProcessedTransaction']:
+    def get_processed_hashes(cls, db: Session, tx_hashes: Iterable[str]) -> Set[str]:
         """
-        Mark transaction as processed
+        Get which of the given transactions are already processed (single query)
+
+        Args:
+            db: Database session
+            tx_hashes: Transaction hashes to check
+
+        Returns:
+            Set of hashes that are already processed
+        """
+        tx_hashes = list(set(tx_hashes))
+        if not tx_hashes:
+            return set()
+
+        rows = db.query(cls.tx_hash).filter(cls.tx_hash.in_(tx_hashes)).all()
+        return {row.tx_hash for row in rows}
+
+    @classmethod
+    def add_processed_bulk(cls, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Claim many transactions with INSERT ... ON CONFLICT DO NOTHING
+
+        A transaction already marked - also by a concurrent writer that
+        committed first - is not inserted again, so a result lower than
+        len(rows) means another writer got there first.
+        Does not commit - the caller owns the transaction.
+
+        Args:
+            db: Database session
+            rows: Dictionaries with tx_hash, block_number, block_hash
+
+        Returns:
+            Number of rows inserted
+        """
+        return len(insert_ignore(db, cls, rows))
+
+    @classmethod
+    def claim_many(cls, db: Session, rows: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Like add_processed_bulk, but tell which transactions this writer claimed
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Hashes of the transactions that weren't marked yet
+        """
+        return {row.tx_hash for row in insert_ignore(db, cls, rows)}
+
+    @classmethod
+    def add_processed(cls, db: Session, tx_hash: str, block_number: int, block_hash: str) -> bool:
+        """
+        Claim a transaction for processing
+
+        Written in the transaction that stores the swap, so the swap and
+        its marker are committed together. Does not commit - the caller
+        owns the transaction.
 
         Args:
             db: Database session
@@ -53,25 +107,13 @@ class ProcessedTransaction(Base):
             block_hash: Block hash
 
         Returns:
-            ProcessedTransaction object if successful, None if already exists
+            True if claimed, False if the transaction was already processed
         """
-        try:
-            if cls.is_processed(db, tx_hash):
-                return cls.get_processed(db, tx_hash)
-
-            tx = cls(
-                tx_hash=tx_hash,
-                block_number=block_number,
-                block_hash=block_hash
-            )
-            db.add(tx)
-            db.commit()
-            db.refresh(tx)
-            return tx
-
-        except Exception as e:
-            db.rollback()
-            raise e
+        return insert_ignore_one(db, cls, {
+            "tx_hash": tx_hash,
+            "block_number": block_number,
+            "block_hash": block_hash
+        }) is not None
 
     @classmethod
     def remove_processed(cls, db: Session, tx_hash: str) -> bool:
@@ -3,6 +3,7 @@ from sqlalchemy import (
     Column,
     String,
     BigInteger,
+    Integer,
     Numeric,
     Boolean,
     DateTime,
@@ -10,10 +11,12 @@ from sqlalchemy import (
     Index,
 )
 from app.db.database import Base
+from app.db.repository import insert_ignore, insert_ignore_one
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Session
+from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Any, Dict, Iterator, List
 
 
 class Swap(Base):
@@ -22,6 +25,7 @@ class Swap(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tx_hash = Column(String, index=True, nullable=False, unique=True)
     block_number = Column(BigInteger, nullable=False, index=True)
+    log_index = Column(Integer, nullable=False, default=0, server_default="0")
     block_hash = Column(String, nullable=False)
     pool = Column(String, nullable=True, index=True)
 
@@ -35,6 +39,7 @@ class Swap(Base):
 
     mon_amount = Column(Numeric, nullable=False)
     is_sell = Column(Boolean, nullable=False, default=False)
+    realized_pnl_mon = Column(Numeric, nullable=True)  # PnL realized by this trade (sells)
 
     wallet = Column(String, index=True, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -43,6 +48,7 @@ class Swap(Base):
     __table_args__ = (
         Index('ix_swap_wallet_timestamp', 'wallet', 'timestamp'),
         Index('ix_swap_block', 'block_number', 'block_hash'),
+        Index('ix_swap_wallet_block', 'wallet', 'block_number', 'log_index'),  # Chain-ordered scans per wallet
     )
 
     @classmethod
@@ -75,41 +81,157 @@ class Swap(Base):
                  amount_out: Decimal,
                  mon_amount: Decimal,
                  is_sell: bool,
-                 wallet: str) -> Optional['Swap']:
+                 wallet: str,
+                 realized_pnl_mon: Optional[Decimal] = None,
+                 log_index: int = 0,
+                 timestamp: Optional[datetime] = None) -> Optional['Swap']:
         """
-        Add new swap to database
+        Add new swap to database with INSERT ... ON CONFLICT DO NOTHING
+
+        Does not commit - the caller owns the transaction.
+
+        Args:
+            timestamp: Block time of the swap (default: now)
+
+        Returns:
+            Swap object if inserted, None if the swap already exists
+        """
+        values = {
+            "tx_hash": tx_hash,
+            "block_number": block_number,
+            "log_index": log_index,
+            "block_hash": block_hash,
+            "pool": pool,
+            "token_in": token_in,
+            "token_out": token_out,
+            "amount_in_raw": amount_in_raw,
+            "amount_out_raw": amount_out_raw,
+            "amount_in": amount_in,
+            "amount_out": amount_out,
+            "mon_amount": mon_amount,
+            "is_sell": is_sell,
+            "wallet": wallet,
+            "realized_pnl_mon": realized_pnl_mon
+        }
+        if timestamp is not None:
+            values["timestamp"] = timestamp
+        return insert_ignore_one(db, cls, values, conflict_columns=["tx_hash"])
+
+    @classmethod
+    def add_swaps_bulk(cls, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many swaps with INSERT ... ON CONFLICT (tx_hash) DO NOTHING
+
+        Does not commit - the caller owns the transaction.
+
+        Args:
+            db: Database session
+            rows: Dictionaries with the swap column values
 
         Returns:
-            Swap object if successful, existing Swap if already exists
+            Number of rows inserted
         """
+        return len(insert_ignore(db, cls, rows, conflict_columns=["tx_hash"]))
+
+    @classmethod
+    def set_realized_pnl(cls, db: Session, tx_hash: str, realized_pnl_mon: Decimal) -> None:
+        """Store the PnL a swap realized once its position was updated, and commit"""
         try:
-            if cls.exists(db, tx_hash):
-                return cls.get_swap(db, tx_hash)
-
-            swap = cls(
-                tx_hash=tx_hash,
-                block_number=block_number,
-                block_hash=block_hash,
-                pool=pool,
-                token_in=token_in,
-                token_out=token_out,
-                amount_in_raw=amount_in_raw,
-                amount_out_raw=amount_out_raw,
-                amount_in=amount_in,
-                amount_out=amount_out,
-                mon_amount=mon_amount,
-                is_sell=is_sell,
-                wallet=wallet
+            db.query(cls).filter(cls.tx_hash == tx_hash).update(
+                {cls.realized_pnl_mon: realized_pnl_mon}, synchronize_session=False
             )
-            db.add(swap)
             db.commit()
-            db.refresh(swap)
-            return swap
-
         except Exception as e:
             db.rollback()
             raise e
 
+    @classmethod
+    def get_trades_since(cls, db: Session, since: datetime) -> List[Any]:
+        """
+        Get the leaderboard fields of every swap since a point in time, oldest first
+
+        Returns:
+            Rows of (timestamp, block_number, wallet, realized_pnl_mon, mon_amount)
+        """
+        return db.query(
+            cls.timestamp, cls.block_number, cls.wallet, cls.realized_pnl_mon, cls.mon_amount
+        ).filter(cls.timestamp >= since).order_by(cls.timestamp).all()
+
+    @classmethod
+    def get_wallet_volume(cls, db: Session, wallet: str, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Count a wallet's swaps and sum their MON volume in one query
+
+        Args:
+            db: Database session
+            wallet: Wallet address
+            since: Only count swaps at or after this time
+
+        Returns:
+            Dictionary with trades and volume_mon
+        """
+        query = db.query(
+            func.count(cls.id).label("trades"),
+            func.sum(cls.mon_amount).label("volume")
+        ).filter(cls.wallet == wallet)
+
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+
+        row = query.one()
+        return {
+            "trades": int(row.trades or 0),
+            "volume_mon": Decimal(row.volume or 0)
+        }
+
+    @classmethod
+    def stream_wallet_trades(
+            cls,
+            db: Session,
+            lower: Optional[str] = None,
+            upper: Optional[str] = None,
+            max_block: Optional[int] = None,
+            batch_size: int = 10000,
+            wallets: Optional[List[str]] = None
+    ) -> Iterator[Any]:
+        """
+        Stream the position fields of every swap, ordered by (wallet, block_number, log_index)
+
+        Uses a server-side cursor, so only `batch_size` rows are held at once.
+
+        Args:
+            db: Database session
+            lower: Only wallets >= lower
+            upper: Only wallets < upper
+            max_block: Only swaps up to this block
+            batch_size: Rows fetched per round trip
+            wallets: Only these wallets
+
+        Yields:
+            Rows of (wallet, token_in, token_out, amount_in, amount_out, block_number, timestamp)
+        """
+        query = db.query(
+            cls.wallet, cls.token_in, cls.token_out, cls.amount_in, cls.amount_out,
+            cls.block_number, cls.timestamp
+        )
+        if lower is not None:
+            query = query.filter(cls.wallet >= lower)
+        if upper is not None:
+            query = query.filter(cls.wallet < upper)
+        if max_block is not None:
+            query = query.filter(cls.block_number <= max_block)
+        if wallets is not None:
+            query = query.filter(cls.wallet.in_(wallets))
+
+        yield from query.order_by(
+            cls.wallet, cls.block_number, cls.log_index, cls.tx_hash
+        ).execution_options(stream_results=True, yield_per=batch_size)
+
+    @classmethod
+    def get_max_block(cls, db: Session) -> Optional[int]:
+        """Get the newest block with a stored swap"""
+        return db.query(func.max(cls.block_number)).scalar()
+
     @classmethod
     def remove_swap(cls, db: Session, tx_hash: str) -> bool:
         """
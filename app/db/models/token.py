@@ -0,0 +1,70 @@
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    DateTime,
+    func,
+)
+from app.db.database import Base
+from app.db.repository import insert_ignore
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Iterable, Tuple
+
+
+class Token(Base):
+    """ERC-20 metadata of tokens seen in pools"""
+    __tablename__ = "tokens"
+
+    address = Column(String, primary_key=True, index=True)
+    decimals = Column(Integer, nullable=False)
+    symbol = Column(String, nullable=True)
+    last_updated = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    @classmethod
+    def get_tokens(cls, db: Session, addresses: Iterable[str]) -> Dict[str, 'Token']:
+        """
+        Get many tokens in a single query
+
+        Returns:
+            Dictionary of address -> Token for the tokens that exist
+        """
+        addresses = list(set(addresses))
+        if not addresses:
+            return {}
+
+        try:
+            tokens = db.query(cls).filter(cls.address.in_(addresses)).all()
+            return {token.address: token for token in tokens}
+        except Exception:
+            return {}
+
+    @classmethod
+    def add_tokens_bulk(cls, db: Session, tokens: Dict[str, Tuple[int, Optional[str]]]) -> int:
+        """
+        Add many tokens with INSERT ... ON CONFLICT DO NOTHING
+
+        Args:
+            db: Database session
+            tokens: Dictionary of address -> (decimals, symbol)
+
+        Returns:
+            Number of tokens inserted
+        """
+        if not tokens:
+            return 0
+
+        try:
+            inserted = insert_ignore(db, cls, [
+                {"address": address, "decimals": decimals, "symbol": symbol}
+                for address, (decimals, symbol) in tokens.items()
+            ])
+            db.commit()
+            return len(inserted)
+
+        except Exception as e:
+            db.rollback()
+            raise e
@@ -1,12 +1,14 @@
 from sqlalchemy import (
     Column,
     String,
+    select,
     DateTime,
     func,
 )
 from app.db.database import Base
+from app.db.repository import insert_ignore, insert_ignore_one, upsert
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 
 class Wallet(Base):
@@ -46,21 +48,16 @@ class Wallet(Base):
             twitter_pfp: Twitter profile picture URL (optional)
 
         Returns:
-            Wallet object if successful, None if already exists
+            Wallet object, the existing one if the wallet is already tracked
         """
         try:
-            if cls.exists(db, address):
-                return cls.get_wallet(db, address)
-
-            wallet = cls(
-                address=address,
-                twitter_name=twitter_name,
-                twitter_pfp=twitter_pfp
-            )
-            db.add(wallet)
+            wallet = insert_ignore_one(db, cls, {
+                "address": address,
+                "twitter_name": twitter_name,
+                "twitter_pfp": twitter_pfp
+            })
             db.commit()
-            db.refresh(wallet)
-            return wallet
+            return wallet if wallet is not None else cls.get_wallet(db, address)
 
         except Exception as e:
             db.rollback()
@@ -83,4 +80,51 @@ class Wallet(Base):
             return False
         except Exception:
             db.rollback()
-            raise
\ No newline at end of file
+            raise
+
+    @classmethod
+    def upsert_wallets_bulk(cls, db: Session, wallets: List[Dict[str, Any]]) -> List[str]:
+        """
+        Insert or update many wallets with multi-row INSERT ... ON CONFLICT
+
+        Twitter metadata of existing wallets is only overwritten where the
+        import provides a value.
+
+        Args:
+            db: Database session
+            wallets: Dictionaries with address, twitter_name and twitter_pfp;
+                addresses must be normalized and unique
+
+        Returns:
+            Addresses that were not tracked before
+        """
+        try:
+            new = [row.address for row in insert_ignore(db, cls, wallets)]
+
+            inserted = set(new)
+            updates = [
+                wallet for wallet in wallets
+                if wallet["address"] not in inserted and (wallet.get("twitter_name") or wallet.get("twitter_pfp"))
+            ]
+            upsert(db, cls, updates, ["twitter_name", "twitter_pfp"], keep_existing=True)
+
+            db.commit()
+            return new
+
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    @classmethod
+    def stream_wallets(cls, db: Session, batch_size: int = 1000) -> Iterator[tuple]:
+        """
+        Iterate (address, twitter_name, twitter_pfp, created_at) over the whole table
+
+        Rows are fetched batch_size at a time with a server-side cursor.
+        """
+        result = db.execute(
+            select(cls.address, cls.twitter_name, cls.twitter_pfp, cls.created_at)
+            .order_by(cls.address)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        yield from result
@@ -0,0 +1,122 @@
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def dialect_insert(db: Session, model):
+    """
+    INSERT construct of the session's dialect, which supports ON CONFLICT
+
+    Raises:
+        NotImplementedError: If the database is neither PostgreSQL nor SQLite
+    """
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return postgresql.insert(model)
+    if name == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT inserts are not supported for {name}")
+
+
+def _conflict_columns(model, conflict_columns: Optional[Sequence[str]]) -> List:
+    if conflict_columns is None:
+        return list(model.__table__.primary_key.columns)
+    return [model.__table__.c[name] for name in conflict_columns]
+
+
+def insert_ignore(
+        db: Session,
+        model,
+        rows: List[Dict[str, Any]],
+        conflict_columns: Optional[Sequence[str]] = None,
+        returning: Optional[Sequence] = None
+) -> List[Any]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING ... RETURNING for many rows
+
+    Rows are sent as one executemany, which SQLAlchemy renders as batched
+    multi-row INSERTs. Only rows that were actually inserted are returned,
+    so concurrent writers of the same key never fail and always learn
+    whether they won. Does not commit - the caller owns the transaction.
+
+    Args:
+        db: Database session
+        model: Mapped model class
+        rows: Dictionaries with column values
+        conflict_columns: Columns of the unique constraint (default: primary key)
+        returning: Columns to return (default: the conflict columns)
+
+    Returns:
+        One row per inserted row
+    """
+    if not rows:
+        return []
+
+    columns = _conflict_columns(model, conflict_columns)
+    stmt = dialect_insert(db, model).on_conflict_do_nothing(index_elements=columns)
+    stmt = stmt.returning(*(returning or columns))
+    return db.execute(stmt, rows).all()
+
+
+def insert_ignore_one(
+        db: Session,
+        model,
+        values: Dict[str, Any],
+        conflict_columns: Optional[Sequence[str]] = None
+) -> Optional[Any]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING ... RETURNING for one row, as an ORM object
+
+    Does not commit - the caller owns the transaction.
+
+    Returns:
+        The inserted object, or None if the row already existed
+    """
+    stmt = (
+        dialect_insert(db, model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=_conflict_columns(model, conflict_columns))
+        .returning(model)
+    )
+    return db.scalars(stmt).first()
+
+
+def upsert(
+        db: Session,
+        model,
+        rows: List[Dict[str, Any]],
+        update_columns: Sequence[str],
+        conflict_columns: Optional[Sequence[str]] = None,
+        keep_existing: bool = False,
+        returning: Optional[Sequence] = None
+) -> List[Any]:
+    """
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING for many rows
+
+    Does not commit - the caller owns the transaction.
+
+    Args:
+        db: Database session
+        model: Mapped model class
+        rows: Dictionaries with column values; keys must be unique per statement
+        update_columns: Columns overwritten on conflict
+        conflict_columns: Columns of the unique constraint (default: primary key)
+        keep_existing: Only overwrite where the new value isn't NULL
+        returning: Columns to return (default: the conflict columns)
+
+    Returns:
+        One row per inserted or updated row
+    """
+    if not rows:
+        return []
+
+    columns = _conflict_columns(model, conflict_columns)
+    stmt = dialect_insert(db, model)
+    table = model.__table__
+    set_ = {
+        name: func.coalesce(stmt.excluded[name], table.c[name]) if keep_existing else stmt.excluded[name]
+        for name in update_columns
+    }
+    stmt = stmt.on_conflict_do_update(index_elements=columns, set_=set_).returning(*(returning or columns))
+    return db.execute(stmt, rows).all()
@@ -0,0 +1,433 @@
+import argparse
+import asyncio
+import hashlib
+import httpx
+import time
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.api.rpc import MAX_RETRIES, backoff_delay
+from app.api.rpc_async import async_rpc
+from app.config.config import config
+from app.db.database import SessionLocal
+from app.db.models.backfill_checkpoint import BackfillCheckpoint
+from app.db.models.wallet import Wallet
+from app.services.ingest_pause import paused_ingestion
+from app.services.pools import prefetch_pools, pool_registry, warm_pool_registry
+from app.services.position_cache import position_cache
+from app.services.rebuild import rebuild_wallet_positions
+from app.services.reorg import warm_chain_tracker
+from app.services.swaps import event_order_key, record_historical_swaps
+from app.services.tokens import prefetch_tokens, warm_token_registry
+from app.services.wallets import resolve_wallets, warm_wallet_index
+from app.utils.logger import logger
+from app.utils.utils import normalize_address
+
+# keccak256("Swap(address,address,int256,int256,uint160,uint128,int24)") - Uniswap V3 style pools
+SWAP_TOPIC = "0xc42079f94a6350d7e6235f29174924f928cc2ac818eb64fed8004e115fbcca67"
+
+# Fragments of provider eth_getLogs errors that mean "ask for a smaller range"
+RANGE_LIMIT_ERRORS = (
+    "returned more than",  # geth, Infura: "query returned more than 10000 results"
+    "block range",  # "block range too large", "exceed maximum block range", "max block range"
+    "blocks range",  # QuickNode: "limited to a 10,000 blocks range"
+    "range is too",  # "block range is too wide"
+    "response size",  # Alchemy: "Log response size exceeded"
+    "response is too big",
+    "too many results",
+    "query timeout",
+)
+
+# Fragments of provider errors that mean "slow down" - retried after a backoff, never split
+RATE_LIMIT_ERRORS = ("rate limit", "rate exceeded", "request limit", "too many requests", "capacity", "throttl")
+
+REPLAY_WALLETS_PER_TRANSACTION = 100
+
+
+def wallet_topic(address: str) -> str:
+    """Address as an indexed event topic (left-padded to 32 bytes)"""
+    return "0x" + normalize_address(address)[2:].rjust(64, "0")
+
+
+def _topic_address(topic: str) -> str:
+    return "0x" + topic[-40:].lower()
+
+
+def _decode_int256(word: str) -> int:
+    value = int(word, 16)
+    return value - (1 << 256) if value >= 1 << 255 else value
+
+
+def decode_swap_log(log: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a Swap log into the event format of the webhook stream
+
+    Raises:
+        ValueError: If the log isn't a well-formed Swap log
+    """
+    topics = log.get("topics") or []
+    data = (log.get("data") or "0x")[2:]
+    if len(topics) < 3 or len(data) < 128:
+        raise ValueError(f"Malformed Swap log in tx {log.get('transactionHash')}")
+
+    return {
+        "txHash": log["transactionHash"],
+        "blockNumber": int(log["blockNumber"], 16),
+        "blockHash": log["blockHash"],
+        "logIndex": int(log["logIndex"], 16),
+        "pool": normalize_address(log["address"]),
+        "sender": _topic_address(topics[1]),
+        "recipient": _topic_address(topics[2]),
+        "amount0": str(_decode_int256(data[0:64])),
+        "amount1": str(_decode_int256(data[64:128])),
+    }
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Whether a failed eth_getLogs was throttled by the provider"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429
+    return isinstance(error, ValueError) and any(
+        fragment in str(error).lower() for fragment in RATE_LIMIT_ERRORS
+    )
+
+
+def _is_range_limit_error(error: Exception) -> bool:
+    """Whether a failed eth_getLogs should be retried over a smaller range"""
+    if isinstance(error, httpx.ReadTimeout):
+        return True
+    return isinstance(error, ValueError) and not _is_rate_limit_error(error) and any(
+        fragment in str(error).lower() for fragment in RANGE_LIMIT_ERRORS
+    )
+
+
+def swap_filters(wallets: List[str]) -> List[List[Any]]:
+    """
+    eth_getLogs topic filters for Swap logs of the given wallets
+
+    Topic positions are AND-ed, so wallets are matched as sender and as
+    recipient with separate filters, in groups of BACKFILL_WALLETS_PER_FILTER.
+
+    Only swaps where the wallet is the pool's direct counterparty match:
+    swaps routed through an aggregator or router contract (which is then
+    the sender, and often the recipient) are missed. Their wallet only
+    shows as the transaction's `from`, which logs don't carry - the live
+    stream still sees them.
+    """
+    topics = [wallet_topic(wallet) for wallet in sorted(set(wallets))]
+    size = max(1, config.BACKFILL_WALLETS_PER_FILTER)
+
+    filters = []
+    for start in range(0, len(topics), size):
+        group = topics[start:start + size]
+        filters.append([SWAP_TOPIC, group])  # wallet is the sender
+        filters.append([SWAP_TOPIC, None, group])  # wallet is the recipient
+    return filters
+
+
+async def fetch_logs(from_block: int, to_block: int, topics: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Get the logs of a block range, halving the range while the provider rejects it
+
+    Both halves of a split range are fetched concurrently. Rate-limited
+    requests are retried over the same range with backoff instead, so
+    throttling never multiplies the number of requests.
+
+    Raises:
+        ValueError: If even a single block is rejected, or the provider keeps throttling
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return await async_rpc.get_logs(from_block, to_block, topics)
+        except Exception as e:
+            if _is_rate_limit_error(e) and attempt < MAX_RETRIES:
+                delay = backoff_delay(attempt)
+                logger.warn("backfill", "eth_getLogs rate limited, backing off", {
+                    "from_block": from_block,
+                    "to_block": to_block,
+                    "delay": round(delay, 3)
+                })
+                await asyncio.sleep(delay)
+                continue
+            if from_block >= to_block or not _is_range_limit_error(e):
+                raise
+            break
+
+    middle = (from_block + to_block) // 2
+    logger.info("backfill", "Splitting block range rejected by provider", {
+        "from_block": from_block,
+        "to_block": to_block
+    })
+    lower, upper = await asyncio.gather(
+        fetch_logs(from_block, middle, topics),
+        fetch_logs(middle + 1, to_block, topics)
+    )
+    return lower + upper
+
+
+async def fetch_swap_events(from_block: int, to_block: int, filters: List[List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Get the Swap events of a block range for every filter, in chain order
+
+    A swap between two tracked wallets matches several filters; each log is returned once.
+    """
+    results = await asyncio.gather(*[fetch_logs(from_block, to_block, topics) for topics in filters])
+
+    events = {}
+    for logs in results:
+        for log in logs:
+            if log.get("removed"):
+                continue
+            event = decode_swap_log(log)
+            events[(event["txHash"], event["logIndex"])] = event
+
+    return sorted(events.values(), key=event_order_key)
+
+
+async def add_block_timestamps(events: List[Dict[str, Any]]) -> None:
+    """Stamp events with the time of their block (one batched RPC round per window)"""
+    timestamps = await async_rpc.get_block_timestamps(event["blockNumber"] for event in events)
+    for event in events:
+        event["timestamp"] = timestamps[event["blockNumber"]]
+
+
+def _ingest_events(events: List[dict]) -> Tuple[int, int]:
+    """
+    Store a window's swaps with one session, without touching positions
+
+    Blocking - run via asyncio.to_thread
+
+    Returns:
+        Tuple of (succeeded, failed)
+    """
+    return _with_session(lambda db: record_historical_swaps(events, db))
+
+
+def replay_wallets(wallets: List[str], job: str, force: bool = False) -> Dict[str, int]:
+    """
+    Rebuild the positions of backfilled wallets from their swaps, in chain order
+
+    Ingestion is paused meanwhile, so no live trade changes the positions
+    being replaced. One transaction per REPLAY_WALLETS_PER_TRANSACTION wallets.
+    Blocking - run via asyncio.to_thread
+
+    Args:
+        wallets: Wallet addresses
+        job: Backfill job name (names the ingestion pause)
+        force: Don't wait for the API process to pause ingestion
+
+    Returns:
+        Dictionary with wallets, swaps and positions
+    """
+    stats = {"wallets": 0, "swaps": 0, "positions": 0}
+    with paused_ingestion(f"backfill {job}", force=force):
+        for start in range(0, len(wallets), REPLAY_WALLETS_PER_TRANSACTION):
+            group = wallets[start:start + REPLAY_WALLETS_PER_TRANSACTION]
+            db = SessionLocal()
+            try:
+                replayed = rebuild_wallet_positions(db, group)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            stats["wallets"] += len(group)
+            stats["swaps"] += replayed["swaps"]
+            stats["positions"] += replayed["positions"]
+
+        # Cached positions (when run inside the API process) predate the replay
+        if position_cache is not None:
+            position_cache.invalidate()
+    return stats
+
+
+def _with_session(task: Callable[[Session], Any]) -> Any:
+    db = SessionLocal()
+    try:
+        return task(db)
+    finally:
+        db.close()
+
+
+def default_job_name(wallets: Iterable[str]) -> str:
+    """Checkpoint name of a backfill: the wallet itself, or a digest of the wallet set"""
+    wallets = sorted(set(wallets))
+    if len(wallets) == 1:
+        return f"wallet:{wallets[0]}"
+    return "wallets:" + hashlib.sha1(",".join(wallets).encode()).hexdigest()[:12]
+
+
+async def backfill(
+        wallets: List[str],
+        from_block: int,
+        to_block: Optional[int] = None,
+        job: Optional[str] = None,
+        restart: bool = False,
+        chunk_blocks: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        force: bool = False
+) -> Dict[str, Any]:
+    """
+    Ingest the historical swaps of wallets, then replay their positions
+
+    The range is cut into chunks of `chunk_blocks`; `concurrency` chunks are
+    fetched in parallel (and the next window while the current one is
+    ingested). Swaps are stored with their block time but not applied to
+    positions: once the range is done (or the job stops), the positions
+    of the job's wallets are rebuilt from their swaps in chain order, so
+    history lands before the live trades. Ingestion is paused during the
+    replay (see paused_ingestion).
+
+    Progress is checkpointed after every fully ingested window. A window
+    with failed events stops the job without advancing the checkpoint, so
+    a rerun retries it. Already processed transactions are skipped, so
+    overlapping the live stream and rerunning windows is safe.
+
+    Args:
+        wallets: Wallet addresses to backfill
+        from_block: First block (ignored when resuming a job)
+        to_block: Last block (inclusive), defaults to the latest block
+        job: Checkpoint name, defaults to default_job_name(wallets)
+        restart: Discard the job's progress
+        chunk_blocks: Blocks per eth_getLogs range (config.BACKFILL_CHUNK_BLOCKS)
+        concurrency: Ranges fetched in parallel (config.BACKFILL_CONCURRENCY)
+        force: Replay without waiting for the API process to pause ingestion
+
+    Returns:
+        Dictionary with job statistics
+    """
+    wallets = sorted({normalize_address(wallet) for wallet in wallets if wallet})
+    if not wallets:
+        raise ValueError("No wallets to backfill")
+
+    chunk_blocks = max(1, chunk_blocks or config.BACKFILL_CHUNK_BLOCKS)
+    concurrency = max(1, concurrency or config.BACKFILL_CONCURRENCY)
+    job = job or default_job_name(wallets)
+
+    if to_block is None:
+        to_block = await async_rpc.get_block_number()
+
+    checkpoint = await asyncio.to_thread(
+        _with_session, lambda db: BackfillCheckpoint.start(db, job, from_block, to_block, restart)
+    )
+    start_block, to_block = checkpoint.next_block, checkpoint.to_block
+    filters = swap_filters(wallets)
+    window_blocks = chunk_blocks * concurrency
+
+    stats = {"job": job, "wallets": len(wallets), "from_block": start_block, "to_block": to_block,
+             "events": 0, "succeeded": 0, "failed": 0, "next_block": start_block}
+    replayed = set(wallets)
+
+    logger.info("backfill", "Starting backfill", stats)
+    started = time.monotonic()
+
+    async def fetch_window(window_start: int) -> List[Dict[str, Any]]:
+        window_end = min(window_start + window_blocks - 1, to_block)
+        chunks = await asyncio.gather(*[
+            fetch_swap_events(chunk_start, min(chunk_start + chunk_blocks - 1, window_end), filters)
+            for chunk_start in range(window_start, window_end + 1, chunk_blocks)
+        ])
+        events = [event for chunk in chunks for event in chunk]
+        if events:
+            await add_block_timestamps(events)
+        return events
+
+    window_start = start_block
+    next_window = asyncio.create_task(fetch_window(window_start)) if window_start <= to_block else None
+
+    try:
+        while next_window is not None:
+            events = await next_window
+            window_end = min(window_start + window_blocks - 1, to_block)
+
+            # Fetch ahead while this window is ingested
+            following = window_end + 1
+            next_window = asyncio.create_task(fetch_window(following)) if following <= to_block else None
+
+            if events:
+                pools = {event["pool"] for event in events}
+                await prefetch_pools(pools)
+                await prefetch_tokens(
+                    token for tokens in (pool_registry.get(pool) for pool in pools) if tokens for token in tokens
+                )
+                succeeded, failed = await asyncio.to_thread(_ingest_events, events)
+                stats["events"] += len(events)
+                stats["succeeded"] += succeeded
+                stats["failed"] += failed
+                replayed.update(resolve_wallets(events))
+
+                if failed:
+                    logger.error("backfill", "Window had failed events, stopping before the checkpoint", context={
+                        "job": job,
+                        "from_block": window_start,
+                        "to_block": window_end,
+                        "failed": failed
+                    })
+                    break
+
+            await asyncio.to_thread(
+                _with_session, lambda db: BackfillCheckpoint.advance(db, job, window_end + 1)
+            )
+            stats["next_block"] = window_end + 1
+
+            logger.info("backfill", f"Backfilled blocks up to {window_end}", {
+                "job": job,
+                "events": len(events),
+                "remaining_blocks": to_block - window_end
+            })
+            window_start = following
+
+    finally:
+        if next_window is not None:
+            next_window.cancel()
+
+    stats["replay"] = await asyncio.to_thread(replay_wallets, sorted(replayed), job, force)
+
+    stats["duration"] = round(time.monotonic() - started, 3)
+    logger.info("backfill", "Backfill completed", stats)
+    return stats
+
+
+def _tracked_wallets(db: Session) -> List[str]:
+    return [row.address for row in db.query(Wallet.address).all()]
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    for warm in (warm_pool_registry, warm_token_registry, warm_wallet_index, warm_chain_tracker):
+        _with_session(warm)
+
+    wallets = args.wallet or _with_session(_tracked_wallets)
+    try:
+        return await backfill(
+            wallets,
+            from_block=args.from_block,
+            to_block=args.to_block,
+            job=args.job,
+            restart=args.restart,
+            chunk_blocks=args.chunk_blocks,
+            concurrency=args.concurrency,
+            force=args.force
+        )
+    finally:
+        await async_rpc.close()
+
+
+def main() -> None:
+    """Command line entry point: python -m app.services.backfill --wallet 0x..."""
+    parser = argparse.ArgumentParser(description="Backfill historical swaps of tracked wallets")
+    parser.add_argument("--wallet", action="append", help="wallet to backfill (repeatable, default: all tracked)")
+    parser.add_argument("--from-block", type=int, default=0, help="first block of a new job")
+    parser.add_argument("--to-block", type=int, default=None, help="last block (default: latest)")
+    parser.add_argument("--job", default=None, help="checkpoint name (default: derived from the wallets)")
+    parser.add_argument("--restart", action="store_true", help="discard the job's checkpoint")
+    parser.add_argument("--chunk-blocks", type=int, default=None, help="blocks per eth_getLogs range")
+    parser.add_argument("--concurrency", type=int, default=None, help="ranges fetched in parallel")
+    parser.add_argument("--force", action="store_true", help="replay positions while the API process is down")
+
+    print(asyncio.run(_run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Iterator, Optional
+
+from app.config.config import config
+from app.db.database import SessionLocal
+from app.db.models.ingest_pause import IngestPause
+from app.services.position_cache import position_cache
+from app.utils.logger import logger
+
+
+class IngestPausedError(Exception):
+    """Raised instead of ingesting while a maintenance job holds an ingestion pause"""
+
+
+class IngestGate:
+    """
+    Admission of ingestion work in the API process
+
+    Webhook payloads and queued payloads are ingested inside admit(). While
+    a maintenance job holds a pause the gate is closed, and wait_idle()
+    tells when the payloads admitted before have finished.
+    """
+
+    def __init__(self):
+        self.paused = False
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Count a payload as in flight for the duration of the block
+
+        Raises:
+            IngestPausedError: If ingestion is paused
+        """
+        with self._idle:
+            if self.paused:
+                raise IngestPausedError("Ingestion is paused for maintenance")
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def set_paused(self, paused: bool) -> None:
+        with self._idle:
+            self.paused = paused
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds until no payload is in flight"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._in_flight, timeout)
+
+
+ingest_gate = IngestGate()
+
+
+def _with_session(task: Callable[[Session], Any]) -> Any:
+    db = SessionLocal()
+    try:
+        return task(db)
+    finally:
+        db.close()
+
+
+def sync_ingest_pause(db: Session) -> None:
+    """
+    Follow the pauses requested by maintenance jobs (periodic task of the API process)
+
+    Closes the gate while any pause exists. Once in-flight payloads have
+    finished, the position cache is flushed and invalidated - the job is
+    about to rewrite positions - and the pauses are marked drained.
+    """
+    pauses = IngestPause.get_all(db)
+    ingest_gate.set_paused(bool(pauses))
+
+    waiting = [pause.name for pause in pauses if pause.drained_at is None]
+    if not waiting or not ingest_gate.wait_idle(config.INGEST_PAUSE_POLL_INTERVAL):
+        return
+
+    if position_cache is not None:
+        position_cache.invalidate()
+    IngestPause.mark_drained(db, waiting)
+
+    logger.info("ingest", "Ingestion paused for maintenance", {"jobs": waiting})
+
+
+@contextmanager
+def paused_ingestion(name: str, timeout: Optional[float] = None, force: bool = False) -> Iterator[None]:
+    """
+    Hold an ingestion pause for the duration of the block (maintenance jobs)
+
+    Waits until the API process has stopped ingesting. Payloads that arrive
+    meanwhile are retried: the webhook answers 503 and the queue consumer
+    stops claiming.
+
+    Args:
+        name: Job name
+        timeout: Seconds to wait for the API process (config.INGEST_PAUSE_TIMEOUT)
+        force: Go ahead without the API process's acknowledgement (it isn't running)
+
+    Raises:
+        RuntimeError: If a job of the same name already holds a pause
+        TimeoutError: If the API process didn't acknowledge in time
+    """
+    if not _with_session(lambda db: IngestPause.acquire(db, name)):
+        raise RuntimeError(f"Ingestion is already paused by {name}")
+
+    try:
+        deadline = time.monotonic() + (config.INGEST_PAUSE_TIMEOUT if timeout is None else timeout)
+        while not force and not _with_session(lambda db: IngestPause.is_drained(db, name)):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Ingestion didn't pause for {name}; is the API process running?")
+            time.sleep(config.INGEST_PAUSE_POLL_INTERVAL)
+
+        if force:
+            logger.warn("ingest", "Holding an ingestion pause without acknowledgement", {"job": name})
+        yield
+
+    finally:
+        _with_session(lambda db: IngestPause.release(db, name))
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config.config import config
+from app.db.database import SessionLocal
+from app.db.models.ingest_queue import IngestQueueItem
+from app.services.ingest_pause import IngestPausedError, ingest_gate
+from app.utils.logger import logger
+
+
+class IngestMetrics:
+    """In-process counters of the queue consumer"""
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.last_id: Optional[int] = None
+        self.last_duration: Optional[float] = None
+        self.last_lag: Optional[float] = None  # seconds from receipt to ingested
+        self._lock = threading.Lock()
+
+    def record(self, item_id: int, duration: float, lag: Optional[float], outcome: str) -> None:
+        with self._lock:
+            if outcome == "done":
+                self.processed += 1
+                self.last_id = item_id
+                self.last_duration = duration
+                self.last_lag = lag
+            elif outcome == "retry":
+                self.retried += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "failed": self.failed,
+                "retried": self.retried,
+                "last_id": self.last_id,
+                "last_duration_seconds": _round(self.last_duration),
+                "last_lag_seconds": _round(self.last_lag)
+            }
+
+
+ingest_metrics = IngestMetrics()
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def _age_seconds(received_at: Optional[datetime]) -> Optional[float]:
+    """Seconds since a DB timestamp (naive timestamps are UTC)"""
+    if received_at is None:
+        return None
+    if received_at.tzinfo is None:
+        received_at = received_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - received_at).total_seconds())
+
+
+def _with_session(task: Callable[[Session], Any]) -> Any:
+    db = SessionLocal()
+    try:
+        return task(db)
+    finally:
+        db.close()
+
+
+def enqueue_payload(raw_payload: str) -> int:
+    """
+    Durably append a raw webhook payload to the ingestion queue
+
+    Blocking - call via asyncio.to_thread from the event loop
+
+    Returns:
+        Queue id of the payload
+    """
+    return _with_session(lambda db: IngestQueueItem.enqueue(db, raw_payload))
+
+
+def _claim_next() -> Optional[Dict[str, Any]]:
+    """Claim the oldest pending payload as a plain dict (detached from the session)"""
+    def claim(db: Session) -> Optional[Dict[str, Any]]:
+        item = IngestQueueItem.claim_next(db)
+        if item is None:
+            return None
+        return {
+            "id": item.id,
+            "payload": item.payload,
+            "attempts": item.attempts,
+            "received_at": item.received_at
+        }
+
+    return _with_session(claim)
+
+
+async def _ingest_item(item: Dict[str, Any], process: Callable[[dict], Awaitable[dict]]) -> None:
+    """Ingest one queued payload and record the outcome"""
+    started = time.monotonic()
+
+    try:
+        response = await process(json.loads(item["payload"]))
+        if response.get("errors"):
+            # Retry the payload - its processed events are skipped, failed ones
+            # (e.g. tokens without resolvable decimals) get another attempt
+            raise RuntimeError(f"{response['errors']} events of the payload failed")
+
+    except Exception as e:
+        retry = item["attempts"] < config.INGEST_MAX_ATTEMPTS
+        await asyncio.to_thread(
+            _with_session, lambda db: IngestQueueItem.mark_failed(db, item["id"], str(e), retry)
+        )
+        ingest_metrics.record(item["id"], time.monotonic() - started, None, "retry" if retry else "failed")
+        logger.error("ingest", "Failed to ingest queued payload", error=e, context={
+            "queue_id": item["id"],
+            "attempts": item["attempts"],
+            "retry": retry
+        })
+        return
+
+    await asyncio.to_thread(_with_session, lambda db: IngestQueueItem.mark_done(db, item["id"]))
+    ingest_metrics.record(item["id"], time.monotonic() - started, _age_seconds(item["received_at"]), "done")
+
+    logger.info("ingest", "Ingested queued payload", {
+        "queue_id": item["id"],
+        "swaps": response.get("processed_swaps", 0),
+        "errors": response.get("errors", 0),
+        "duration": round(time.monotonic() - started, 3)
+    })
+
+
+async def run_ingest_consumer(process: Callable[[dict], Awaitable[dict]], poll_interval: float) -> None:
+    """
+    Drain the ingestion queue in order until cancelled
+
+    Payloads are processed one at a time with `process` (the webhook's
+    ingestion pipeline); the queue is polled every `poll_interval` seconds
+    once drained, or while a maintenance job has paused ingestion.
+    """
+    released = await asyncio.to_thread(_with_session, IngestQueueItem.release_claimed)
+    if released:
+        logger.warn("ingest", "Released payloads claimed before restart", {"released": released})
+
+    while True:
+        try:
+            with ingest_gate.admit():
+                try:
+                    item = await asyncio.to_thread(_claim_next)
+                except Exception as e:
+                    logger.error("ingest", "Failed to claim queued payload", error=e)
+                    item = None
+
+                if item is not None:
+                    await _ingest_item(item, process)
+        except IngestPausedError:
+            item = None
+
+        if item is None:
+            await asyncio.sleep(poll_interval)
+
+
+def get_queue_stats(db: Session) -> Dict[str, Any]:
+    """
+    Queue depth and consumer lag
+
+    Args:
+        db: Database session
+
+    Returns:
+        Dictionary with counts per status, the age of the oldest pending
+        payload (lag) and the consumer's counters
+    """
+    stats = IngestQueueItem.get_stats(db)
+    received_at = stats.pop("oldest_pending_received_at")
+
+    return {
+        **stats,
+        "lag_seconds": _round(_age_seconds(received_at)) or 0.0,
+        "consumer": ingest_metrics.snapshot()
+    }
+
+
+def replay(db: Session, from_id: int, to_id: Optional[int] = None, failed_only: bool = False) -> int:
+    """
+    Requeue a range of payloads for replay
+
+    Args:
+        db: Database session
+        from_id: First queue id (inclusive)
+        to_id: Last queue id (inclusive), or None for everything after from_id
+        failed_only: Only requeue payloads that exhausted their attempts
+
+    Returns:
+        Number of payloads requeued
+    """
+    requeued = IngestQueueItem.requeue(db, from_id, to_id, failed_only)
+
+    logger.info("ingest", "Requeued payloads for replay", {
+        "from_id": from_id,
+        "to_id": to_id,
+        "failed_only": failed_only,
+        "requeued": requeued
+    })
+
+    return requeued
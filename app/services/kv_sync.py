@@ -0,0 +1,175 @@
+import threading
+import time
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.api.key_value_qn import get_wallet_key_value_list, update_wallet_key_value_list
+from app.config.config import config
+from app.db.models.wallet import Wallet
+from app.utils.logger import logger
+from app.utils.utils import normalize_address
+
+
+class WalletListSync:
+    """
+    Pending changes to the QuickNode KV wallet list (the stream filter)
+
+    Adds and removes are recorded as the desired state per address, so
+    an add followed by a remove before the next flush coalesces into a
+    single remove. flush() sends everything pending as a few PATCH calls;
+    a failed PATCH puts its changes back for the next flush.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = max(1, batch_size)
+        self._pending: Dict[str, bool] = {}  # address -> should be on the list
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.last_flush_at: Optional[float] = None
+        self.last_reconcile_at: Optional[float] = None
+        self.last_drift: Dict[str, int] = {"missing": 0, "extra": 0}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def request_add(self, addresses: Iterable[str]) -> None:
+        """Queue addresses to be added to the wallet list"""
+        self._request(addresses, True)
+
+    def request_remove(self, addresses: Iterable[str]) -> None:
+        """Queue addresses to be removed from the wallet list"""
+        self._request(addresses, False)
+
+    def _request(self, addresses: Iterable[str], present: bool) -> None:
+        with self._lock:
+            for address in addresses:
+                address = normalize_address(address)
+                if address:
+                    self._pending[address] = present
+
+    def pending_addresses(self) -> List[str]:
+        with self._lock:
+            return list(self._pending)
+
+    def _take(self) -> Tuple[List[str], List[str]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        adds = sorted(address for address, present in pending.items() if present)
+        removes = sorted(address for address, present in pending.items() if not present)
+        return adds, removes
+
+    def _restore(self, adds: List[str], removes: List[str]) -> None:
+        """Put back changes of a failed PATCH, unless newer requests replaced them"""
+        with self._lock:
+            for address in adds:
+                self._pending.setdefault(address, True)
+            for address in removes:
+                self._pending.setdefault(address, False)
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Send pending changes as PATCH calls of up to batch_size adds and removes each
+
+        Blocking - run off the event loop
+
+        Returns:
+            Dictionary with added, removed and failed (changes requeued) counts
+        """
+        with self._flush_lock:
+            adds, removes = self._take()
+            stats = {"added": 0, "removed": 0, "failed": 0, "requests": 0}
+
+            for start in range(0, max(len(adds), len(removes)), self.batch_size):
+                add_chunk = adds[start:start + self.batch_size]
+                remove_chunk = removes[start:start + self.batch_size]
+                stats["requests"] += 1
+
+                try:
+                    ok = update_wallet_key_value_list(add_items=add_chunk, remove_items=remove_chunk)
+                except Exception as e:
+                    logger.error("kv_sync", "Wallet list PATCH failed", error=e)
+                    ok = False
+
+                if ok:
+                    stats["added"] += len(add_chunk)
+                    stats["removed"] += len(remove_chunk)
+                else:
+                    self._restore(add_chunk, remove_chunk)
+                    stats["failed"] += len(add_chunk) + len(remove_chunk)
+
+            self.last_flush_at = time.time()
+
+        if stats["requests"]:
+            logger.info("kv_sync", "Flushed wallet list changes", stats)
+        return stats
+
+    def reconcile(self, db: Session) -> Dict[str, int]:
+        """
+        Diff the KV wallet list against the wallets table and queue the repairs
+
+        Addresses with a pending change are left alone - the next flush
+        settles them.
+
+        Returns:
+            Dictionary with missing (tracked, not on the list) and extra counts
+        """
+        items = get_wallet_key_value_list()
+        if items is None:
+            raise RuntimeError("Failed to fetch the QuickNode wallet list")
+
+        listed = {normalize_address(item) for item in items if item}
+        tracked = {row.address for row in db.query(Wallet.address).all()}
+        pending = set(self.pending_addresses())
+
+        missing = tracked - listed - pending
+        extra = listed - tracked - pending
+
+        self.request_add(missing)
+        self.request_remove(extra)
+        self.last_reconcile_at = time.time()
+        self.last_drift = {"missing": len(missing), "extra": len(extra)}
+
+        if missing or extra:
+            logger.warn("kv_sync", "Wallet list drifted from the wallets table", self.last_drift)
+        return self.last_drift
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self),
+            "last_flush_at": self.last_flush_at,
+            "last_reconcile_at": self.last_reconcile_at,
+            "last_drift": dict(self.last_drift)
+        }
+
+
+wallet_list_sync = WalletListSync(batch_size=config.KV_SYNC_BATCH_SIZE)
+
+
+def flush_wallet_list(db: Session) -> int:
+    """
+    Periodic task: send pending wallet list changes
+
+    Args:
+        db: Database session (unused, periodic tasks get one)
+
+    Returns:
+        Number of changes sent
+    """
+    stats = wallet_list_sync.flush()
+    return stats["added"] + stats["removed"]
+
+
+def reconcile_wallet_list(db: Session) -> int:
+    """
+    Periodic task: repair drift between the wallets table and the KV wallet list
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of addresses repaired
+    """
+    drift = wallet_list_sync.reconcile(db)
+    if drift["missing"] or drift["extra"]:
+        wallet_list_sync.flush()
+    return drift["missing"] + drift["extra"]
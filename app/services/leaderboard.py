@@ -0,0 +1,265 @@
+import bisect
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from app.db.models.swap import Swap
+from app.utils.logger import logger
+from app.utils.utils import get_time_window
+
+PERIODS = ("1d", "7d", "30d")
+METRICS = ("pnl", "volume")
+
+
+class LeaderboardTrade(NamedTuple):
+    timestamp: float  # unix seconds
+    block_number: int
+    wallet: str
+    realized_pnl_mon: Decimal
+    mon_volume: Decimal
+
+
+class RankedScores:
+    """
+    Wallet -> score, kept sorted for O(limit) top-N reads
+
+    Scores live in a sorted list of (score, wallet); an update is a
+    bisect remove + insert.
+    """
+
+    def __init__(self):
+        self._scores: Dict[str, Decimal] = {}
+        self._sorted: List[Tuple[Decimal, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def add(self, wallet: str, delta: Decimal) -> None:
+        """Add `delta` to a wallet's score"""
+        old = self._scores.get(wallet)
+        if old is not None:
+            self._remove_sorted(old, wallet)
+        new = (old or Decimal(0)) + delta
+        self._scores[wallet] = new
+        bisect.insort(self._sorted, (new, wallet))
+
+    def discard(self, wallet: str) -> None:
+        """Drop a wallet from the ranking"""
+        old = self._scores.pop(wallet, None)
+        if old is not None:
+            self._remove_sorted(old, wallet)
+
+    def top(self, limit: int) -> List[Tuple[str, Decimal]]:
+        """Highest `limit` scores, best first"""
+        return [(wallet, score) for score, wallet in reversed(self._sorted[-limit:])] if limit > 0 else []
+
+    def _remove_sorted(self, score: Decimal, wallet: str) -> None:
+        index = bisect.bisect_left(self._sorted, (score, wallet))
+        if index < len(self._sorted) and self._sorted[index] == (score, wallet):
+            del self._sorted[index]
+
+
+class WindowLeaderboard:
+    """
+    Realized PnL and MON volume per wallet over a sliding time window
+
+    Trades are appended as they are ingested and evicted from the front
+    once they fall out of the window, so the rankings are maintained
+    incrementally and never rescan the swaps table.
+    """
+
+    def __init__(self, period: str, length_seconds: float):
+        self.period = period
+        self.length_seconds = length_seconds
+        self._trades: Deque[LeaderboardTrade] = deque()
+        self._trade_counts: Dict[str, int] = {}
+        self.rankings = {"pnl": RankedScores(), "volume": RankedScores()}
+
+    def __len__(self) -> int:
+        return len(self._trades)
+
+    def add(self, trade: LeaderboardTrade) -> None:
+        self._trades.append(trade)
+        self._trade_counts[trade.wallet] = self._trade_counts.get(trade.wallet, 0) + 1
+        self.rankings["pnl"].add(trade.wallet, trade.realized_pnl_mon)
+        self.rankings["volume"].add(trade.wallet, trade.mon_volume)
+
+    def evict(self, now: float) -> int:
+        """
+        Drop trades older than the window
+
+        Returns:
+            Number of trades evicted
+        """
+        cutoff = now - self.length_seconds
+        evicted = 0
+        while self._trades and self._trades[0].timestamp < cutoff:
+            self._subtract(self._trades.popleft())
+            evicted += 1
+        return evicted
+
+    def remove_from_block(self, from_block: int) -> int:
+        """
+        Drop trades of orphaned blocks
+
+        Returns:
+            Number of trades removed
+        """
+        kept: Deque[LeaderboardTrade] = deque()
+        removed = 0
+        for trade in self._trades:
+            if trade.block_number >= from_block:
+                self._subtract(trade)
+                removed += 1
+            else:
+                kept.append(trade)
+        self._trades = kept
+        return removed
+
+    def _subtract(self, trade: LeaderboardTrade) -> None:
+        count = self._trade_counts[trade.wallet] - 1
+        if count == 0:
+            # No trades left in the window - drop the wallet instead of ranking a zero
+            del self._trade_counts[trade.wallet]
+            for ranking in self.rankings.values():
+                ranking.discard(trade.wallet)
+            return
+
+        self._trade_counts[trade.wallet] = count
+        self.rankings["pnl"].add(trade.wallet, -trade.realized_pnl_mon)
+        self.rankings["volume"].add(trade.wallet, -trade.mon_volume)
+
+
+class WalletLeaderboards:
+    """Thread-safe set of window leaderboards fed by swap ingestion"""
+
+    def __init__(self, periods: Tuple[str, ...]):
+        now = datetime.utcnow()
+        self.windows = {
+            period: WindowLeaderboard(period, (now - get_time_window(period)).total_seconds())
+            for period in periods
+        }
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def record_trade(
+            self,
+            wallet: str,
+            block_number: int,
+            realized_pnl_mon: Optional[Decimal],
+            mon_volume: Decimal,
+            timestamp: Optional[float] = None
+    ) -> None:
+        """Add an ingested swap to every window it falls in (by its block time)"""
+        now = time.time()
+        trade = LeaderboardTrade(
+            timestamp=timestamp if timestamp is not None else now,
+            block_number=block_number,
+            wallet=wallet,
+            realized_pnl_mon=realized_pnl_mon or Decimal(0),
+            mon_volume=mon_volume or Decimal(0)
+        )
+        with self._lock:
+            for window in self.windows.values():
+                window.evict(now)
+                if trade.timestamp >= now - window.length_seconds:
+                    window.add(trade)
+
+    def remove_from_block(self, from_block: int) -> int:
+        """Drop the trades of blocks orphaned by a reorg"""
+        with self._lock:
+            removed = [window.remove_from_block(from_block) for window in self.windows.values()]
+        return max(removed, default=0)
+
+    def top(self, period: str, metric: str, limit: int) -> Dict:
+        """
+        Top wallets of a window - O(limit), no DB access
+
+        Raises:
+            KeyError: If period or metric is unknown
+        """
+        window = self.windows[period]
+        with self._lock:
+            window.evict(time.time())
+            ranked = window.rankings[metric].top(limit)
+            wallets = len(window.rankings[metric])
+
+        return {
+            "period": period,
+            "metric": metric,
+            "wallets": wallets,
+            "entries": [
+                {"rank": rank, "wallet": wallet, "value_mon": str(score)}
+                for rank, (wallet, score) in enumerate(ranked, start=1)
+            ]
+        }
+
+    def load(self, db: Session) -> int:
+        """
+        Rebuild every window from the swaps of the longest window
+
+        Returns:
+            Number of trades loaded
+        """
+        longest = max(self.windows.values(), key=lambda window: window.length_seconds)
+        rows = Swap.get_trades_since(db, get_time_window(longest.period))
+
+        windows = {
+            period: WindowLeaderboard(period, window.length_seconds)
+            for period, window in self.windows.items()
+        }
+        now = time.time()
+        for row in rows:
+            trade = LeaderboardTrade(
+                timestamp=_to_unix(row.timestamp),
+                block_number=row.block_number,
+                wallet=row.wallet,
+                realized_pnl_mon=Decimal(row.realized_pnl_mon or 0),
+                mon_volume=Decimal(row.mon_amount or 0)
+            )
+            for window in windows.values():
+                if trade.timestamp >= now - window.length_seconds:
+                    window.add(trade)
+
+        with self._lock:
+            self.windows = windows
+            self._loaded = True
+
+        return len(rows)
+
+
+def _to_unix(timestamp: datetime) -> float:
+    """DB timestamp to unix seconds (naive timestamps are UTC)"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+wallet_leaderboards = WalletLeaderboards(PERIODS)
+
+
+def warm_leaderboards(db: Session) -> int:
+    """
+    Load the window leaderboards from recent swaps (call at startup)
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of trades loaded
+    """
+    try:
+        count = wallet_leaderboards.load(db)
+        logger.info("leaderboard", "Leaderboards warmed", {"trades": count})
+        return count
+    except Exception as e:
+        logger.error("leaderboard", "Failed to warm leaderboards", error=e)
+        return 0
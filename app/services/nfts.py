@@ -0,0 +1,251 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, List
+
+from app.db.models.nft import NFTTrade
+from app.db.models.processed_transactions import ProcessedTransaction
+from app.db.models.swap import Swap
+from app.services.reorg import (
+    detect_reorg_many,
+    discard_canonical_blocks,
+    handle_reorg,
+    parent_hashes,
+    record_canonical_blocks,
+)
+from app.services.swaps import ConcurrentBatchError, event_order_key, event_timestamp
+from app.utils.logger import logger
+from app.utils.utils import from_base_units, get_time_window, normalize_address, parse_raw_amount
+
+MON_DECIMALS = 18
+
+
+def nft_marker(tx_hash: str, log_index: int) -> str:
+    """
+    Key of an NFT sale in processed_transactions
+
+    Sales share the swaps' dedup table and its reorg cleanup, but a
+    transaction can hold a swap and several sales, so each sale is keyed
+    by its log rather than by the bare tx hash.
+    """
+    return f"nft:{tx_hash}:{log_index}"
+
+
+def _parse_nft_trade(event: dict) -> Optional[Dict[str, Any]]:
+    """
+    Parse an NFT sale from the webhook payload
+
+    Expected fields: txHash, blockNumber, blockHash, logIndex, contract,
+    tokenId, price (MON in wei), buyer, seller, and timestamp (block time,
+    unix seconds) when known
+
+    Returns:
+        Parsed sale, or None if a required field is missing or invalid
+    """
+    price = event.get("price", event.get("value"))
+    if price is None or price == "":
+        # Bad data, not a free sale - at 0 MON the seller would realize their whole cost as a loss
+        return None
+
+    try:
+        block_number = int(event.get("blockNumber", 0))
+        log_index = int(event.get("logIndex", 0))
+        value_wei = parse_raw_amount(price)
+    except (ValueError, TypeError):
+        return None
+
+    sale = {
+        "tx_hash": event.get("txHash"),
+        "log_index": log_index,
+        "block_number": block_number,
+        "block_hash": event.get("blockHash", ""),
+        "contract": normalize_address(event.get("contract", "")),
+        "token_id": str(event.get("tokenId", "")),
+        "value_mon": from_base_units(abs(value_wei), MON_DECIMALS),
+        "buyer": normalize_address(event.get("buyer", "")),
+        "seller": normalize_address(event.get("seller", "")),
+        "timestamp": event_timestamp(event),
+    }
+
+    if not sale["tx_hash"] or not block_number or not sale["block_hash"]:
+        return None
+    if not sale["contract"] or not sale["token_id"] or not (sale["buyer"] or sale["seller"]):
+        return None
+
+    return sale
+
+
+def process_nft_batch(events: List[dict], db: Session, retry: bool = True) -> List[Dict[str, Any]]:
+    """
+    Process a whole webhook batch of NFT sales in one transaction
+
+    - Reorg check and canonical block tracking shared with swaps
+    - One dedup query against processed_transactions
+    - One cost-basis query for all sold NFTs (ix_nft_contract_token)
+    - Each sale stored as a buy row for the buyer and a sell row for the
+      seller; the sell realizes value - the seller's last buy price
+    - One bulk insert each for trades and processed markers, one commit
+
+    Args:
+        events: NFT sale events from the webhook payload
+        db: Database session
+        retry: Run the batch once more if a concurrent batch processed
+            some of its sales first
+
+    Returns:
+        One result dictionary per event (success, tx_hash, error), in payload order
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+
+    def _set_result(index: int, success: bool, error: Optional[str] = None):
+        results[index] = {
+            "success": success,
+            "tx_hash": events[index].get("txHash", "unknown"),
+            "error": error
+        }
+
+    # --- Validate ---
+    valid = []  # (order_key, index, sale)
+    for index, event in enumerate(events):
+        sale = _parse_nft_trade(event)
+        if sale is None:
+            _set_result(index, False, "Missing or invalid NFT trade data")
+            continue
+        valid.append((event_order_key(event), index, sale))
+
+    # Cost basis only makes sense in chain order
+    valid.sort(key=lambda item: (item[0], item[1]))
+
+    pending: List[int] = []
+    tracked: Dict[int, str] = {}  # blocks this batch added to the chain tracker
+
+    try:
+        # --- Reorg check ---
+        blocks = {(sale["block_number"], sale["block_hash"]) for _, _, sale in valid}
+        reorg_block = detect_reorg_many(blocks, db, parent_hashes(events[index] for _, index, _ in valid))
+        if reorg_block is not None:
+            handle_reorg(reorg_block, db)
+            logger.warn("nfts", f"Handled reorg at block {reorg_block}")
+
+        # --- Dedup ---
+        markers = {index: nft_marker(sale["tx_hash"], sale["log_index"]) for _, index, sale in valid}
+        seen = ProcessedTransaction.get_processed_hashes(db, markers.values())
+
+        costs = NFTTrade.get_last_buys(db, [(sale["contract"], sale["token_id"]) for _, _, sale in valid])
+
+        trade_rows = []
+        processed_rows = []
+
+        for _, index, sale in valid:
+            marker = markers[index]
+            if marker in seen:
+                _set_result(index, True)
+                continue
+            seen.add(marker)
+
+            item = (sale["contract"], sale["token_id"])
+            row = {key: sale[key] for key in (
+                "tx_hash", "log_index", "block_number", "block_hash", "contract", "token_id", "value_mon", "timestamp"
+            )}
+
+            if sale["seller"]:
+                cost = costs.pop((sale["seller"], *item), None)
+                trade_rows.append({
+                    **row,
+                    "wallet": sale["seller"],
+                    "is_sell": True,
+                    "realized_pnl_mon": sale["value_mon"] - cost if cost is not None else None
+                })
+
+            if sale["buyer"]:
+                costs[(sale["buyer"], *item)] = sale["value_mon"]
+                trade_rows.append({**row, "wallet": sale["buyer"], "is_sell": False, "realized_pnl_mon": None})
+
+            processed_rows.append({
+                "tx_hash": marker,
+                "block_number": sale["block_number"],
+                "block_hash": sale["block_hash"]
+            })
+            pending.append(index)
+
+        # --- Write ---
+        if ProcessedTransaction.add_processed_bulk(db, processed_rows) < len(processed_rows):
+            raise ConcurrentBatchError("Sales of this batch were processed concurrently")
+        NFTTrade.add_nft_trades_bulk(db, trade_rows)
+        tracked = record_canonical_blocks(sorted(blocks), db)
+        db.commit()
+
+        for index in pending:
+            _set_result(index, True)
+
+        logger.info("nfts", "Processed NFT trade batch", {
+            "events": len(events),
+            "trades": len(trade_rows),
+            "processed": len(processed_rows)
+        })
+
+    except ConcurrentBatchError as e:
+        db.rollback()
+        discard_canonical_blocks(tracked)
+        if retry:
+            # Cost bases and dedup have to be read again
+            logger.warn("nfts", "Retrying NFT batch after concurrent processing", {"events": len(events)})
+            return process_nft_batch(events, db, retry=False)
+
+        logger.error("nfts", "Error processing NFT trade batch", error=e, context={"events": len(events)})
+        for index in range(len(events)):
+            if results[index] is None or index in pending:
+                _set_result(index, False, str(e))
+
+    except Exception as e:
+        db.rollback()
+        # Blocks tracked by the failed transaction weren't persisted
+        discard_canonical_blocks(tracked)
+        logger.error("nfts", "Error processing NFT trade batch", error=e, context={
+            "events": len(events)
+        })
+        for index in range(len(events)):
+            if results[index] is None or index in pending:
+                _set_result(index, False, str(e))
+
+    return results
+
+
+def get_wallet_nft_summary(wallet: str, db: Session, period: Optional[str] = None) -> Dict:
+    """
+    NFT volume and realized PnL of a wallet, next to its swap volume
+
+    Args:
+        wallet: Wallet address
+        db: Database session
+        period: Optional "1d", "7d" or "30d" window (all time if omitted)
+
+    Returns:
+        Dictionary with NFT trade statistics and swap volume in MON
+
+    Raises:
+        ValueError: If period is invalid
+    """
+    wallet = normalize_address(wallet)
+    since = get_time_window(period) if period else None
+
+    nft = NFTTrade.get_wallet_stats(db, wallet, since)
+    swaps = Swap.get_wallet_volume(db, wallet, since)
+    nft_volume = nft["buy_volume_mon"] + nft["sell_volume_mon"]
+
+    return {
+        "wallet": wallet,
+        "period": period or "all",
+        "nft": {
+            "trades": nft["trades"],
+            "buys": nft["buys"],
+            "sells": nft["sells"],
+            "buy_volume_mon": str(nft["buy_volume_mon"]),
+            "sell_volume_mon": str(nft["sell_volume_mon"]),
+            "volume_mon": str(nft_volume),
+            "realized_pnl_mon": str(nft["realized_pnl_mon"])
+        },
+        "swaps": {
+            "trades": swaps["trades"],
+            "volume_mon": str(swaps["volume_mon"])
+        },
+        "total_volume_mon": str(nft_volume + swaps["volume_mon"])
+    }
@@ -1,14 +1,240 @@
+import threading
+import time
 from sqlalchemy.orm import Session
-from typing import Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
-from app.api.rpc import get_pool_tokens
+from app.api.rpc import get_pool_tokens, get_pool_tokens_many
+from app.api.rpc_async import async_rpc
+from app.config.config import config
 from app.db.models.pool import Pool
 from app.utils.logger import logger
 
 
+class PoolRegistry:
+    """
+    In-process cache of pool address -> (token0, token1)
+
+    Token pairs never change once a pool is deployed, so resolved entries
+    never expire. Pools whose token0()/token1() calls failed are cached
+    negatively for a TTL so they aren't re-queried over RPC on every event.
+    """
+
+    def __init__(self, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        self._tokens: Dict[str, Tuple[str, str]] = {}
+        self._failed: Dict[str, float] = {}
+        self._unsaved: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def get(self, address: str) -> Optional[Tuple[str, str]]:
+        """Get cached (token0, token1) for a pool"""
+        return self._tokens.get(address)
+
+    def put(self, address: str, token0: str, token1: str) -> None:
+        """Cache the token pair of a pool"""
+        with self._lock:
+            self._tokens[address] = (token0, token1)
+            self._failed.pop(address, None)
+
+    def put_unsaved(self, address: str, token0: str, token1: str) -> None:
+        """Cache a pool resolved outside a DB session - stored by the next DB-backed lookup"""
+        with self._lock:
+            self._tokens[address] = (token0, token1)
+            self._failed.pop(address, None)
+            self._unsaved[address] = (token0, token1)
+
+    def take_unsaved(self) -> Dict[str, Tuple[str, str]]:
+        """Get and clear the pools that still need to be stored"""
+        if not self._unsaved:
+            return {}
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+        return unsaved
+
+    def restore_unsaved(self, pools: Dict[str, Tuple[str, str]]) -> None:
+        """Put back pools whose store failed - retried by the next DB-backed lookup"""
+        with self._lock:
+            self._unsaved = {**pools, **self._unsaved}
+
+    def is_failed(self, address: str) -> bool:
+        """Check if a pool recently failed token resolution"""
+        failed_at = self._failed.get(address)
+        if failed_at is None:
+            return False
+
+        if time.monotonic() - failed_at >= self.negative_ttl:
+            with self._lock:
+                self._failed.pop(address, None)
+            return False
+
+        return True
+
+    def mark_failed(self, address: str) -> None:
+        """Negatively cache a pool whose token resolution failed"""
+        with self._lock:
+            self._failed[address] = time.monotonic()
+
+    def load(self, db: Session) -> int:
+        """
+        Preload every known pool from the database
+
+        Returns:
+            Number of pools cached
+        """
+        rows = db.query(Pool.address, Pool.token0, Pool.token1).all()
+        with self._lock:
+            for row in rows:
+                self._tokens[row.address] = (row.token0, row.token1)
+        return len(rows)
+
+
+pool_registry = PoolRegistry(negative_ttl=config.POOL_NEGATIVE_CACHE_TTL)
+
+
+def warm_pool_registry(db: Session) -> int:
+    """
+    Load the pools table into the in-memory registry (call at startup)
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of pools loaded
+    """
+    try:
+        count = pool_registry.load(db)
+        logger.info("pools", "Pool registry warmed", {"pools": count})
+        return count
+    except Exception as e:
+        logger.error("pools", "Failed to warm pool registry", error=e)
+        return 0
+
+
+async def prefetch_pools(pool_addresses: Iterable[str]) -> int:
+    """
+    Resolve pools unknown to the registry with the async RPC client
+
+    Runs on the event loop before a batch is handed to the worker pool,
+    so RPC latency and retries never block a worker. Resolved pools are
+    stored in the DB by the next get_pools_info/get_or_create_pool_info.
+
+    Args:
+        pool_addresses: Pool contract addresses
+
+    Returns:
+        Number of pools resolved
+    """
+    unknown = [
+        address for address in set(pool_addresses)
+        if address and pool_registry.get(address) is None and not pool_registry.is_failed(address)
+    ]
+    if not unknown:
+        return 0
+
+    try:
+        resolved = await async_rpc.get_pool_tokens_many(unknown)
+    except Exception as e:
+        logger.warn("pools", "Async pool prefetch failed, workers will retry", {
+            "pools": len(unknown),
+            "error": str(e)
+        })
+        return 0
+
+    for address in unknown:
+        if address in resolved:
+            pool_registry.put_unsaved(address, *resolved[address])
+        else:
+            pool_registry.mark_failed(address)
+
+    return len(resolved)
+
+
+def _store_unsaved_pools(db: Session) -> None:
+    """Store pools that were resolved by prefetch_pools"""
+    unsaved = pool_registry.take_unsaved()
+    if not unsaved:
+        return
+
+    try:
+        added = Pool.add_pools_bulk(db, unsaved)
+        logger.info("pools", "Pools added to database", {"pools": added})
+    except Exception as e:
+        pool_registry.restore_unsaved(unsaved)
+        logger.error("pools", "Failed to store prefetched pools, will retry", error=e)
+
+
+def get_pools_info(pool_addresses: Iterable[str], db: Session) -> Dict[str, Tuple[str, str]]:
+    """
+    Get token pairs for many pools (e.g. every pool in a webhook batch)
+
+    Lookup order: in-memory registry, one DB query for the misses, then a
+    single JSON-RPC batch for pools that are unknown everywhere. Newly
+    resolved pools are stored with one bulk INSERT.
+
+    Args:
+        pool_addresses: Pool contract addresses
+        db: Database session
+
+    Returns:
+        Dictionary of pool address -> (token0, token1); pools that could
+        not be resolved are left out
+    """
+    _store_unsaved_pools(db)
+
+    result = {}
+    missing = []
+
+    for address in set(pool_addresses):
+        if not address:
+            continue
+        tokens = pool_registry.get(address)
+        if tokens:
+            result[address] = tokens
+        elif not pool_registry.is_failed(address):
+            missing.append(address)
+
+    if not missing:
+        return result
+
+    for address, pool in Pool.get_pools(db, missing).items():
+        pool_registry.put(address, pool.token0, pool.token1)
+        result[address] = (pool.token0, pool.token1)
+
+    unknown = [address for address in missing if address not in result]
+    if not unknown:
+        return result
+
+    try:
+        resolved = get_pool_tokens_many(unknown)
+    except Exception as e:
+        logger.error("pools", "Failed to resolve pools via RPC batch", error=e, context={
+            "pools": len(unknown)
+        })
+        return result
+
+    for address in unknown:
+        if address in resolved:
+            pool_registry.put(address, *resolved[address])
+            result[address] = resolved[address]
+        else:
+            pool_registry.mark_failed(address)
+
+    try:
+        added = Pool.add_pools_bulk(db, resolved)
+        logger.info("pools", "Pools added to database", {"pools": added})
+    except Exception as e:
+        pool_registry.restore_unsaved(resolved)
+        logger.error("pools", "Failed to store resolved pools, will retry", error=e)
+
+    return result
+
+
 def get_or_create_pool_info(pool_address: str, db: Session) -> Tuple[str, str]:
     """
-    Get pool token information from database or fetch from RPC
+    Get pool token information from registry, database or RPC
 
     Args:
         pool_address: Pool contract address
@@ -21,20 +247,36 @@ def get_or_create_pool_info(pool_address: str, db: Session) -> Tuple[str, str]:
         Exception: If unable to fetch pool tokens
     """
     pool_address = pool_address.lower()
+    _store_unsaved_pools(db)
 
-    # Try to get from database first
-    if Pool.exists(db, pool_address):
-        pool = Pool.get_pool(db, pool_address)
-        if pool:
-            logger.info("pools", f"Pool found in database", {"pool": pool_address})
-            return pool.token0, pool.token1
+    # In-memory registry first - no DB round trip on the hot path
+    tokens = pool_registry.get(pool_address)
+    if tokens:
+        return tokens
+
+    if pool_registry.is_failed(pool_address):
+        raise ValueError(f"Pool {pool_address} recently failed token resolution")
+
+    # Try the database next
+    pool = Pool.get_pool(db, pool_address)
+    if pool:
+        logger.info("pools", f"Pool found in database", {"pool": pool_address})
+        pool_registry.put(pool_address, pool.token0, pool.token1)
+        return pool.token0, pool.token1
 
     # Fetch from RPC if not in database
     try:
         logger.info("pools", f"Fetching pool tokens from RPC", {"pool": pool_address})
         token0, token1 = get_pool_tokens(pool_address)
+    except Exception as e:
+        pool_registry.mark_failed(pool_address)
+        logger.error("pools", f"Failed to get pool info for {pool_address}", error=e)
+        raise
+
+    pool_registry.put(pool_address, token0, token1)
 
-        # Store in database for future use
+    # Store in database for future use
+    try:
         Pool.add_pool(db, pool_address, token0, token1)
 
         logger.info("pools", f"Pool added to database", {
@@ -42,9 +284,8 @@ def get_or_create_pool_info(pool_address: str, db: Session) -> Tuple[str, str]:
             "token0": token0,
             "token1": token1
         })
-
-        return token0, token1
-
     except Exception as e:
-        logger.error("pools", f"Failed to get pool info for {pool_address}", error=e)
-        raise
\ No newline at end of file
+        pool_registry.restore_unsaved({pool_address: (token0, token1)})
+        logger.error("pools", f"Failed to store pool {pool_address}, will retry", error=e)
+
+    return token0, token1
@@ -0,0 +1,247 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from app.config.config import config
+from app.db.database import SessionLocal
+from app.db.models.position import Position
+from app.utils.logger import logger
+
+PositionKey = Tuple[str, str]  # (wallet, token)
+
+
+class PositionCache:
+    """
+    Write-behind cache of position state, keyed by (wallet, token)
+
+    Batches check positions out as copies, apply their trades to them in
+    memory and hand them back when their transaction commits; the
+    positions table is then written by flush() - one upsert per dirty
+    position per flush instead of one write per trade.
+
+    Every change to a key gives it a new version from a commit clock. A
+    batch whose positions were changed by another batch since it checked
+    them out is rejected (commit() returns False) and is expected to run
+    again. Versions are only kept for cached keys; keys without one are
+    at the clock value of the last eviction, so a key evicted while a
+    batch held it still rejects that batch. Flushes write
+    a snapshot outside the commit lock and only mark positions clean that
+    didn't change meanwhile.
+    """
+
+    def __init__(self, max_dirty: int, max_entries: int):
+        self.max_dirty = max_dirty
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[PositionKey, Position]" = OrderedDict()
+        self._versions: Dict[PositionKey, int] = {}
+        self._clock = 0  # version of the latest commit
+        self._floor = 0  # version of keys that have none (clock at the last eviction)
+        self._generation = 0
+        self._dirty: Set[PositionKey] = set()
+        self._suspensions = 0  # checkouts wait while > 0 (see suspended)
+        self._lock = threading.Lock()
+        self._resumed = threading.Condition(self._lock)
+        self._flush_lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    @staticmethod
+    def _copy(position: Position) -> Position:
+        """Detached copy that no session will ever write"""
+        return Position(**position.to_row())
+
+    def checkout(
+            self,
+            db: Session,
+            keys: Iterable[PositionKey]
+    ) -> Tuple[Dict[PositionKey, Position], Tuple[int, Dict[PositionKey, int]]]:
+        """
+        Get working copies of positions, loading the ones not cached with one query
+
+        Args:
+            db: Database session (of the batch's transaction)
+            keys: (wallet, token) pairs
+
+        Returns:
+            Tuple of ((wallet, token) -> Position for the positions that
+            exist, and the versions to pass to commit())
+        """
+        keys = set(keys)
+        with self._lock:
+            while self._suspensions:
+                self._resumed.wait()
+            versions = (self._generation, {key: self._versions.get(key, self._floor) for key in keys})
+            positions = {key: self._copy(self._entries[key]) for key in keys if key in self._entries}
+
+        missing = [key for key in keys if key not in positions]
+        for key, position in Position.get_positions(db, missing).items():
+            positions[key] = self._copy(position)
+
+        return positions, versions
+
+    def commit(
+            self,
+            db: Session,
+            positions: Dict[PositionKey, Position],
+            versions: Tuple[int, Dict[PositionKey, int]]
+    ) -> bool:
+        """
+        Commit the batch's transaction and publish its positions as dirty
+
+        Returns:
+            False (nothing committed) if another batch changed one of the
+            positions since checkout(); True otherwise
+        """
+        generation, key_versions = versions
+        with self._lock:
+            if generation != self._generation or any(
+                    self._versions.get(key, self._floor) != version for key, version in key_versions.items()
+            ):
+                return False
+
+            db.commit()
+
+            self._clock += 1
+            for key, position in positions.items():
+                self._entries[key] = position
+                self._entries.move_to_end(key)
+                self._versions[key] = self._clock
+                self._dirty.add(key)
+
+        return True
+
+    def flush(self, db: Session) -> int:
+        """
+        Write every dirty position with batched upserts, and commit
+
+        Returns:
+            Number of positions written
+        """
+        with self._flush_lock:
+            with self._lock:
+                snapshot = {key: self._versions[key] for key in self._dirty}
+                rows = [self._entries[key].to_row() for key in snapshot]
+
+            if not rows:
+                return 0
+
+            try:
+                written = Position.upsert_trade_states(db, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            with self._lock:
+                for key, version in snapshot.items():
+                    if self._versions.get(key) == version:
+                        self._dirty.discard(key)
+                self._evict()
+
+        logger.info("position_cache", "Flushed positions", {"positions": written, "cached": len(self)})
+        return written
+
+    def _evict(self) -> None:
+        """Drop least recently committed clean entries, and their versions, beyond max_entries"""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+
+        for key in list(self._entries):
+            if excess <= 0:
+                break
+            if key not in self._dirty:
+                del self._entries[key]
+                del self._versions[key]
+                excess -= 1
+        self._floor = self._clock
+
+    def flush_if_full(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Flush with a new session once max_dirty positions wait to be written"""
+        if len(self._dirty) < self.max_dirty:
+            return 0
+        return _with_session(self.flush, session_factory)
+
+    def invalidate(self, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """
+        Flush, then forget every cached position (before positions are rewritten)
+
+        Working copies checked out before are rejected by commit().
+
+        Returns:
+            Number of positions flushed
+        """
+        return self._clear(session_factory, suspend=False)
+
+    @contextmanager
+    def suspended(self, session_factory: Callable[[], Session] = SessionLocal) -> Iterator[int]:
+        """
+        Invalidate, and hold every checkout until the block exits
+
+        Wraps a transaction that rewrites positions (reorg rollback): batches
+        can't read positions before it commits, so they never check out
+        the pre-rollback rows under the new generation.
+
+        Yields:
+            Number of positions flushed
+        """
+        written = self._clear(session_factory, suspend=True)
+        try:
+            yield written
+        finally:
+            with self._lock:
+                self._suspensions -= 1
+                self._resumed.notify_all()
+
+    def _clear(self, session_factory: Callable[[], Session], suspend: bool) -> int:
+        written = 0
+        with self._flush_lock:
+            while True:
+                written += _with_session(self.flush, session_factory)
+                with self._lock:
+                    # Batches may have committed during the flush
+                    if self._dirty:
+                        continue
+                    self._entries.clear()
+                    self._versions.clear()
+                    self._floor = self._clock
+                    self._generation += 1
+                    if suspend:
+                        self._suspensions += 1
+                    return written
+
+
+def _with_session(task: Callable[[Session], int], session_factory: Callable[[], Session]) -> int:
+    db = session_factory()
+    try:
+        return task(db)
+    finally:
+        db.close()
+
+
+position_cache: Optional[PositionCache] = (
+    PositionCache(config.POSITION_CACHE_MAX_DIRTY, config.POSITION_CACHE_MAX_ENTRIES)
+    if config.POSITION_CACHE_ENABLED else None
+)
+
+
+def flush_position_cache(db: Session) -> int:
+    """
+    Periodic task: write dirty cached positions
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of positions written
+    """
+    if position_cache is None:
+        return 0
+    return position_cache.flush(db)
@@ -1,12 +1,53 @@
 from sqlalchemy.orm import Session
 from decimal import Decimal
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 from app.db.models.position import Position
+from app.db.models.position_delta import PositionDelta
 from app.utils.logger import logger
 from app.utils.utils import normalize_address
 
 
+def classify_position_trade(
+        token_in: str,
+        token_out: str,
+        amount_in: Decimal,
+        amount_out: Decimal,
+        mon_address: str
+) -> Optional[Tuple[str, bool, Decimal, Decimal]]:
+    """
+    Work out how a swap affects a position
+
+    - Buying token: token_in is the token, token_out is MON
+    - Selling token: token_out is the token, token_in is MON
+
+    Args:
+        token_in: Token received (normalized)
+        token_out: Token sent (normalized)
+        amount_in: Amount received
+        amount_out: Amount sent
+        mon_address: MON token address (normalized)
+
+    Returns:
+        Tuple of (token, is_buy, token_amount, price_per_token_mon),
+        or None if MON is not on exactly one side of the swap
+    """
+    # Case 1: Buying token with MON
+    if token_out == mon_address and token_in != mon_address:
+        # Price = MON spent / Tokens received
+        price_per_token = amount_out / amount_in if amount_in > 0 else Decimal(0)
+        return token_in, True, amount_in, price_per_token
+
+    # Case 2: Selling token for MON
+    if token_in == mon_address and token_out != mon_address:
+        # Price = MON received / Tokens sold
+        price_per_token = amount_in / amount_out if amount_out > 0 else Decimal(0)
+        return token_out, False, amount_out, price_per_token
+
+    # Case 3: No MON involved
+    return None
+
+
 def process_swap_for_position(
         wallet: str,
         token_in: str,
@@ -14,8 +55,9 @@ def process_swap_for_position(
         amount_in: Decimal,
         amount_out: Decimal,
         mon_address: str,
-        db: Session
-) -> bool:
+        db: Session,
+        block_number: Optional[int] = None
+) -> Optional[Decimal]:
     """
     Process a swap and update positions accordingly
 
@@ -31,9 +73,12 @@ def process_swap_for_position(
         amount_out: Amount sent
         mon_address: MON token address
         db: Database session
+        block_number: Block of the swap - records the reorg undo state when given
+
+    Nothing is committed - the caller commits, or rolls back on failure.
 
     Returns:
-        True if successful, False otherwise
+        Realized PnL of the trade in MON (0 for buys and non-MON swaps), or None on failure
     """
     wallet = normalize_address(wallet)
     token_in = normalize_address(token_in)
@@ -41,60 +86,56 @@ def process_swap_for_position(
     mon_address = normalize_address(mon_address)
 
     try:
-        # Case 1: Buying token with MON (token_in is the token, token_out is MON)
-        if token_out == mon_address and token_in != mon_address:
-            # Price = MON spent / Tokens received
-            price_per_token = amount_out / amount_in if amount_in > 0 else Decimal(0)
+        trade = classify_position_trade(token_in, token_out, amount_in, amount_out, mon_address)
+
+        # No MON involved - ignore for position tracking
+        if trade is None:
+            logger.info("positions", "Swap without MON - no position update", {
+                "wallet": wallet,
+                "token_in": token_in,
+                "token_out": token_out
+            })
+            return Decimal(0)
 
-            Position.update_on_buy(
+        token, is_buy, token_amount, price_per_token = trade
+
+        if block_number is not None:
+            _record_position_delta(db, block_number, wallet, token)
+
+        if is_buy:
+            position = Position.update_on_buy(
                 db=db,
                 wallet=wallet,
-                token=token_in,
-                buy_amount=amount_in,
+                token=token,
+                buy_amount=token_amount,
                 buy_price_mon=price_per_token
             )
 
             logger.info("positions", f"Position updated - BUY", {
                 "wallet": wallet,
-                "token": token_in,
-                "amount": str(amount_in),
+                "token": token,
+                "amount": str(token_amount),
                 "price": str(price_per_token),
                 "cost": str(amount_out)
             })
-
-            return True
-
-        # Case 2: Selling token for MON (token_out is the token, token_in is MON)
-        elif token_in == mon_address and token_out != mon_address:
-            # Price = MON received / Tokens sold
-            price_per_token = amount_in / amount_out if amount_out > 0 else Decimal(0)
-
-            Position.update_on_sell(
+        else:
+            position = Position.update_on_sell(
                 db=db,
                 wallet=wallet,
-                token=token_out,
-                sell_amount=amount_out,
+                token=token,
+                sell_amount=token_amount,
                 sell_price_mon=price_per_token
             )
 
             logger.info("positions", f"Position updated - SELL", {
                 "wallet": wallet,
-                "token": token_out,
-                "amount": str(amount_out),
+                "token": token,
+                "amount": str(token_amount),
                 "price": str(price_per_token),
                 "revenue": str(amount_in)
             })
 
-            return True
-
-        # Case 3: No MON involved - ignore for position tracking
-        else:
-            logger.info("positions", "Swap without MON - no position update", {
-                "wallet": wallet,
-                "token_in": token_in,
-                "token_out": token_out
-            })
-            return True
+        return position.last_trade_pnl_mon if position is not None else Decimal(0)
 
     except Exception as e:
         logger.error("positions", "Failed to process swap for position", error=e, context={
@@ -102,7 +143,73 @@ def process_swap_for_position(
             "token_in": token_in,
             "token_out": token_out
         })
-        return False
+        return None
+
+
+def _record_position_delta(db: Session, block_number: int, wallet: str, token: str) -> None:
+    """
+    Store the reorg undo state of a position before its first change in a block
+
+    Written in the same transaction as the position update that follows.
+    """
+    if db.get(PositionDelta, (block_number, wallet, token)) is not None:
+        return
+
+    position = Position.get_position(db, wallet, token)
+    PositionDelta.add_deltas_bulk(db, [PositionDelta.build(block_number, wallet, token, position)])
+
+
+def apply_swap_to_positions(
+        positions: Dict[Tuple[str, str], Position],
+        wallet: str,
+        token_in: str,
+        token_out: str,
+        amount_in: Decimal,
+        amount_out: Decimal,
+        mon_address: str,
+        db: Optional[Session]
+) -> Optional[Position]:
+    """
+    Apply a swap to an in-memory map of positions (batch ingestion, rebuilds)
+
+    New positions are added to the map, and to the session if one is
+    given. Nothing is committed - the caller commits the whole batch at once.
+
+    Args:
+        positions: (wallet, token) -> Position, preloaded for the batch
+        wallet: Wallet address (normalized)
+        token_in: Token received (normalized)
+        token_out: Token sent (normalized)
+        amount_in: Amount received
+        amount_out: Amount sent
+        mon_address: MON token address (normalized)
+        db: Database session, or None to keep new positions out of any session
+
+    Returns:
+        The touched Position, or None if the swap doesn't affect positions
+    """
+    trade = classify_position_trade(token_in, token_out, amount_in, amount_out, mon_address)
+    if trade is None:
+        return None
+
+    token, is_buy, token_amount, price_per_token = trade
+    key = (wallet, token)
+    position = positions.get(key)
+
+    if position is None:
+        # First trade creates the position (a first sell opens it short)
+        position = Position.new_position(
+            wallet, token, token_amount if is_buy else -token_amount, price_per_token
+        )
+        positions[key] = position
+        if db is not None:
+            db.add(position)
+    elif is_buy:
+        position.apply_buy(token_amount, price_per_token)
+    else:
+        position.apply_sell(token_amount, price_per_token)
+
+    return position
 
 
 def get_wallet_portfolio(wallet: str, db: Session) -> Dict:
@@ -238,78 +345,92 @@ def update_unrealized_pnl_for_token(
         Number of positions updated
     """
     token = normalize_address(token)
+    return reprice_positions({token: current_price_mon}, db).get(token, 0)
+
+
+def reprice_positions(prices: Dict[str, Decimal], db: Session) -> Dict[str, int]:
+    """
+    Mark positions of many tokens to market in one transaction
+
+    Each token is a single set-based UPDATE over its open positions.
+
+    Args:
+        prices: Token address -> current price per token in MON
+        db: Database session
+
+    Returns:
+        Dictionary of token -> number of positions updated
+    """
+    prices = {normalize_address(token): price for token, price in prices.items()}
 
     try:
-        # Get all positions for this token
-        positions = db.query(Position).filter(
-            Position.token == token,
-            Position.amount > 0
-        ).all()
-
-        count = 0
-        for position in positions:
-            Position.update_unrealized_pnl(
-                db=db,
-                wallet=position.wallet,
-                token=token,
-                current_price_mon=current_price_mon
-            )
-            count += 1
+        counts = Position.reprice_tokens(db, prices)
+        db.commit()
 
-        logger.info("positions", f"Updated unrealized PnL for {count} positions", {
-            "token": token,
-            "price": str(current_price_mon)
+        logger.info("positions", f"Updated unrealized PnL for {sum(counts.values())} positions", {
+            "tokens": len(prices)
         })
 
-        return count
+        return counts
 
     except Exception as e:
+        db.rollback()
         logger.error("positions", "Failed to update unrealized PnL", error=e, context={
-            "token": token,
-            "price": str(current_price_mon)
+            "tokens": len(prices)
         })
-        return 0
+        raise
+
+
+def encode_leaderboard_cursor(entry: Dict) -> str:
+    """Keyset cursor pointing after a leaderboard entry, as total_pnl:wallet:token"""
+    return f"{entry['total_pnl_mon']}:{entry['wallet']}:{entry['token']}"
+
+
+def decode_leaderboard_cursor(cursor: str) -> Tuple[Decimal, str, str]:
+    """
+    Parse a leaderboard cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        total_pnl, wallet, token = cursor.split(":")
+        return Decimal(total_pnl), wallet, token
+    except (ValueError, ArithmeticError):
+        raise ValueError(f"Invalid cursor: {cursor}")
 
 
-def get_top_positions_by_pnl(limit: int = 100, db: Session = None) -> List[Dict]:
+def get_top_positions_by_pnl(
+        limit: int = 100,
+        db: Session = None,
+        after: Optional[Tuple[Decimal, str, str]] = None
+) -> List[Dict]:
     """
     Get top positions by total PnL for leaderboard
 
+    Ranked in the database on the stored total_pnl_mon column, so only
+    `limit` rows are read.
+
     Args:
         limit: Number of results to return
         db: Database session
+        after: Keyset cursor (see decode_leaderboard_cursor) - start after this entry
 
     Returns:
         List of position dictionaries sorted by PnL
     """
     try:
-        # Get all positions with non-zero amounts
-        positions = db.query(Position).filter(Position.amount > 0).all()
-
-        # Calculate total PnL for each and sort
-        positions_with_pnl = []
-        for pos in positions:
-            total_pnl = Position.get_total_pnl(pos)
-            positions_with_pnl.append({
+        return [
+            {
                 "wallet": pos.wallet,
                 "token": pos.token,
                 "amount": str(pos.amount),
                 "realized_pnl_mon": str(pos.realized_pnl_mon or Decimal(0)),
                 "unrealized_pnl_mon": str(pos.unrealized_pnl_mon or Decimal(0)),
-                "total_pnl_mon": str(total_pnl),
-                "total_pnl_decimal": total_pnl  # For sorting
-            })
-
-        # Sort by total PnL descending
-        positions_with_pnl.sort(key=lambda x: x["total_pnl_decimal"], reverse=True)
-
-        # Remove sorting helper and limit results
-        result = []
-        for pos in positions_with_pnl[:limit]:
-            del pos["total_pnl_decimal"]
-            result.append(pos)
-
-        return result
+                "total_pnl_mon": str(pos.total_pnl_mon)
+            }
+            for pos in Position.get_leaderboard_page(db, limit, after)
+        ]
 
     except Exception as e:
         logger.error("positions", "Failed to get top positions", error=e)
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from app.config.config import config
+from app.services.position_cache import position_cache
+from app.services.positions import reprice_positions
+from app.utils.logger import logger
+
+PRICE_SOURCES = ("last", "vwap")
+
+
+class TokenPrice:
+    """Last trade price and a sliding-window VWAP for one token"""
+
+    def __init__(self):
+        self.last_price: Optional[Decimal] = None
+        self.last_trade_at: Optional[float] = None
+        self._trades: Deque[Tuple[float, Decimal, Decimal]] = deque()  # (timestamp, mon, tokens)
+        self._mon_volume = Decimal(0)
+        self._token_volume = Decimal(0)
+
+    def add(self, timestamp: float, price: Decimal, token_amount: Decimal) -> None:
+        mon_amount = price * token_amount
+        self.last_price = price
+        self.last_trade_at = timestamp
+        self._trades.append((timestamp, mon_amount, token_amount))
+        self._mon_volume += mon_amount
+        self._token_volume += token_amount
+
+    def evict(self, cutoff: float) -> None:
+        """Drop trades older than the VWAP window"""
+        while self._trades and self._trades[0][0] < cutoff:
+            _, mon_amount, token_amount = self._trades.popleft()
+            self._mon_volume -= mon_amount
+            self._token_volume -= token_amount
+
+        if not self._trades:
+            # Reset the running sums so rounding never accumulates
+            self._mon_volume = Decimal(0)
+            self._token_volume = Decimal(0)
+
+    @property
+    def vwap(self) -> Optional[Decimal]:
+        """Volume-weighted average price over the window, or the last price if the window is empty"""
+        if self._token_volume > 0:
+            return self._mon_volume / self._token_volume
+        return self.last_price
+
+    def snapshot(self) -> Dict:
+        return {
+            "last_price_mon": str(self.last_price) if self.last_price is not None else None,
+            "vwap_mon": str(self.vwap) if self.vwap is not None else None,
+            "window_trades": len(self._trades),
+            "last_trade_at": self.last_trade_at
+        }
+
+
+class PriceOracle:
+    """
+    Token prices in MON derived from ingested MON swaps
+
+    Every MON swap implies a price (MON amount / token amount). The oracle
+    keeps the last trade price and a VWAP over `window_seconds` per token,
+    and remembers which tokens traded since the last mark-to-market.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._prices: Dict[str, TokenPrice] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def record_trade(self, token: str, price_mon: Decimal, token_amount: Decimal,
+                     timestamp: Optional[float] = None) -> None:
+        """Feed the implied price of an ingested swap (ignored once older than the window)"""
+        if price_mon is None or price_mon <= 0 or token_amount is None or token_amount <= 0:
+            return
+
+        now = time.time()
+        timestamp = timestamp if timestamp is not None else now
+        if timestamp < now - self.window_seconds:
+            return
+        with self._lock:
+            price = self._prices.get(token)
+            if price is None:
+                price = self._prices[token] = TokenPrice()
+            price.evict(timestamp - self.window_seconds)
+            price.add(timestamp, price_mon, token_amount)
+            self._dirty.add(token)
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Current last price and VWAP of a token"""
+        with self._lock:
+            price = self._prices.get(token)
+            if price is None:
+                return None
+            price.evict(time.time() - self.window_seconds)
+            return price.snapshot()
+
+    def take_dirty_prices(self, source: str) -> Dict[str, Decimal]:
+        """
+        Get and clear the prices of tokens that traded since the last call
+
+        Args:
+            source: "last" (last trade price) or "vwap"
+
+        Returns:
+            Dictionary of token -> price in MON
+        """
+        now = time.time()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            prices = {}
+            for token in dirty:
+                price = self._prices[token]
+                price.evict(now - self.window_seconds)
+                value = price.vwap if source == "vwap" else price.last_price
+                if value is not None:
+                    prices[token] = value
+        return prices
+
+    def mark_dirty(self, tokens: Set[str]) -> None:
+        """Put tokens back for the next mark-to-market (after a failed one)"""
+        with self._lock:
+            self._dirty.update(token for token in tokens if token in self._prices)
+
+
+price_oracle = PriceOracle(window_seconds=config.PRICE_VWAP_WINDOW)
+
+
+def mark_positions_to_market(db: Session) -> int:
+    """
+    Reprice open positions of every token that traded since the last run
+
+    Uses the oracle's VWAP or last price (config.PRICE_MARK_SOURCE), all
+    tokens in one transaction with one set-based UPDATE each.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of positions repriced
+    """
+    source = config.PRICE_MARK_SOURCE if config.PRICE_MARK_SOURCE in PRICE_SOURCES else "vwap"
+    prices = price_oracle.take_dirty_prices(source)
+    if not prices:
+        return 0
+
+    try:
+        # Reprice the amounts and cost bases the cache holds, not stale rows
+        if position_cache is not None:
+            position_cache.flush(db)
+        counts = reprice_positions(prices, db)
+    except Exception:
+        price_oracle.mark_dirty(set(prices))
+        raise
+
+    return sum(counts.values())
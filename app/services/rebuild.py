@@ -0,0 +1,250 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.config import config
+from app.db.database import SessionLocal, engine
+from app.db.models.position import Position
+from app.db.models.position_delta import PositionDelta
+from app.db.models.swap import Swap
+from app.services.ingest_pause import paused_ingestion
+from app.services.position_cache import position_cache
+from app.services.positions import apply_swap_to_positions
+from app.utils.logger import logger
+
+MON_ADDRESS = config.MON_ADDRESS
+MAX_SHARDS = 256  # shards are split on the first address byte
+
+
+def wallet_shards(count: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split the wallet space into `count` contiguous [lower, upper) ranges
+
+    Boundaries are address prefixes, so every shard is an index range scan
+    of ix_swap_wallet_block. The first and last shards are open-ended and
+    also cover wallets that aren't hex addresses.
+    """
+    count = max(1, min(count, MAX_SHARDS))
+    bounds = [f"0x{MAX_SHARDS * index // count:02x}" for index in range(1, count)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def _replay_trade(held: Dict[Tuple[str, str], Position], trade: Any) -> None:
+    """Apply one streamed swap to the positions being rebuilt"""
+    position = apply_swap_to_positions(
+        held,
+        wallet=trade.wallet,
+        token_in=trade.token_in,
+        token_out=trade.token_out,
+        amount_in=trade.amount_in,
+        amount_out=trade.amount_out,
+        mon_address=MON_ADDRESS,
+        db=None
+    )
+    if position is not None and position.first_trade_at is None:
+        position.first_trade_at = trade.timestamp
+
+
+def _init_worker() -> None:
+    """Drop connections inherited from the parent process (forked workers)"""
+    engine.dispose(close=False)
+
+
+def rebuild_shard(
+        lower: Optional[str],
+        upper: Optional[str],
+        max_block: int,
+        staging_name: str,
+        fetch_size: int,
+        flush_size: int
+) -> Dict[str, int]:
+    """
+    Replay the swaps of one wallet shard into the staging table
+
+    Swaps are streamed in (wallet, block_number, log_index) order, so only
+    the positions of the current wallet and one flush buffer are in memory.
+
+    Returns:
+        Dictionary with wallets, swaps and positions of the shard
+    """
+    staging = Position.staging_table(staging_name)
+    reader = SessionLocal()
+    writer = SessionLocal()
+    stats = {"wallets": 0, "swaps": 0, "positions": 0}
+
+    buffer: List[Dict[str, Any]] = []
+    held: Dict[Tuple[str, str], Position] = {}
+    current_wallet = None
+
+    def flush(force: bool = False) -> None:
+        if buffer and (force or len(buffer) >= flush_size):
+            writer.execute(insert(staging), buffer)
+            writer.commit()
+            stats["positions"] += len(buffer)
+            buffer.clear()
+
+    try:
+        for trade in Swap.stream_wallet_trades(reader, lower, upper, max_block, fetch_size):
+            if trade.wallet != current_wallet:
+                buffer.extend(position.to_row() for position in held.values())
+                held.clear()
+                flush()
+                current_wallet = trade.wallet
+                stats["wallets"] += 1
+
+            _replay_trade(held, trade)
+            stats["swaps"] += 1
+
+        buffer.extend(position.to_row() for position in held.values())
+        flush(force=True)
+        return stats
+
+    except Exception:
+        writer.rollback()
+        raise
+
+    finally:
+        reader.close()
+        writer.close()
+
+
+def rebuild_positions(
+        workers: Optional[int] = None,
+        fetch_size: Optional[int] = None,
+        flush_size: Optional[int] = None,
+        force: bool = False
+) -> Dict[str, Any]:
+    """
+    Recompute every position by replaying the swaps table
+
+    Each worker process streams one wallet shard with a server-side cursor
+    and writes its positions to a staging table; the staging table then
+    replaces the positions table in one transaction. Undo records are
+    dropped since they describe the old state. Unrealized PnL starts at
+    0 until the next mark-to-market.
+
+    Ingestion is paused for the whole rebuild (see paused_ingestion): the
+    API process drains in-flight payloads and drops its position cache
+    first, and payloads arriving meanwhile are retried afterwards.
+
+    Args:
+        workers: Worker processes (config.REBUILD_WORKERS)
+        fetch_size: Swaps per cursor round trip (config.REBUILD_FETCH_SIZE)
+        flush_size: Positions per staging INSERT (config.REBUILD_FLUSH_SIZE)
+        force: Don't wait for the API process to pause ingestion (it isn't running)
+
+    Returns:
+        Dictionary with rebuild statistics
+    """
+    workers = max(1, workers or config.REBUILD_WORKERS)
+    fetch_size = max(1, fetch_size or config.REBUILD_FETCH_SIZE)
+    flush_size = max(1, flush_size or config.REBUILD_FLUSH_SIZE)
+    started = time.monotonic()
+
+    with paused_ingestion("positions rebuild", force=force):
+        staging = Position.staging_table()
+        staging.drop(engine, checkfirst=True)
+        staging.create(engine)
+
+        db = SessionLocal()
+        try:
+            max_block = Swap.get_max_block(db) or 0
+        finally:
+            db.close()
+
+        try:
+            shards = wallet_shards(workers)
+
+            logger.info("rebuild", "Starting positions rebuild", {
+                "workers": workers,
+                "shards": len(shards),
+                "max_block": max_block
+            })
+
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(rebuild_shard, lower, upper, max_block, staging.name, fetch_size, flush_size)
+                    for lower, upper in shards
+                ]
+                results = [future.result() for future in futures]
+
+            stats = {key: sum(result[key] for result in results) for key in ("wallets", "swaps", "positions")}
+
+            db = SessionLocal()
+            try:
+                replaced = Position.replace_all(db, staging)
+                PositionDelta.remove_from_block(db, 0)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            # Cached positions (when run inside the API process) predate the rebuild
+            if position_cache is not None:
+                position_cache.invalidate()
+
+            stats.update(
+                max_block=max_block,
+                replaced=replaced,
+                duration=round(time.monotonic() - started, 3)
+            )
+            logger.info("rebuild", "Positions rebuilt", stats)
+            return stats
+
+        except Exception as e:
+            logger.error("rebuild", "Positions rebuild failed, positions left unchanged", error=e)
+            raise
+
+        finally:
+            staging.drop(engine, checkfirst=True)
+
+
+def rebuild_wallet_positions(db: Session, wallets: List[str], fetch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Recompute the positions of some wallets by replaying their swaps in chain order
+
+    For wallets whose swaps were stored out of chain order (backfilled
+    history). Their undo records are dropped since they describe the old
+    state, and unrealized PnL starts at 0 until the next mark-to-market.
+    Does not commit - the caller owns the transaction.
+
+    Args:
+        db: Database session
+        wallets: Wallet addresses
+        fetch_size: Swaps per cursor round trip (config.REBUILD_FETCH_SIZE)
+
+    Returns:
+        Dictionary with swaps and positions
+    """
+    held: Dict[Tuple[str, str], Position] = {}
+    swaps = 0
+    for trade in Swap.stream_wallet_trades(
+            db, batch_size=max(1, fetch_size or config.REBUILD_FETCH_SIZE), wallets=wallets
+    ):
+        _replay_trade(held, trade)
+        swaps += 1
+
+    positions = Position.replace_wallets(db, wallets, [position.to_row() for position in held.values()])
+    PositionDelta.remove_wallets(db, wallets)
+    return {"swaps": swaps, "positions": positions}
+
+
+def main() -> None:
+    """Command line entry point: python -m app.services.rebuild"""
+    parser = argparse.ArgumentParser(description="Rebuild the positions table from the swaps table")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--fetch-size", type=int, default=None, help="swaps per cursor round trip")
+    parser.add_argument("--flush-size", type=int, default=None, help="positions per staging INSERT")
+    parser.add_argument("--force", action="store_true", help="rebuild while the API process is down")
+    args = parser.parse_args()
+
+    print(rebuild_positions(args.workers, args.fetch_size, args.flush_size, args.force))
+
+
+if __name__ == "__main__":
+    main()
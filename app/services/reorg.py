@@ -1,16 +1,215 @@
+import threading
+from contextlib import nullcontext
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Dict, Iterable, Optional, Tuple
 
+from app.config.config import config
+from app.db.models.canonical_block import CanonicalBlock
+from app.db.models.position import Position
+from app.db.models.position_delta import PositionDelta
 from app.db.models.processed_transactions import ProcessedTransaction
 from app.db.models.swap import Swap
 from app.db.models.nft import NFTTrade
+from app.services.leaderboard import wallet_leaderboards
+from app.services.position_cache import position_cache
 from app.utils.logger import logger
 
 
+class ChainTracker:
+    """
+    Bounded in-memory ring of recent canonical blocks (block_number -> block_hash)
+
+    Reorg detection is a dictionary lookup instead of a DB read per event.
+    The ring covers the newest `capacity` block numbers and is persisted
+    to the canonical_blocks table so it survives restarts.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._hashes: Dict[int, str] = {}
+        self._newest: Optional[int] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session) -> int:
+        """
+        Replace the ring with the newest persisted blocks
+
+        Returns:
+            Number of blocks loaded
+        """
+        hashes = CanonicalBlock.get_recent(db, self.capacity)
+        with self._lock:
+            self._hashes = hashes
+            self._newest = max(hashes) if hashes else None
+            self._loaded = True
+        return len(hashes)
+
+    def get(self, block_number: int) -> Optional[str]:
+        """Get the canonical hash of a block, if tracked"""
+        return self._hashes.get(block_number)
+
+    def find_fork(
+            self,
+            blocks: Iterable[Tuple[int, str]],
+            parents: Optional[Dict[int, str]] = None
+    ) -> Optional[int]:
+        """
+        Find the first orphaned block among incoming (block_number, block_hash) pairs
+
+        A tracked block is orphaned when an incoming block has its number
+        and another hash, or - for events that carry a parentHash - when an
+        incoming block's parent hash differs from the tracked block below it.
+
+        Everything from the returned block onwards must be rolled back. The
+        block below it is not verified to be a common ancestor: the ring only
+        holds hashes, not parent links. A deeper fork is detected (and rolled
+        back) once an event of an orphaned height is redelivered.
+
+        Args:
+            blocks: (block_number, block_hash) pairs
+            parents: block_number -> parentHash of incoming blocks, where known
+
+        Returns:
+            Lowest orphaned block number, or None
+        """
+        candidates = [
+            block_number for block_number, block_hash in blocks
+            if self._hashes.get(block_number, block_hash) != block_hash
+        ]
+        candidates += [
+            block_number - 1 for block_number, parent_hash in (parents or {}).items()
+            if self._hashes.get(block_number - 1, parent_hash) != parent_hash
+        ]
+        return min(candidates, default=None)
+
+    def record(self, blocks: Iterable[Tuple[int, str]], db: Session) -> Dict[int, str]:
+        """
+        Track new canonical blocks and persist them
+
+        Blocks older than the window are skipped. Every other block is
+        persisted (INSERT ... ON CONFLICT DO NOTHING), even if another batch
+        already tracks it in memory - that batch may still roll back.
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Blocks added to the ring (block_number -> block_hash) - pass them
+            to discard if the transaction is rolled back
+        """
+        with self._lock:
+            window = {}
+            for block_number, block_hash in blocks:
+                if self._newest is not None and block_number <= self._newest - self.capacity:
+                    continue
+                window.setdefault(block_number, block_hash)
+
+            new_blocks = {
+                block_number: block_hash for block_number, block_hash in window.items()
+                if block_number not in self._hashes
+            }
+
+            floor = None
+            if new_blocks:
+                self._hashes.update(new_blocks)
+                self._newest = max(self._newest or 0, max(new_blocks))
+
+                floor = self._newest - self.capacity + 1
+                for block_number in [number for number in self._hashes if number < floor]:
+                    del self._hashes[block_number]
+
+        CanonicalBlock.add_blocks_bulk(db, window)
+        if floor is not None:
+            CanonicalBlock.prune(db, floor)
+        return new_blocks
+
+    def discard(self, blocks: Dict[int, str]) -> None:
+        """
+        Forget blocks that were recorded by a rolled back transaction
+
+        Only these blocks are dropped (and only while they still have the
+        recorded hash), so blocks tracked by concurrent batches stay.
+        """
+        with self._lock:
+            for block_number, block_hash in blocks.items():
+                if self._hashes.get(block_number) == block_hash:
+                    del self._hashes[block_number]
+            self._newest = max(self._hashes) if self._hashes else None
+
+    def restore(self, blocks: Dict[int, str]) -> None:
+        """Track blocks again whose rewind was rolled back"""
+        with self._lock:
+            for block_number, block_hash in blocks.items():
+                self._hashes.setdefault(block_number, block_hash)
+            self._newest = max(self._hashes) if self._hashes else None
+
+    def rewind(self, from_block: int, db: Session) -> Dict[int, str]:
+        """
+        Forget orphaned blocks from a block onwards
+
+        Does not commit - the caller owns the transaction.
+
+        Returns:
+            Blocks forgotten (block_number -> block_hash) - pass them to
+            restore if the transaction is rolled back
+        """
+        with self._lock:
+            removed = {number: block_hash for number, block_hash in self._hashes.items() if number >= from_block}
+            for block_number in removed:
+                del self._hashes[block_number]
+            self._newest = max(self._hashes) if self._hashes else None
+
+        CanonicalBlock.remove_from_block(db, from_block)
+        return removed
+
+
+chain_tracker = ChainTracker(capacity=config.CHAIN_TRACKER_CAPACITY)
+
+
+def warm_chain_tracker(db: Session) -> int:
+    """
+    Load recent canonical blocks into the chain tracker (call at startup)
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of blocks loaded
+    """
+    try:
+        count = chain_tracker.load(db)
+        logger.info("reorg", "Chain tracker warmed", {"blocks": count})
+        return count
+    except Exception as e:
+        logger.error("reorg", "Failed to warm chain tracker", error=e)
+        return 0
+
+
+def parent_hashes(events: Iterable[dict]) -> Dict[int, str]:
+    """Incoming block_number -> parentHash, for events that carry one"""
+    parents = {}
+    for event in events:
+        try:
+            block_number = int(event.get("blockNumber", 0))
+        except (ValueError, TypeError):
+            continue
+        if block_number and event.get("parentHash"):
+            parents[block_number] = event["parentHash"]
+    return parents
+
+
 def detect_reorg(
         current_block_number: int,
         current_block_hash: str,
-        db: Session
+        db: Session,
+        parent_hash: Optional[str] = None
 ) -> Optional[int]:
     """
     Detects if a blockchain reorganization has occurred
@@ -18,41 +217,134 @@ def detect_reorg(
     Args:
         current_block_number: Block number from incoming event
         current_block_hash: Block hash from incoming event
-        db: Database session
+        db: Database session (only used to load the tracker if it isn't warm yet)
+        parent_hash: Parent hash of the incoming block, if the event carries it
 
     Returns:
         Block number where reorg occurred, or None if no reorg detected
     """
+    parents = {current_block_number: parent_hash} if parent_hash else None
+    return detect_reorg_many([(current_block_number, current_block_hash)], db, parents)
+
+
+def detect_reorg_many(
+        blocks: Iterable[Tuple[int, str]],
+        db: Session,
+        parents: Optional[Dict[int, str]] = None
+) -> Optional[int]:
+    """
+    Detects a reorganization across all blocks of a batch with in-memory lookups
+
+    Args:
+        blocks: (block_number, block_hash) pairs from incoming events
+        db: Database session (only used to load the tracker if it isn't warm yet)
+        parents: block_number -> parentHash of incoming blocks (see parent_hashes)
+
+    Returns:
+        First orphaned block number, or None if no reorg detected
+    """
     try:
-        # Check if we have processed transactions for this block
-        existing_tx = ProcessedTransaction.get_by_block(db, current_block_number)
-
-        # No existing entry for this block → no reorg
-        if not existing_tx:
-            return None
-
-        # Block hash mismatch → reorg detected!
-        if existing_tx.block_hash != current_block_hash:
-            logger.warn("reorg", f"Blockchain reorg detected at block {current_block_number}", {
-                "old_hash": existing_tx.block_hash,
-                "new_hash": current_block_hash
+        if not chain_tracker.loaded:
+            warm_chain_tracker(db)
+
+        fork = chain_tracker.find_fork(blocks, parents)
+
+        if fork is not None:
+            logger.warn("reorg", f"Blockchain reorg detected at block {fork}", {
+                "old_hash": chain_tracker.get(fork),
+                # The block below is assumed, not verified, to be the common ancestor
+                "rollback_from": fork
             })
-            return current_block_number
 
-        return None
+        return fork
 
     except Exception as e:
-        logger.error("reorg", "Error while checking for reorg", error=e, context={
-            "block_number": current_block_number,
-            "block_hash": current_block_hash
-        })
+        logger.error("reorg", "Error while checking for reorg", error=e)
         # Return None instead of raising - don't stop processing on reorg check failure
         return None
 
 
+def record_canonical_blocks(blocks: Iterable[Tuple[int, str]], db: Session) -> Dict[int, str]:
+    """
+    Track processed blocks as canonical
+
+    Does not commit - the caller owns the transaction.
+
+    Args:
+        blocks: (block_number, block_hash) pairs
+        db: Database session
+
+    Returns:
+        Newly tracked blocks - pass them to discard_canonical_blocks if the
+        transaction is rolled back
+    """
+    return chain_tracker.record(blocks, db)
+
+
+def discard_canonical_blocks(blocks: Dict[int, str]) -> None:
+    """
+    Forget blocks tracked by a rolled back transaction
+
+    Unlike warm_chain_tracker, blocks tracked by concurrent batches that
+    haven't committed yet are kept.
+    """
+    if blocks:
+        chain_tracker.discard(blocks)
+
+
+def rollback_positions(from_block: int, db: Session) -> int:
+    """
+    Restore every position touched from a block onwards to its pre-fork state
+
+    Uses the per-block undo records, so the cost is proportional to the
+    number of positions touched in the orphaned blocks, not to history.
+    Positions that didn't exist before the fork are deleted.
+
+    Does not commit - the caller owns the transaction.
+
+    Args:
+        from_block: First orphaned block (inclusive)
+        db: Database session
+
+    Returns:
+        Number of positions restored or deleted
+    """
+    # Oldest undo record per position = state before the fork
+    earliest = {}
+    for delta in PositionDelta.get_from_block(db, from_block):
+        earliest.setdefault((delta.wallet, delta.token), delta)
+
+    positions = Position.get_positions(db, earliest.keys())
+
+    for key, delta in earliest.items():
+        position = positions.get(key)
+
+        if not delta.existed:
+            if position is not None:
+                db.delete(position)
+            continue
+
+        if position is None:
+            position = Position(wallet=delta.wallet, token=delta.token)
+            db.add(position)
+
+        for field in Position.STATE_FIELDS:
+            setattr(position, field, getattr(delta, field))
+        position.refresh_total_pnl()
+
+    PositionDelta.remove_from_block(db, from_block)
+
+    return len(earliest)
+
+
 def handle_reorg(from_block: int, db: Session) -> dict:
     """
-    Handle blockchain reorganization by removing affected data
+    Handle blockchain reorganization by reverting affected data
+
+    Positions are rolled back to their pre-fork state, then the orphaned
+    swaps, NFT trades and processed markers are deleted - all in one
+    transaction. The canonical blocks are re-applied when the stream
+    redelivers them: their transactions are no longer marked processed.
 
     Args:
         from_block: Block number to start cleanup from (inclusive)
@@ -61,47 +353,96 @@ def handle_reorg(from_block: int, db: Session) -> dict:
     Returns:
         Dictionary with cleanup statistics
     """
+    logger.warn("reorg", f"Starting reorg cleanup from block {from_block}")
+
+    # Cached positions must be in the table before they are rolled back, and
+    # batches must not read positions until the rollback is committed
+    suspension = position_cache.suspended() if position_cache is not None else nullcontext()
+    rewound = {}
+
+    with suspension:
+        try:
+            # Undo position changes of the orphaned blocks
+            restored_positions = rollback_positions(from_block, db)
+
+            # Delete all swaps from affected blocks
+            deleted_swaps = (
+                db.query(Swap)
+                .filter(Swap.block_number >= from_block)
+                .delete(synchronize_session=False)
+            )
+
+            # Delete all NFT trades from affected blocks
+            deleted_nfts = (
+                db.query(NFTTrade)
+                .filter(NFTTrade.block_number >= from_block)
+                .delete(synchronize_session=False)
+            )
+
+            # Delete processed transaction markers
+            deleted_processed = (
+                db.query(ProcessedTransaction)
+                .filter(ProcessedTransaction.block_number >= from_block)
+                .delete(synchronize_session=False)
+            )
+
+            # Forget the orphaned block hashes
+            rewound = chain_tracker.rewind(from_block, db)
+
+            # Commit all deletions
+            db.commit()
+            rewound = {}  # persisted - nothing to restore from here on
+
+            wallet_leaderboards.remove_from_block(from_block)
+
+            result = {
+                "from_block": from_block,
+                "restored_positions": restored_positions,
+                "deleted_swaps": deleted_swaps,
+                "deleted_nfts": deleted_nfts,
+                "deleted_processed": deleted_processed
+            }
+
+            logger.info("reorg", "Reorg cleanup completed successfully", result)
+
+            return result
+
+        except Exception as e:
+            db.rollback()
+            chain_tracker.restore(rewound)
+            logger.error("reorg", "Error during reorg cleanup", error=e, context={
+                "from_block": from_block
+            })
+            raise
+
+
+def prune_position_deltas(db: Session) -> int:
+    """
+    Drop undo records that are deeper than REORG_MAX_DEPTH below the newest block
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of rows deleted
+    """
     try:
-        logger.warn("reorg", f"Starting reorg cleanup from block {from_block}")
-
-        # Delete all swaps from affected blocks
-        deleted_swaps = (
-            db.query(Swap)
-            .filter(Swap.block_number >= from_block)
-            .delete(synchronize_session=False)
-        )
-
-        # Delete all NFT trades from affected blocks
-        deleted_nfts = (
-            db.query(NFTTrade)
-            .filter(NFTTrade.block_number >= from_block)
-            .delete(synchronize_session=False)
-        )
-
-        # Delete processed transaction markers
-        deleted_processed = (
-            db.query(ProcessedTransaction)
-            .filter(ProcessedTransaction.block_number >= from_block)
-            .delete(synchronize_session=False)
-        )
-
-        # Commit all deletions
-        db.commit()
+        newest_block = db.query(func.max(PositionDelta.block_number)).scalar()
+        if newest_block is None:
+            return 0
 
-        result = {
-            "from_block": from_block,
-            "deleted_swaps": deleted_swaps,
-            "deleted_nfts": deleted_nfts,
-            "deleted_processed": deleted_processed
-        }
+        deleted = PositionDelta.prune(db, newest_block - config.REORG_MAX_DEPTH)
+        db.commit()
 
-        logger.info("reorg", "Reorg cleanup completed successfully", result)
+        if deleted:
+            logger.info("reorg", "Pruned position undo records", {
+                "deleted": deleted,
+                "below_block": newest_block - config.REORG_MAX_DEPTH
+            })
 
-        return result
+        return deleted
 
     except Exception as e:
         db.rollback()
-        logger.error("reorg", "Error during reorg cleanup", error=e, context={
-            "from_block": from_block
-        })
-        raise
\ No newline at end of file
+        logger.error("reorg", "Failed to prune position undo records", error=e)
+        return 0
@@ -0,0 +1,110 @@
+import threading
+import zlib
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.utils.logger import logger
+
+
+class PartitionedScheduler:
+    """
+    Shards events by a partition key so events sharing a key run in order
+
+    Each key maps to a fixed partition (stable hash), so every event of a
+    given key - across requests too - is applied by one partition at a
+    time, in the order given by `order_key`. Different partitions run in
+    parallel on the caller's worker pool. Events without a key can't be
+    placed in a partition; they go to the None lane, run by run_exclusive().
+    """
+
+    def __init__(self, partitions: int):
+        self.partitions = max(1, partitions)
+        self._locks = [threading.Lock() for _ in range(self.partitions)]
+
+    def partition_of(self, key: Hashable) -> int:
+        """Stable partition index of a key (same across processes and restarts)"""
+        return zlib.crc32(repr(key).encode()) % self.partitions
+
+    def split(
+            self,
+            events: List[dict],
+            partition_key: Callable[[dict], Optional[Hashable]],
+            order_key: Callable[[dict], Any]
+    ) -> Dict[Optional[int], List[Tuple[int, dict]]]:
+        """
+        Group events by partition, each partition sorted by `order_key`
+
+        Ties keep payload order. Events whose key is None go to the None lane.
+
+        Returns:
+            Dictionary of partition index (or None) -> [(payload index, event)]
+        """
+        lanes: Dict[Optional[int], List[Tuple[int, dict]]] = {}
+        for index, event in enumerate(events):
+            key = partition_key(event)
+            partition = self.partition_of(key) if key is not None else None
+            lanes.setdefault(partition, []).append((index, event))
+
+        for lane in lanes.values():
+            lane.sort(key=lambda item: (order_key(item[1]), item[0]))
+
+        return lanes
+
+    def run_lane(
+            self,
+            partition: int,
+            lane: List[Tuple[int, dict]],
+            handler: Callable[[dict], Any]
+    ) -> List[Tuple[int, Any]]:
+        """
+        Apply a partition's events one after another
+
+        Blocking - runs on a worker thread. Holds the partition lock so
+        concurrent requests never interleave events of the same key.
+
+        Returns:
+            (payload index, handler result) per event
+        """
+        with self._locks[partition]:
+            return self._apply(partition, lane, handler)
+
+    def run_exclusive(
+            self,
+            lane: List[Tuple[int, dict]],
+            handler: Callable[[dict], Any]
+    ) -> List[Tuple[int, Any]]:
+        """
+        Apply events one after another while holding every partition lock
+
+        For events whose key wasn't known up front (the None lane): they
+        may change any partition, so no partition runs meanwhile. Locks
+        are taken in index order; run_lane holds only one, so this can't
+        deadlock.
+
+        Returns:
+            (payload index, handler result) per event
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            return self._apply(None, lane, handler)
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    @staticmethod
+    def _apply(
+            partition: Optional[int],
+            lane: List[Tuple[int, dict]],
+            handler: Callable[[dict], Any]
+    ) -> List[Tuple[int, Any]]:
+        results = []
+        for index, event in lane:
+            try:
+                results.append((index, handler(event)))
+            except Exception as e:
+                logger.error("scheduler", "Partitioned event failed", error=e, context={
+                    "partition": partition,
+                    "index": index
+                })
+                results.append((index, e))
+        return results
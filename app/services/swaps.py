@@ -1,20 +1,51 @@
+from datetime import datetime, timezone
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from app.config.config import config
+from app.db.models.position import Position
+from app.db.models.position_delta import PositionDelta
 from app.db.models.processed_transactions import ProcessedTransaction
 from app.db.models.swap import Swap
-from app.services.pools import get_or_create_pool_info
-from app.services.reorg import detect_reorg, handle_reorg
-from app.services.wallets import resolve_wallet
+from app.services.leaderboard import wallet_leaderboards
+from app.services.pools import get_or_create_pool_info, get_pools_info, pool_registry
+from app.services.position_cache import position_cache
+from app.services.positions import apply_swap_to_positions, classify_position_trade, process_swap_for_position
+from app.services.prices import price_oracle
+from app.services.reorg import (
+    detect_reorg,
+    detect_reorg_many,
+    handle_reorg,
+    discard_canonical_blocks,
+    parent_hashes,
+    record_canonical_blocks,
+)
+from app.services.tokens import get_token_decimals, get_token_decimals_many
+from app.services.wallets import (
+    pick_wallet,
+    resolve_wallet,
+    resolve_wallets,
+    wallet_candidates,
+    wallet_index,
+    warm_wallet_index,
+)
 from app.utils.logger import logger
-from app.utils.utils import normalize_amount, normalize_address
+from app.utils.utils import from_base_units, normalize_address, parse_raw_amount
 
 MON_ADDRESS = config.MON_ADDRESS
 
 
-def _map_tokens_and_amounts(event: dict, db: Session) -> Optional[Dict[str, Any]]:
+class ConcurrentBatchError(Exception):
+    """A concurrent batch processed some of this batch's transactions first"""
+
+
+def _map_tokens_and_amounts(
+        event: dict,
+        db: Session,
+        pool_tokens: Optional[Dict[str, Tuple[str, str]]] = None,
+        token_decimals: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
     """
     Map pool tokens and amounts from swap event
 
@@ -24,9 +55,14 @@ def _map_tokens_and_amounts(event: dict, db: Session) -> Optional[Dict[str, Any]
     Args:
         event: Swap event data
         db: Database session
+        pool_tokens: Optional pool -> (token0, token1) map resolved for a batch;
+            pools missing from it are not looked up again
+        token_decimals: Optional token -> decimals map resolved for a batch;
+            tokens missing from it are not looked up again
 
     Returns:
-        Dictionary with token_in, token_out, amounts, or None if mapping fails
+        Dictionary with token_in, token_out, amounts (ints of base units
+        and normalized Decimals), or None if mapping fails
     """
     pool = normalize_address(event.get("pool", ""))
     amount0_raw = event.get("amount0", "0")
@@ -36,18 +72,25 @@ def _map_tokens_and_amounts(event: dict, db: Session) -> Optional[Dict[str, Any]
         logger.warn("swaps", "Missing pool address in event")
         return None
 
-    # Get pool tokens from database or RPC
-    try:
-        token0, token1 = get_or_create_pool_info(pool, db)
-    except Exception as e:
-        logger.error("swaps", f"Failed to resolve pool tokens for {pool}", error=e)
-        return None
+    # Get pool tokens from the batch map, else the database or RPC
+    if pool_tokens is not None:
+        if pool not in pool_tokens:
+            # Resolution failed before the batch's transaction - no RPC inside it
+            logger.warn("swaps", f"Unresolved pool {pool}")
+            return None
+        token0, token1 = pool_tokens[pool]
+    else:
+        try:
+            token0, token1 = get_or_create_pool_info(pool, db)
+        except Exception as e:
+            logger.error("swaps", f"Failed to resolve pool tokens for {pool}", error=e)
+            return None
 
-    # Parse amounts as Decimal for sign detection
+    # Parse amounts as ints of base units - no Decimal until the amounts are normalized
     try:
-        a0 = Decimal(amount0_raw)
-        a1 = Decimal(amount1_raw)
-    except Exception as e:
+        a0 = parse_raw_amount(amount0_raw)
+        a1 = parse_raw_amount(amount1_raw)
+    except ValueError as e:
         logger.error("swaps", "Failed to parse amounts", error=e, context={
             "amount0": amount0_raw,
             "amount1": amount1_raw
@@ -58,23 +101,14 @@ def _map_tokens_and_amounts(event: dict, db: Session) -> Optional[Dict[str, Any]
     # Negative amount = token sent (in)
     # Positive amount = token received (out)
 
-    token_in = None
-    token_out = None
-    amount_in_raw = "0"
-    amount_out_raw = "0"
-
     if a0 < 0 < a1:
         # token0 sent, token1 received
-        token_in = token0
-        token_out = token1
-        amount_in_raw = str(abs(a0))
-        amount_out_raw = str(abs(a1))
+        token_in, token_out = token0, token1
+        amount_in_wei, amount_out_wei = -a0, a1
     elif a1 < 0 < a0:
         # token1 sent, token0 received
-        token_in = token1
-        token_out = token0
-        amount_in_raw = str(abs(a1))
-        amount_out_raw = str(abs(a0))
+        token_in, token_out = token1, token0
+        amount_in_wei, amount_out_wei = -a1, a0
     else:
         # Fallback for unusual cases
         logger.warn("swaps", "Unusual amount pattern in swap", {
@@ -83,31 +117,233 @@ def _map_tokens_and_amounts(event: dict, db: Session) -> Optional[Dict[str, Any]
             "amount1": amount1_raw
         })
         # Use absolute values and try to determine direction
-        if abs(a0) > 0:
+        if a0 != 0:
             token_in = token0 if a0 < 0 else token1
             token_out = token1 if a0 < 0 else token0
-            amount_in_raw = str(abs(a0))
-            amount_out_raw = str(abs(a1))
+            amount_in_wei, amount_out_wei = abs(a0), abs(a1)
         else:
             token_in = token1 if a1 < 0 else token0
             token_out = token0 if a1 < 0 else token1
-            amount_in_raw = str(abs(a1))
-            amount_out_raw = str(abs(a0))
+            amount_in_wei, amount_out_wei = abs(a1), abs(a0)
 
-    # Normalize amounts from raw values
-    amount_in = normalize_amount(amount_in_raw)
-    amount_out = normalize_amount(amount_out_raw)
+    # Normalize amounts from base units with each token's decimals
+    try:
+        amount_in = from_base_units(amount_in_wei, _token_decimals(token_in, db, token_decimals))
+        amount_out = from_base_units(amount_out_wei, _token_decimals(token_out, db, token_decimals))
+    except ValueError as e:
+        # Fail the event (retried with its payload) rather than store amounts at a guessed scale
+        logger.error("swaps", f"Failed to normalize amounts of pool {pool}", error=e)
+        return None
 
     return {
         "token_in": token_in,
         "token_out": token_out,
-        "amount_in_raw": amount_in_raw,
-        "amount_out_raw": amount_out_raw,
+        "amount_in_wei": amount_in_wei,
+        "amount_out_wei": amount_out_wei,
         "amount_in": amount_in,
         "amount_out": amount_out,
     }
 
 
+def _token_decimals(token: str, db: Session, token_decimals: Optional[Dict[str, int]]) -> int:
+    """
+    Decimals of a token from the batch map, else the registry (DB/RPC on first sight)
+
+    Raises:
+        ValueError: If the decimals aren't known
+    """
+    if token_decimals is not None:
+        if token not in token_decimals:
+            raise ValueError(f"Decimals of token {token} could not be resolved")
+        return token_decimals[token]
+    return get_token_decimals(token, db)
+
+
+def _parse_block(event: dict) -> Optional[Tuple[int, str]]:
+    """
+    Parse block number and hash from a swap event
+
+    Returns:
+        Tuple of (block_number, block_hash), or None if missing/invalid
+    """
+    try:
+        block_number = int(event.get("blockNumber", 0))
+        block_hash = event.get("blockHash", "")
+    except (ValueError, TypeError):
+        return None
+
+    if not block_number or not block_hash:
+        return None
+
+    return block_number, block_hash
+
+
+def event_order_key(event: dict) -> Tuple[int, int]:
+    """Chain order of an event: (block_number, log_index)"""
+    try:
+        block_number = int(event.get("blockNumber", 0))
+    except (ValueError, TypeError):
+        block_number = 0
+    try:
+        log_index = int(event.get("logIndex", 0))
+    except (ValueError, TypeError):
+        log_index = 0
+    return block_number, log_index
+
+
+def event_timestamp(event: dict) -> datetime:
+    """
+    Block time of an event ("timestamp": unix seconds, int or hex)
+
+    Events without one (live stream) are stamped with the current time.
+    """
+    value = event.get("timestamp")
+    try:
+        seconds = int(value, 16) if isinstance(value, str) and value.startswith("0x") else int(value)
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def position_key(event: dict) -> Optional[Tuple[str, str]]:
+    """
+    The (wallet, token) position a swap event will change
+
+    Resolved from the in-memory wallet index and pool registry only, so it
+    can be computed before any DB work. Events of non-MON pools don't touch
+    a position and are keyed by their tx hash instead.
+
+    Returns:
+        The key, or None if the pool isn't in the registry - the event
+        could change any position
+    """
+    pool_tokens = pool_registry.get(normalize_address(event.get("pool", "")))
+    if pool_tokens is None:
+        return None
+
+    if MON_ADDRESS in pool_tokens:
+        token = pool_tokens[1] if pool_tokens[0] == MON_ADDRESS else pool_tokens[0]
+        return pick_wallet(wallet_candidates(event)), token
+
+    return "tx", event.get("txHash", "")
+
+
+def handle_batch_reorg(events: List[dict], db: Session) -> Optional[int]:
+    """
+    Check every block of a batch for a reorg and roll back once if needed
+
+    Run before events are fanned out to parallel workers, so concurrent
+    workers never see (and roll back) the same fork.
+
+    Returns:
+        Fork block number, or None if no reorg detected
+    """
+    blocks = {block for block in (_parse_block(event) for event in events) if block is not None}
+    reorg_block = detect_reorg_many(blocks, db, parent_hashes(events))
+    if reorg_block is not None:
+        handle_reorg(reorg_block, db)
+        logger.warn("swaps", f"Handled reorg at block {reorg_block}")
+    return reorg_block
+
+
+def _build_swap_record(
+        event: dict,
+        tx_hash: str,
+        block_number: int,
+        block_hash: str,
+        db: Session,
+        pool_tokens: Optional[Dict[str, Tuple[str, str]]] = None,
+        wallet: Optional[str] = None,
+        token_decimals: Optional[Dict[str, int]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build the swaps-table row for an event
+
+    Args:
+        event: Swap event data
+        tx_hash: Transaction hash
+        block_number: Block number
+        block_hash: Block hash
+        db: Database session
+        pool_tokens: Optional pool -> (token0, token1) map shared across a batch
+        wallet: Pre-resolved wallet (batch path); resolved from the event if omitted
+        token_decimals: Optional token -> decimals map shared across a batch
+
+    Returns:
+        Swap column values (wallet is None for non-MON swaps),
+        or None if the tokens could not be mapped
+    """
+    mapped = _map_tokens_and_amounts(event, db, pool_tokens, token_decimals)
+    if not mapped:
+        logger.warn("swaps", f"Failed to map tokens for tx {tx_hash}", {
+            "pool": event.get("pool")
+        })
+        return None
+
+    token_in = mapped["token_in"]
+    token_out = mapped["token_out"]
+
+    # Calculate MON amount and determine if it's a sell
+    mon_amount = Decimal(0)
+    is_sell = False
+    wallet_addr = None
+
+    if token_in == MON_ADDRESS:
+        mon_amount = mapped["amount_in"]
+        is_sell = True  # Selling MON for other token
+    elif token_out == MON_ADDRESS:
+        mon_amount = mapped["amount_out"]
+        is_sell = False  # Buying MON with other token
+
+    if token_in == MON_ADDRESS or token_out == MON_ADDRESS:
+        # Resolve wallet address (sender, recipient, from, to priority)
+        wallet_addr = wallet or resolve_wallet(wallet_candidates(event), db)
+
+    return {
+        "tx_hash": tx_hash,
+        "block_number": block_number,
+        "log_index": event_order_key(event)[1],
+        "block_hash": block_hash,
+        "pool": normalize_address(event.get("pool", "")),
+        "token_in": token_in,
+        "token_out": token_out,
+        "amount_in_raw": str(mapped["amount_in_wei"]),
+        "amount_out_raw": str(mapped["amount_out_wei"]),
+        "amount_in": mapped["amount_in"],
+        "amount_out": mapped["amount_out"],
+        "mon_amount": mon_amount,
+        "is_sell": is_sell,
+        "wallet": wallet_addr,
+        "realized_pnl_mon": None,
+        "timestamp": event_timestamp(event),
+    }
+
+
+def _publish_trade(
+        record: Dict[str, Any],
+        trade: Optional[Tuple[str, bool, Decimal, Decimal]] = None
+) -> None:
+    """
+    Feed a committed MON swap to the in-memory leaderboards and price oracle
+
+    Args:
+        record: Swap record
+        trade: The record's classify_position_trade result, computed if omitted
+    """
+    timestamp = record["timestamp"].timestamp()
+    wallet_leaderboards.record_trade(
+        record["wallet"], record["block_number"], record["realized_pnl_mon"], record["mon_amount"], timestamp
+    )
+
+    if trade is None:
+        trade = classify_position_trade(
+            record["token_in"], record["token_out"], record["amount_in"], record["amount_out"], MON_ADDRESS
+        )
+    if trade is not None:
+        token, _, token_amount, price_per_token = trade
+        price_oracle.record_trade(token, price_per_token, token_amount, timestamp)
+
+
 def process_swap_event(event: dict, db: Session) -> bool:
     """
     Process a single swap event from QuickNode webhook
@@ -127,114 +363,77 @@ def process_swap_event(event: dict, db: Session) -> bool:
 
     try:
         # Parse block information
-        try:
-            block_number = int(event.get("blockNumber", 0))
-            block_hash = event.get("blockHash", "")
-        except (ValueError, TypeError) as e:
-            logger.error("swaps", f"Invalid block data in tx {tx_hash}", error=e)
+        block = _parse_block(event)
+        if block is None:
+            logger.error("swaps", f"Missing or invalid block data in tx {tx_hash}")
             return False
 
-        if not block_number or not block_hash:
-            logger.error("swaps", f"Missing block data in tx {tx_hash}")
-            return False
+        block_number, block_hash = block
 
         # Check for blockchain reorganization
-        reorg_block = detect_reorg(block_number, block_hash, db)
+        reorg_block = detect_reorg(block_number, block_hash, db, event.get("parentHash"))
         if reorg_block is not None:
             handle_reorg(reorg_block, db)
             logger.warn("swaps", f"Handled reorg at block {reorg_block}")
 
-        # Check if already processed
+        # Track the block as canonical
+        if record_canonical_blocks([(block_number, block_hash)], db):
+            db.commit()
+
+        # Check if already processed - skips the pool/token lookups of duplicates
         if ProcessedTransaction.is_processed(db, tx_hash):
             logger.info("swaps", f"Skipping duplicate tx {tx_hash}")
             return True
 
-        # Map tokens and amounts
-        mapped = _map_tokens_and_amounts(event, db)
-        if not mapped:
-            logger.warn("swaps", f"Failed to map tokens for tx {tx_hash}", {
-                "pool": event.get("pool")
-            })
+        # Map tokens, amounts and wallet
+        record = _build_swap_record(event, tx_hash, block_number, block_hash, db)
+        if not record:
             return False
 
-        token_in = mapped["token_in"]
-        token_out = mapped["token_out"]
-        amount_in = mapped["amount_in"]
-        amount_out = mapped["amount_out"]
-        amount_in_raw = mapped["amount_in_raw"]
-        amount_out_raw = mapped["amount_out_raw"]
-
-        # Calculate MON amount and determine if it's a sell
-        mon_amount = Decimal(0)
-        is_sell = False
-
-        if token_in == MON_ADDRESS:
-            mon_amount = amount_in
-            is_sell = True  # Selling MON for other token
-        elif token_out == MON_ADDRESS:
-            mon_amount = amount_out
-            is_sell = False  # Buying MON with other token
-        else:
-            # No MON involved in this swap
+        # Claim the transaction - a concurrent worker may have processed it meanwhile
+        if not ProcessedTransaction.add_processed(db, tx_hash, block_number, block_hash):
+            db.rollback()
+            logger.info("swaps", f"Skipping duplicate tx {tx_hash}")
+            return True
+
+        if record["wallet"] is None:
+            # No MON involved in this swap - keep the marker to avoid reprocessing
+            db.commit()
             logger.info("swaps", f"Ignoring non-MON swap tx {tx_hash}", {
-                "token_in": token_in,
-                "token_out": token_out
+                "token_in": record["token_in"],
+                "token_out": record["token_out"]
             })
-            # Mark as processed to avoid reprocessing
-            ProcessedTransaction.add_processed(db, tx_hash, block_number, block_hash)
             return True
 
-        # Resolve wallet address
-        sender = normalize_address(event.get("sender", ""))
-        recipient = normalize_address(event.get("recipient", ""))
-        from_addr = normalize_address(event.get("from", ""))
-        to_addr = normalize_address(event.get("to", ""))
-
-        potential_wallets = [addr for addr in [sender, recipient, from_addr, to_addr] if addr]
-        wallet_addr = resolve_wallet(potential_wallets, db)
-
-        # Store swap in database
-        Swap.add_swap(
-            db=db,
-            tx_hash=tx_hash,
-            block_number=block_number,
-            block_hash=block_hash,
-            pool=normalize_address(event.get("pool", "")),
-            token_in=token_in,
-            token_out=token_out,
-            amount_in_raw=amount_in_raw,
-            amount_out_raw=amount_out_raw,
-            amount_in=amount_in,
-            amount_out=amount_out,
-            mon_amount=mon_amount,
-            is_sell=is_sell,
-            wallet=wallet_addr
-        )
-
-        # Mark as processed
-        ProcessedTransaction.add_processed(db, tx_hash, block_number, block_hash)
-
-        # Update position tracking
-        from app.services.positions import process_swap_for_position
-        position_updated = process_swap_for_position(
-            wallet=wallet_addr,
-            token_in=token_in,
-            token_out=token_out,
-            amount_in=amount_in,
-            amount_out=amount_out,
+        # Update position tracking - one atomic upsert, committed with the marker
+        realized_pnl = process_swap_for_position(
+            wallet=record["wallet"],
+            token_in=record["token_in"],
+            token_out=record["token_out"],
+            amount_in=record["amount_in"],
+            amount_out=record["amount_out"],
             mon_address=MON_ADDRESS,
-            db=db
+            db=db,
+            block_number=block_number
         )
 
-        if not position_updated:
+        if realized_pnl is None:
+            db.rollback()
             logger.warn("swaps", f"Position update failed for swap {tx_hash}")
+            return False
+
+        # Store swap with the PnL it realized
+        record["realized_pnl_mon"] = realized_pnl
+        Swap.add_swap(db=db, **record)
+        db.commit()
+
+        _publish_trade(record)
 
         logger.info("swaps", f"Successfully processed swap {tx_hash}", {
-            "wallet": wallet_addr,
-            "mon_amount": str(mon_amount),
-            "is_sell": is_sell,
-            "block": block_number,
-            "position_updated": position_updated
+            "wallet": record["wallet"],
+            "mon_amount": str(record["mon_amount"]),
+            "is_sell": record["is_sell"],
+            "block": block_number
         })
 
         return True
@@ -242,4 +441,267 @@ def process_swap_event(event: dict, db: Session) -> bool:
     except Exception as e:
         db.rollback()
         logger.error("swaps", f"Error processing swap {tx_hash}", error=e)
-        return False
\ No newline at end of file
+        return False
+
+
+def process_swap_batch(events: List[dict], db: Session, retry: bool = True) -> List[Dict[str, Any]]:
+    """
+    Process a whole webhook batch of swap events in one transaction
+
+    - One dedup query for all transaction hashes
+    - Pool tokens from the in-memory registry, with one DB query and
+      one JSON-RPC batch for pools not seen before
+    - Wallets from the in-memory tracked-wallet index
+    - One position load for all touched (wallet, token) pairs,
+      updated in memory in chain order, with reorg undo records
+    - One bulk insert each for swaps and processed markers
+    - One commit for the batch
+
+    With the position cache enabled, positions come from and go back to
+    the cache, and reach the positions table on its next flush.
+
+    Args:
+        events: Swap events from the webhook payload
+        db: Database session
+        retry: Run the batch once more if a concurrent batch processed
+            some of its transactions first
+
+    Returns:
+        One result dictionary per event (success, tx_hash, error), in payload order
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+
+    def _set_result(index: int, success: bool, error: Optional[str] = None):
+        results[index] = {
+            "success": success,
+            "tx_hash": events[index].get("txHash", "unknown"),
+            "error": error
+        }
+
+    if not wallet_index.loaded:
+        warm_wallet_index(db)
+
+    # --- Validate ---
+    valid = []  # (index, event, tx_hash, block_number, block_hash)
+    for index, event in enumerate(events):
+        tx_hash = event.get("txHash")
+        if not tx_hash:
+            _set_result(index, False, "Missing transaction hash")
+            continue
+
+        block = _parse_block(event)
+        if block is None:
+            _set_result(index, False, "Missing or invalid block data")
+            continue
+
+        valid.append((index, event, tx_hash, block[0], block[1]))
+
+    pending: List[int] = []
+    tracked: Dict[int, str] = {}  # blocks this batch added to the chain tracker
+
+    try:
+        # --- Pools and tokens: resolved (RPC, stored, committed) before the batch's transaction ---
+        pool_tokens = get_pools_info(
+            [normalize_address(item[1].get("pool", "")) for item in valid], db
+        )
+        token_decimals = get_token_decimals_many(
+            {token for tokens in pool_tokens.values() for token in tokens}, db
+        )
+
+        # --- Reorg check: in-memory lookup over the batch's blocks ---
+        blocks = {(block_number, block_hash) for _, _, _, block_number, block_hash in valid}
+        reorg_block = detect_reorg_many(blocks, db, parent_hashes(event for _, event, _, _, _ in valid))
+        if reorg_block is not None:
+            handle_reorg(reorg_block, db)
+            logger.warn("swaps", f"Handled reorg at block {reorg_block}")
+
+        # --- Dedup ---
+        seen = ProcessedTransaction.get_processed_hashes(db, [item[2] for item in valid])
+
+        # --- Map tokens, amounts and wallets ---
+        wallets = resolve_wallets([item[1] for item in valid])
+        swap_rows = []
+        processed_rows = []
+        trades = []  # (order_key, index, record)
+
+        for (index, event, tx_hash, block_number, block_hash), wallet in zip(valid, wallets):
+            if tx_hash in seen:
+                _set_result(index, True)
+                continue
+            seen.add(tx_hash)
+
+            record = _build_swap_record(
+                event, tx_hash, block_number, block_hash, db, pool_tokens, wallet, token_decimals
+            )
+            if not record:
+                _set_result(index, False, "Failed to map tokens")
+                continue
+
+            processed_rows.append({
+                "tx_hash": tx_hash,
+                "block_number": block_number,
+                "block_hash": block_hash
+            })
+            pending.append(index)
+
+            if record["wallet"] is not None:
+                swap_rows.append(record)
+                trades.append((event_order_key(event), index, record))
+
+        # --- Positions, applied in chain order ---
+        trades.sort(key=lambda trade: (trade[0], trade[1]))
+
+        position_trades = []  # (record, token)
+        classified = {}  # index -> trade, reused when publishing
+        for _, index, record in trades:
+            trade = classify_position_trade(
+                record["token_in"], record["token_out"],
+                record["amount_in"], record["amount_out"], MON_ADDRESS
+            )
+            if trade is not None:
+                position_trades.append((record, trade[0]))
+                classified[index] = trade
+
+        position_keys = [(record["wallet"], token) for record, token in position_trades]
+        if position_cache is not None:
+            positions, versions = position_cache.checkout(db, position_keys)
+        else:
+            positions = Position.get_positions(db, position_keys)
+
+        # Reorg undo state: position before its first change in each block
+        recorded = PositionDelta.get_recorded_keys(db, [record["block_number"] for record, _ in position_trades])
+        delta_rows = []
+
+        for record, token in position_trades:
+            delta_key = (record["block_number"], record["wallet"], token)
+            if delta_key not in recorded:
+                recorded.add(delta_key)
+                delta_rows.append(PositionDelta.build(*delta_key, positions.get((record["wallet"], token))))
+
+            position = apply_swap_to_positions(
+                positions,
+                wallet=record["wallet"],
+                token_in=record["token_in"],
+                token_out=record["token_out"],
+                amount_in=record["amount_in"],
+                amount_out=record["amount_out"],
+                mon_address=MON_ADDRESS,
+                db=db if position_cache is None else None
+            )
+            record["realized_pnl_mon"] = position.last_trade_pnl_mon
+
+        # --- Write ---
+        # Markers first: if a concurrent batch claimed one of these
+        # transactions since the dedup query, nothing of this batch is kept
+        if ProcessedTransaction.add_processed_bulk(db, processed_rows) < len(processed_rows):
+            raise ConcurrentBatchError("Transactions of this batch were processed concurrently")
+        Swap.add_swaps_bulk(db, swap_rows)
+        PositionDelta.add_deltas_bulk(db, delta_rows)
+        tracked = record_canonical_blocks(sorted(blocks), db)
+        if position_cache is None:
+            db.commit()
+        elif not position_cache.commit(db, positions, versions):
+            raise ConcurrentBatchError("Positions of this batch were changed concurrently")
+        else:
+            position_cache.flush_if_full()
+
+        for index in pending:
+            _set_result(index, True)
+
+        for _, index, record in trades:
+            _publish_trade(record, classified.get(index))
+
+        logger.info("swaps", "Processed swap batch", {
+            "events": len(events),
+            "swaps": len(swap_rows),
+            "processed": len(processed_rows),
+            "positions": len(positions)
+        })
+
+    except ConcurrentBatchError as e:
+        db.rollback()
+        discard_canonical_blocks(tracked)
+        if retry:
+            # The dedup query now sees the other batch's transactions
+            logger.warn("swaps", "Retrying swap batch after concurrent processing", {"events": len(events)})
+            return process_swap_batch(events, db, retry=False)
+
+        logger.error("swaps", "Error processing swap batch", error=e, context={"events": len(events)})
+        for index in range(len(events)):
+            if results[index] is None or index in pending:
+                _set_result(index, False, str(e))
+
+    except Exception as e:
+        db.rollback()
+        # Blocks tracked by the failed transaction weren't persisted
+        discard_canonical_blocks(tracked)
+        logger.error("swaps", "Error processing swap batch", error=e, context={
+            "events": len(events)
+        })
+        for index in range(len(events)):
+            if results[index] is None or index in pending:
+                _set_result(index, False, str(e))
+
+    return results
+
+
+def record_historical_swaps(events: List[dict], db: Session) -> Tuple[int, int]:
+    """
+    Store swaps of finalized blocks without applying them to positions (backfill)
+
+    History arrives after live trades of the same wallets, so applying it
+    trade by trade would stack old trades on the current positions. The
+    swaps and processed markers are stored in one transaction; the
+    wallets' positions are replayed from the swaps table afterwards
+    (see rebuild.rebuild_wallet_positions). No reorg checks, undo records
+    or leaderboard/price updates - the blocks are final and old.
+
+    Pools and tokens must already be resolvable (prefetched); events that
+    can't be mapped count as failed and aren't marked processed, so a
+    rerun picks them up.
+
+    Args:
+        events: Swap events in chain order, with block timestamps
+        db: Database session
+
+    Returns:
+        Tuple of (succeeded, failed); already processed events succeed
+    """
+    pool_tokens = get_pools_info([normalize_address(event.get("pool", "")) for event in events], db)
+    token_decimals = get_token_decimals_many(
+        {token for tokens in pool_tokens.values() for token in tokens}, db
+    )
+
+    records = {}
+    failed = 0
+    for event, wallet in zip(events, resolve_wallets(events)):
+        tx_hash = event.get("txHash")
+        block = _parse_block(event)
+        if not tx_hash or block is None:
+            failed += 1
+            continue
+        if tx_hash in records:
+            continue
+
+        record = _build_swap_record(event, tx_hash, block[0], block[1], db, pool_tokens, wallet, token_decimals)
+        if not record:
+            failed += 1
+            continue
+        records[tx_hash] = record
+
+    try:
+        claimed = ProcessedTransaction.claim_many(db, [
+            {"tx_hash": tx_hash, "block_number": record["block_number"], "block_hash": record["block_hash"]}
+            for tx_hash, record in records.items()
+        ])
+        Swap.add_swaps_bulk(db, [
+            record for tx_hash, record in records.items()
+            if tx_hash in claimed and record["wallet"] is not None
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("swaps", "Error recording historical swaps", error=e, context={"events": len(events)})
+        return 0, len(events)
+
+    return len(events) - failed, failed
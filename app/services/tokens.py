@@ -0,0 +1,267 @@
+import threading
+import time
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.api.rpc import get_token_metadata_many
+from app.api.rpc_async import async_rpc
+from app.config.config import config
+from app.db.models.token import Token
+from app.utils.logger import logger
+
+
+class TokenRegistry:
+    """
+    In-process cache of token address -> (decimals, symbol)
+
+    Token metadata never changes, so resolved entries never expire.
+    Tokens whose decimals() call failed are cached negatively for a TTL;
+    their amounts can't be normalized meanwhile.
+    """
+
+    def __init__(self, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        self._tokens: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._failed: Dict[str, float] = {}
+        self._unsaved: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def get(self, address: str) -> Optional[Tuple[int, Optional[str]]]:
+        """Get cached (decimals, symbol) for a token"""
+        return self._tokens.get(address)
+
+    def decimals(self, address: str) -> Optional[int]:
+        """Get cached decimals for a token"""
+        metadata = self._tokens.get(address)
+        return metadata[0] if metadata is not None else None
+
+    def put(self, address: str, decimals: int, symbol: Optional[str]) -> None:
+        """Cache the metadata of a token"""
+        with self._lock:
+            self._tokens[address] = (decimals, symbol)
+            self._failed.pop(address, None)
+
+    def put_unsaved(self, address: str, decimals: int, symbol: Optional[str]) -> None:
+        """Cache a token resolved outside a DB session - stored by the next DB-backed lookup"""
+        with self._lock:
+            self._tokens[address] = (decimals, symbol)
+            self._failed.pop(address, None)
+            self._unsaved[address] = (decimals, symbol)
+
+    def take_unsaved(self) -> Dict[str, Tuple[int, Optional[str]]]:
+        """Get and clear the tokens that still need to be stored"""
+        if not self._unsaved:
+            return {}
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+        return unsaved
+
+    def restore_unsaved(self, tokens: Dict[str, Tuple[int, Optional[str]]]) -> None:
+        """Put back tokens whose store failed - retried by the next DB-backed lookup"""
+        with self._lock:
+            self._unsaved = {**tokens, **self._unsaved}
+
+    def is_failed(self, address: str) -> bool:
+        """Check if a token recently failed metadata resolution"""
+        failed_at = self._failed.get(address)
+        if failed_at is None:
+            return False
+
+        if time.monotonic() - failed_at >= self.negative_ttl:
+            with self._lock:
+                self._failed.pop(address, None)
+            return False
+
+        return True
+
+    def mark_failed(self, address: str) -> None:
+        """Negatively cache a token whose metadata resolution failed"""
+        with self._lock:
+            self._failed[address] = time.monotonic()
+
+    def load(self, db: Session) -> int:
+        """
+        Preload every known token from the database
+
+        Returns:
+            Number of tokens cached
+        """
+        rows = db.query(Token.address, Token.decimals, Token.symbol).all()
+        with self._lock:
+            for row in rows:
+                self._tokens[row.address] = (row.decimals, row.symbol)
+        return len(rows)
+
+
+token_registry = TokenRegistry(negative_ttl=config.POOL_NEGATIVE_CACHE_TTL)
+
+
+def warm_token_registry(db: Session) -> int:
+    """
+    Load the tokens table into the in-memory registry (call at startup)
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of tokens loaded
+    """
+    try:
+        count = token_registry.load(db)
+        logger.info("tokens", "Token registry warmed", {"tokens": count})
+        return count
+    except Exception as e:
+        logger.error("tokens", "Failed to warm token registry", error=e)
+        return 0
+
+
+async def prefetch_tokens(token_addresses: Iterable[str]) -> int:
+    """
+    Resolve tokens unknown to the registry with the async RPC client
+
+    Runs on the event loop before a batch is handed to the worker pool.
+    Resolved tokens are stored in the DB by the next get_token_decimals_many.
+
+    Args:
+        token_addresses: Token contract addresses
+
+    Returns:
+        Number of tokens resolved
+    """
+    unknown = [
+        address for address in set(token_addresses)
+        if address and token_registry.get(address) is None and not token_registry.is_failed(address)
+    ]
+    if not unknown:
+        return 0
+
+    try:
+        resolved = await async_rpc.get_token_metadata_many(unknown)
+    except Exception as e:
+        logger.warn("tokens", "Async token prefetch failed, workers will retry", {
+            "tokens": len(unknown),
+            "error": str(e)
+        })
+        return 0
+
+    for address in unknown:
+        if address in resolved:
+            token_registry.put_unsaved(address, *resolved[address])
+        else:
+            token_registry.mark_failed(address)
+
+    return len(resolved)
+
+
+def _store_unsaved_tokens(db: Session) -> None:
+    """Store tokens that were resolved by prefetch_tokens"""
+    unsaved = token_registry.take_unsaved()
+    if not unsaved:
+        return
+
+    try:
+        added = Token.add_tokens_bulk(db, unsaved)
+        logger.info("tokens", "Tokens added to database", {"tokens": added})
+    except Exception as e:
+        token_registry.restore_unsaved(unsaved)
+        logger.error("tokens", "Failed to store prefetched tokens, will retry", error=e)
+
+
+def get_token_decimals_many(token_addresses: Iterable[str], db: Session) -> Dict[str, int]:
+    """
+    Get decimals for many tokens (e.g. every token of a webhook batch)
+
+    Lookup order: in-memory registry, one DB query for the misses, then a
+    single JSON-RPC batch for tokens that are unknown everywhere. Newly
+    resolved tokens are stored with one bulk INSERT.
+
+    Args:
+        token_addresses: Token contract addresses
+        db: Database session
+
+    Returns:
+        Dictionary of token address -> decimals; tokens that could not be
+        resolved are left out (never guessed - a wrong scale would be
+        stored for good)
+    """
+    _store_unsaved_tokens(db)
+
+    result = {}
+    missing = []
+
+    for address in set(token_addresses):
+        if not address:
+            continue
+        decimals = token_registry.decimals(address)
+        if decimals is not None:
+            result[address] = decimals
+        elif not token_registry.is_failed(address):
+            missing.append(address)
+
+    if not missing:
+        return result
+
+    for address, token in Token.get_tokens(db, missing).items():
+        token_registry.put(address, token.decimals, token.symbol)
+        result[address] = token.decimals
+
+    unknown = [address for address in missing if address not in result]
+    if not unknown:
+        return result
+
+    try:
+        resolved = get_token_metadata_many(unknown)
+    except Exception as e:
+        logger.error("tokens", "Failed to resolve tokens via RPC batch", error=e, context={
+            "tokens": len(unknown)
+        })
+        resolved = {}
+
+    for address in unknown:
+        if address in resolved:
+            token_registry.put(address, *resolved[address])
+            result[address] = resolved[address][0]
+        else:
+            token_registry.mark_failed(address)
+            logger.warn("tokens", f"Unresolved decimals for {address}, its swaps fail until resolved")
+
+    try:
+        added = Token.add_tokens_bulk(db, resolved)
+        if added:
+            logger.info("tokens", "Tokens added to database", {"tokens": added})
+    except Exception as e:
+        token_registry.restore_unsaved(resolved)
+        logger.error("tokens", "Failed to store resolved tokens, will retry", error=e)
+
+    return result
+
+
+def get_token_decimals(token_address: str, db: Session) -> int:
+    """
+    Get decimals of a token from registry, database or RPC
+
+    Args:
+        token_address: Token contract address
+        db: Database session
+
+    Returns:
+        Token decimals
+
+    Raises:
+        ValueError: If the decimals can't be resolved (now, or recently)
+    """
+    token_address = token_address.lower()
+    _store_unsaved_tokens(db)
+
+    # In-memory registry first - no DB round trip on the hot path
+    decimals = token_registry.decimals(token_address)
+    if decimals is not None:
+        return decimals
+
+    decimals = get_token_decimals_many([token_address], db).get(token_address)
+    if decimals is None:
+        raise ValueError(f"Decimals of token {token_address} could not be resolved")
+    return decimals
@@ -1,43 +1,158 @@
+import threading
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Set
 
+from app.db.database import SessionLocal
 from app.db.models.wallet import Wallet
-from app.api.key_value_qn import add_wallet_key_value_list, remove_wallet_key_value_list
+from app.services.kv_sync import wallet_list_sync
 from app.utils.logger import logger
-from app.utils.utils import normalize_address
+from app.utils.utils import is_address, normalize_address
+
+
+# Event fields that can hold the trading wallet, highest priority first
+WALLET_PRIORITY_FIELDS = ("sender", "recipient", "from", "to")
+
+
+class WalletIndex:
+    """
+    In-memory set of tracked wallet addresses
+
+    Loaded from the wallets table at startup and kept current by
+    add_wallet/remove_wallet, so wallet resolution is an O(1)
+    membership test instead of a query per candidate address.
+    """
+
+    def __init__(self):
+        self._addresses: Set[str] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._addresses
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session) -> int:
+        """
+        Replace the index with every address in the wallets table
+
+        Returns:
+            Number of tracked wallets
+        """
+        addresses = {row.address for row in db.query(Wallet.address).all()}
+        with self._lock:
+            self._addresses = addresses
+            self._loaded = True
+        return len(addresses)
+
+    def add(self, address: str) -> None:
+        with self._lock:
+            self._addresses.add(address)
+
+    def remove(self, address: str) -> None:
+        with self._lock:
+            self._addresses.discard(address)
+
+
+wallet_index = WalletIndex()
+
+
+def warm_wallet_index(db: Session) -> int:
+    """
+    Load the wallets table into the in-memory index (call at startup)
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of tracked wallets loaded
+    """
+    try:
+        count = wallet_index.load(db)
+        logger.info("wallets", "Wallet index warmed", {"wallets": count})
+        return count
+    except Exception as e:
+        logger.error("wallets", "Failed to warm wallet index", error=e)
+        return 0
+
+
+def wallet_candidates(event: dict) -> List[str]:
+    """
+    Candidate wallet addresses of an event in priority order (sender, recipient, from, to)
+
+    Args:
+        event: Swap event data
+
+    Returns:
+        Normalized, deduplicated addresses - order preserved
+    """
+    candidates = [normalize_address(event.get(field, "")) for field in WALLET_PRIORITY_FIELDS]
+    return list(dict.fromkeys(address for address in candidates if address))
+
+
+def pick_wallet(candidates: List[str]) -> str:
+    """First tracked candidate, else the highest-priority candidate, else unknown"""
+    for address in candidates:
+        if address in wallet_index:
+            return address
+    return candidates[0] if candidates else "unknown"
 
 
 def resolve_wallet(wallet_addresses: List[str], db: Session) -> str:
     """
-    Find the first wallet address that exists in the wallets table.
+    Find the first wallet address that is tracked.
+
+    Candidates are checked in the given order, so callers pass them by
+    priority (sender, recipient, from, to).
 
     Args:
         wallet_addresses: List of potential wallet addresses
-        db: Database session
+        db: Database session (only used to load the index if it isn't warm yet)
 
     Returns:
-        Normalized wallet address if found in database, "unknown" otherwise
+        Normalized wallet address if tracked, otherwise the first candidate or "unknown"
     """
     if not wallet_addresses or len(wallet_addresses) == 0:
         logger.warn("wallets", "No wallet addresses provided for resolution")
         return "unknown"
 
-    # Normalize and deduplicate addresses
-    normalized_addresses = list(set([normalize_address(addr) for addr in wallet_addresses if addr]))
+    if not wallet_index.loaded:
+        warm_wallet_index(db)
 
-    # Check each address against database
-    for address in normalized_addresses:
-        if Wallet.exists(db, address):
-            logger.info("wallets", f"Resolved wallet", {"address": address})
-            return address
+    # Normalize and deduplicate addresses, keeping priority order
+    normalized_addresses = list(dict.fromkeys(
+        normalize_address(addr) for addr in wallet_addresses if addr
+    ))
+
+    wallet = pick_wallet(normalized_addresses)
+
+    if wallet not in wallet_index:
+        logger.warn("wallets", f"Wallet not tracked, using fallback", {
+            "checked": normalized_addresses,
+            "fallback": wallet
+        })
+
+    return wallet
 
-    # If no wallet found in database, return first address or "unknown"
-    fallback = normalized_addresses[0] if normalized_addresses else "unknown"
-    logger.warn("wallets", f"Wallet not found in database, using fallback", {
-        "checked": normalized_addresses,
-        "fallback": fallback
-    })
-    return fallback
+
+def resolve_wallets(events: List[dict]) -> List[str]:
+    """
+    Resolve the wallet of every event in a batch without any DB calls
+
+    Requires the wallet index to be warm (see warm_wallet_index).
+
+    Args:
+        events: Swap events
+
+    Returns:
+        One wallet address per event, in event order
+    """
+    return [pick_wallet(wallet_candidates(event)) for event in events]
 
 
 def add_wallet(
@@ -69,18 +184,14 @@ def add_wallet(
         wallet = Wallet.add_wallet(db, wallet_address, twitter_name, twitter_pfp)
 
         if wallet:
-            # Add to QuickNode filter list
-            try:
-                add_wallet_key_value_list([wallet_address])
-                logger.info("wallets", f"Wallet added successfully", {
-                    "address": wallet_address,
-                    "twitter": twitter_name
-                })
-            except Exception as e:
-                logger.error("wallets", f"Failed to add wallet to QuickNode", error=e, context={
-                    "address": wallet_address
-                })
-                # Don't rollback DB transaction if only QuickNode fails
+            wallet_index.add(wallet_address)
+
+            # Queue for the QuickNode filter list - sent in batches, repaired by reconcile
+            wallet_list_sync.request_add([wallet_address])
+            logger.info("wallets", f"Wallet added successfully", {
+                "address": wallet_address,
+                "twitter": twitter_name
+            })
 
         return wallet
 
@@ -113,14 +224,11 @@ def remove_wallet(wallet_address: str, db: Session) -> bool:
         removed = Wallet.remove_wallet(db, wallet_address)
 
         if removed:
-            # Remove from QuickNode filter list
-            try:
-                remove_wallet_key_value_list([wallet_address])
-                logger.info("wallets", f"Wallet removed successfully", {"address": wallet_address})
-            except Exception as e:
-                logger.error("wallets", f"Failed to remove wallet from QuickNode", error=e, context={
-                    "address": wallet_address
-                })
+            wallet_index.remove(wallet_address)
+
+            # Queue for the QuickNode filter list - sent in batches, repaired by reconcile
+            wallet_list_sync.request_remove([wallet_address])
+            logger.info("wallets", f"Wallet removed successfully", {"address": wallet_address})
 
         return removed
 
@@ -128,4 +236,58 @@ def remove_wallet(wallet_address: str, db: Session) -> bool:
         logger.error("wallets", f"Failed to remove wallet", error=e, context={
             "address": wallet_address
         })
-        raise
\ No newline at end of file
+        raise
+
+
+def import_wallets(entries: List[Dict[str, Optional[str]]], db: Session) -> Dict[str, Any]:
+    """
+    Track many wallets at once (e.g. an influencer list)
+
+    Entries are upserted in multi-row INSERTs; new addresses are queued
+    for the QuickNode filter list together, so the next flush sends them
+    in as few PATCH calls as possible.
+
+    Args:
+        entries: Dictionaries with address and optional twitter_name/twitter_pfp;
+            a later entry for the same address wins
+        db: Database session
+
+    Returns:
+        Dictionary with received, imported, new and invalid (addresses) entries
+    """
+    wallets: Dict[str, Dict[str, Optional[str]]] = {}
+    invalid = []
+
+    for entry in entries:
+        address = normalize_address(entry.get("address") or "")
+        if not is_address(address):
+            invalid.append(entry.get("address"))
+            continue
+        wallets[address] = {
+            "address": address,
+            "twitter_name": entry.get("twitter_name") or None,
+            "twitter_pfp": entry.get("twitter_pfp") or None
+        }
+
+    new = Wallet.upsert_wallets_bulk(db, list(wallets.values()))
+
+    for address in new:
+        wallet_index.add(address)
+    wallet_list_sync.request_add(new)
+
+    stats = {"received": len(entries), "imported": len(wallets), "new": len(new), "invalid": invalid}
+    logger.info("wallets", "Imported wallets", {**stats, "invalid": len(invalid)})
+    return stats
+
+
+def export_wallets(batch_size: int = 1000) -> Iterator[tuple]:
+    """
+    Stream every tracked wallet as (address, twitter_name, twitter_pfp, created_at)
+
+    Uses its own session so it can outlive the request that started it.
+    """
+    db = SessionLocal()
+    try:
+        yield from Wallet.stream_wallets(db, batch_size)
+    finally:
+        db.close()
@@ -1,6 +1,9 @@
+import re
 from datetime import datetime, timedelta
-from decimal import Decimal
-from typing import Optional
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Union
+
+ADDRESS_PATTERN = re.compile(r"0x[0-9a-f]{40}")
 
 
 def normalize_address(address: Optional[str]) -> str:
@@ -10,20 +13,75 @@ def normalize_address(address: Optional[str]) -> str:
     return address.lower().strip()
 
 
-def normalize_amount(raw: str, decimals: int = 18) -> Decimal:
+def is_address(address: str) -> bool:
+    """Check if a normalized string is a 20-byte hex address"""
+    return bool(ADDRESS_PATTERN.fullmatch(address))
+
+
+def parse_raw_amount(raw: Union[str, int]) -> int:
+    """
+    Parse a raw on-chain amount (base units) to an int
+
+    Integer strings take the int() fast path; anything else Decimal
+    accepts (e.g. "1e18") is parsed as long as it is integral.
+
+    Args:
+        raw: Raw amount as string or int
+
+    Returns:
+        Amount in base units
+
+    Raises:
+        ValueError: If raw is not an integral amount
+    """
+    if isinstance(raw, int):
+        return raw
+
+    try:
+        return int(raw)
+    except (ValueError, TypeError):
+        pass
+
+    try:
+        value = Decimal(raw)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Invalid raw amount: {raw!r}")
+
+    if not value.is_finite() or value != value.to_integral_value():
+        raise ValueError(f"Invalid raw amount: {raw!r}")
+
+    return int(value)
+
+
+def from_base_units(amount: int, decimals: int = 18) -> Decimal:
+    """
+    Convert an int amount of base units to a decimal number
+
+    Shifts the exponent instead of dividing by 10**decimals.
+
+    Args:
+        amount: Amount in base units
+        decimals: Token decimals (default 18)
+
+    Returns:
+        Decimal representation of the amount
+    """
+    return Decimal(amount).scaleb(-decimals)
+
+
+def normalize_amount(raw: Union[str, int], decimals: int = 18) -> Decimal:
     """
     Convert raw token amount string to decimal number
 
     Args:
-        raw: Raw amount as string
+        raw: Raw amount as string (or int)
         decimals: Token decimals (default 18)
 
     Returns:
         Decimal representation of the amount
     """
     try:
-        divisor = Decimal(10) ** decimals
-        return Decimal(raw) / divisor
+        return from_base_units(parse_raw_amount(raw), decimals)
     except Exception:
         return Decimal(0)
 
@@ -0,0 +1,132 @@
+"""
+Microbenchmark of swap amount normalization
+
+Compares the per-event CPU cost of the previous Decimal path (parse
+amounts as Decimal, abs, str, re-parse and divide by 10**decimals) with
+the integer fast path (ints of base units until a single exponent shift
+to Decimal) on a synthetic batch of swaps. Both paths include the price
+division done for MON swaps.
+
+Usage (from the repository root):
+    python -m benchmarks.amount_normalization [--events 100000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List, Tuple
+
+from app.utils.utils import from_base_units, parse_raw_amount
+
+MON = "0x760afe86e5de5fa0ee542fc7b7b713e1c5425701"
+TOKENS = {
+    "0x" + "11" * 20: 6,
+    "0x" + "22" * 20: 8,
+    "0x" + "33" * 20: 18,
+}
+DECIMALS = {MON: 18, **TOKENS}
+
+Swap = Tuple[str, str, str, str]  # (token0, token1, amount0, amount1)
+
+
+def make_swaps(count: int, seed: int = 7) -> List[Swap]:
+    """Synthetic swap events with raw amounts as strings, like the webhook payload"""
+    rng = random.Random(seed)
+    tokens = list(TOKENS)
+    swaps = []
+    for _ in range(count):
+        token = rng.choice(tokens)
+        mon_raw = rng.randrange(10 ** 15, 10 ** 22)
+        token_raw = rng.randrange(10 ** 3, 10 ** (TOKENS[token] + 6))
+        if rng.random() < 0.5:
+            mon_raw = -mon_raw
+        else:
+            token_raw = -token_raw
+        if rng.random() < 0.5:
+            swaps.append((MON, token, str(mon_raw), str(token_raw)))
+        else:
+            swaps.append((token, MON, str(token_raw), str(mon_raw)))
+    return swaps
+
+
+def _legacy_normalize(raw: str, decimals: int) -> Decimal:
+    try:
+        divisor = Decimal(10) ** decimals
+        return Decimal(raw) / divisor
+    except Exception:
+        return Decimal(0)
+
+
+def legacy_path(swap: Swap, decimals: Dict[str, int]) -> Tuple[Decimal, Decimal, Decimal]:
+    """Decimal parsing as done before the fast path"""
+    token0, token1, amount0_raw, amount1_raw = swap
+    a0 = Decimal(amount0_raw)
+    a1 = Decimal(amount1_raw)
+
+    if a0 < 0 < a1:
+        token_in, token_out = token0, token1
+        amount_in_raw, amount_out_raw = str(abs(a0)), str(abs(a1))
+    else:
+        token_in, token_out = token1, token0
+        amount_in_raw, amount_out_raw = str(abs(a1)), str(abs(a0))
+
+    amount_in = _legacy_normalize(amount_in_raw, decimals[token_in])
+    amount_out = _legacy_normalize(amount_out_raw, decimals[token_out])
+    price = amount_in / amount_out if token_in == MON else amount_out / amount_in
+    return amount_in, amount_out, price
+
+
+def fast_path(swap: Swap, decimals: Dict[str, int]) -> Tuple[Decimal, Decimal, Decimal]:
+    """Ints of base units, one Decimal conversion per amount"""
+    token0, token1, amount0_raw, amount1_raw = swap
+    a0 = parse_raw_amount(amount0_raw)
+    a1 = parse_raw_amount(amount1_raw)
+
+    if a0 < 0 < a1:
+        token_in, token_out = token0, token1
+        amount_in_wei, amount_out_wei = -a0, a1
+    else:
+        token_in, token_out = token1, token0
+        amount_in_wei, amount_out_wei = -a1, a0
+
+    amount_in = from_base_units(amount_in_wei, decimals[token_in])
+    amount_out = from_base_units(amount_out_wei, decimals[token_out])
+    price = amount_in / amount_out if token_in == MON else amount_out / amount_in
+    return amount_in, amount_out, price
+
+
+def measure(path: Callable, swaps: List[Swap], repeat: int) -> float:
+    """Best CPU time per event in microseconds over `repeat` runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        for swap in swaps:
+            path(swap, DECIMALS)
+        best = min(best, time.process_time() - started)
+    return best / len(swaps) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000, help="synthetic swaps per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path (best is reported)")
+    args = parser.parse_args()
+
+    swaps = make_swaps(args.events)
+
+    # Both paths must agree before their timings mean anything
+    for swap in swaps:
+        if legacy_path(swap, DECIMALS) != fast_path(swap, DECIMALS):
+            raise SystemExit(f"Paths disagree on {swap}")
+
+    legacy = measure(legacy_path, swaps, args.repeat)
+    fast = measure(fast_path, swaps, args.repeat)
+
+    print(f"events per run:  {len(swaps)}")
+    print(f"decimal path:    {legacy:.2f} us/event")
+    print(f"integer path:    {fast:.2f} us/event")
+    print(f"speedup:         {legacy / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+# Settings are read when app.config is first imported
+_db_dir = tempfile.mkdtemp(prefix="nadsscan-tests-")
+os.environ.update({
+    "QUICKNODE_SECURITY_TOKEN": "test-token",
+    "QUICKNODE_RPC_URL": "http://127.0.0.1:9/",
+    "QUICKNODE_API_KEY": "test-key",
+    "MONAD_RPC_URL": "http://127.0.0.1:9/",
+    "DATABASE_URL": f"sqlite:///{_db_dir}/test.sqlite",
+})
+
+import pytest
+from sqlalchemy import text
+
+from app.config.config import config
+from app.db.database import Base, SessionLocal, engine
+from app.db.models import (  # noqa: F401 - register every table
+    backfill_checkpoint,
+    canonical_block,
+    ingest_pause,
+    ingest_queue,
+    nft,
+    pool,
+    position,
+    position_delta,
+    processed_transactions,
+    swap,
+    token,
+    wallet,
+)
+from app.db.models.pool import Pool
+from app.db.models.token import Token
+from app.db.models.wallet import Wallet
+from app.services.pools import pool_registry, warm_pool_registry
+from app.services.reorg import chain_tracker
+from app.services.tokens import token_registry, warm_token_registry
+from app.services.wallets import wallet_index, warm_wallet_index
+
+MON = config.MON_ADDRESS
+TOKEN = "0x" + "11" * 20
+POOL = "0x" + "22" * 20  # MON / TOKEN
+WALLET = "0x" + "aa" * 20
+OTHER_WALLET = "0x" + "bb" * 20
+E18 = 10 ** 18
+
+# Streaming readers and writers overlap (rebuild workers); WAL lets SQLite commit meanwhile
+with engine.connect() as connection:
+    connection.execute(text("PRAGMA journal_mode=WAL"))
+
+
+@pytest.fixture
+def db():
+    """Session on an empty database with one MON/TOKEN pool and two tracked wallets"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    pool_registry.__init__(negative_ttl=config.POOL_NEGATIVE_CACHE_TTL)
+    token_registry.__init__(negative_ttl=config.POOL_NEGATIVE_CACHE_TTL)
+    chain_tracker.__init__(capacity=config.CHAIN_TRACKER_CAPACITY)
+
+    session = SessionLocal()
+    Pool.add_pool(session, POOL, MON, TOKEN)
+    Token.add_tokens_bulk(session, {MON: (18, "MON"), TOKEN: (18, "TKN")})
+    Wallet.upsert_wallets_bulk(session, [{"address": WALLET}, {"address": OTHER_WALLET}])
+
+    warm_pool_registry(session)
+    warm_token_registry(session)
+    warm_wallet_index(session)
+
+    yield session
+    session.close()
+
+
+def tx_hash(tx: int) -> str:
+    return f"0x{tx:064x}"
+
+
+def swap_event(tx: int, block: int, wallet: str, mon: float, tokens: float, log_index: int = 0,
+               block_hash: str = None) -> dict:
+    """
+    Webhook swap event on POOL, from the pool's point of view
+
+    `mon` and `tokens` are the pool's balance changes: a buy of tokens with
+    MON is (mon > 0, tokens < 0).
+    """
+    return {
+        "txHash": tx_hash(tx),
+        "blockNumber": block,
+        "blockHash": block_hash or f"0x{block:064x}",
+        "logIndex": log_index,
+        "pool": POOL,
+        "amount0": str(int(mon * E18)),
+        "amount1": str(int(tokens * E18)),
+        "sender": wallet,
+        "recipient": wallet,
+        "timestamp": 1_700_000_000 + block,
+    }
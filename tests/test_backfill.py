@@ -0,0 +1,161 @@
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.api.rpc_async import async_rpc
+from app.db.models.backfill_checkpoint import BackfillCheckpoint
+from app.db.models.position import Position
+from app.db.models.swap import Swap
+from app.services.backfill import (
+    SWAP_TOPIC,
+    backfill,
+    default_job_name,
+    fetch_logs,
+    fetch_swap_events,
+    swap_filters,
+    wallet_topic,
+)
+from app.services.pools import pool_registry
+from app.services.swaps import process_swap_batch
+
+from conftest import E18, OTHER_WALLET, POOL, TOKEN, WALLET, swap_event, tx_hash
+
+BLOCK_TIME = 1_600_000_000
+
+
+def _word(value: int) -> str:
+    return f"{value % (1 << 256):064x}"
+
+
+def swap_log(tx: int, block: int, wallet: str, mon: float, tokens: float, pool: str = POOL) -> dict:
+    """Raw Swap log of POOL, as eth_getLogs returns it"""
+    return {
+        "address": pool,
+        "blockNumber": hex(block),
+        "blockHash": f"0x{block:064x}",
+        "logIndex": "0x0",
+        "transactionHash": tx_hash(tx),
+        "topics": [SWAP_TOPIC, wallet_topic(wallet), wallet_topic(wallet)],
+        "data": "0x" + _word(int(mon * E18)) + _word(int(tokens * E18)) + _word(1) * 3,
+        "removed": False,
+    }
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Fake provider: serves `logs`, rejects ranges over 10 blocks, stamps blocks 2s apart"""
+    state = {"logs": [], "calls": []}
+
+    async def get_logs(from_block, to_block, topics, address=None):
+        state["calls"].append((from_block, to_block))
+        if to_block - from_block + 1 > 10:
+            raise ValueError("query exceeds max block range 10")
+        wallets = set(topics[1] or []) | set(topics[2] if len(topics) > 2 else [])
+        return [
+            log for log in state["logs"]
+            if from_block <= int(log["blockNumber"], 16) <= to_block
+            and (log["topics"][1] in wallets or log["topics"][2] in wallets)
+        ]
+
+    async def get_block_timestamps(block_numbers):
+        return {number: BLOCK_TIME + 2 * number for number in block_numbers}
+
+    monkeypatch.setattr(async_rpc, "get_logs", get_logs)
+    monkeypatch.setattr(async_rpc, "get_block_timestamps", get_block_timestamps)
+    return state
+
+
+def test_fetch_logs_halves_rejected_ranges(chain):
+    chain["logs"] = [swap_log(block, block, WALLET, 1.0, -1.0) for block in range(0, 40, 3)]
+
+    logs = asyncio.run(fetch_logs(0, 39, [SWAP_TOPIC, [wallet_topic(WALLET)]]))
+
+    assert [int(log["blockNumber"], 16) for log in logs] == list(range(0, 40, 3))
+    assert (0, 39) in chain["calls"]
+    assert max(to_block - from_block + 1 for from_block, to_block in chain["calls"][1:]) <= 20
+
+
+def test_fetch_logs_raises_other_errors_without_splitting(monkeypatch):
+    calls = []
+
+    async def get_logs(from_block, to_block, topics, address=None):
+        calls.append((from_block, to_block))
+        raise ValueError("execution reverted")
+
+    monkeypatch.setattr(async_rpc, "get_logs", get_logs)
+
+    with pytest.raises(ValueError):
+        asyncio.run(fetch_logs(0, 99, []))
+    assert calls == [(0, 99)]
+
+
+@pytest.mark.parametrize("message", ["rate limit exceeded", "request limit reached", "Too Many Requests"])
+def test_fetch_logs_backs_off_on_rate_limits_without_splitting(monkeypatch, message):
+    calls = []
+
+    async def get_logs(from_block, to_block, topics, address=None):
+        calls.append((from_block, to_block))
+        if len(calls) < 3:
+            raise ValueError(f"RPC error: {message}")
+        return []
+
+    monkeypatch.setattr(async_rpc, "get_logs", get_logs)
+    monkeypatch.setattr("app.services.backfill.backoff_delay", lambda attempt: 0)
+
+    assert asyncio.run(fetch_logs(0, 99, [])) == []
+    assert calls == [(0, 99)] * 3
+
+
+def test_swap_filters_match_senders_and_recipients_in_groups(monkeypatch):
+    monkeypatch.setattr("app.config.config.config.BACKFILL_WALLETS_PER_FILTER", 2)
+    wallets = [WALLET, OTHER_WALLET, "0x" + "cc" * 20]
+
+    filters = swap_filters(wallets)
+
+    assert len(filters) == 4
+    assert filters[0] == [SWAP_TOPIC, [wallet_topic(WALLET), wallet_topic(OTHER_WALLET)]]
+    assert filters[1] == [SWAP_TOPIC, None, [wallet_topic(WALLET), wallet_topic(OTHER_WALLET)]]
+
+
+def test_swaps_matching_several_filters_are_returned_once(chain):
+    chain["logs"] = [swap_log(1, 5, WALLET, 1.0, -1.0), swap_log(2, 3, WALLET, 1.0, -1.0)]
+
+    events = asyncio.run(fetch_swap_events(0, 9, swap_filters([WALLET])))
+
+    assert [event["blockNumber"] for event in events] == [3, 5]
+
+
+def test_backfill_stores_history_and_replays_positions_in_chain_order(db, chain):
+    # A live sell arrives before its history is backfilled
+    assert process_swap_batch([swap_event(1, 1000, WALLET, -1.0, 5.0)], db)[0]["success"]
+    chain["logs"] = [swap_log(2, 10, WALLET, 1.0, -10.0), swap_log(3, 20, WALLET, -2.0, 5.0)]
+
+    stats = asyncio.run(backfill([WALLET], from_block=0, to_block=99, chunk_blocks=10, concurrency=2, force=True))
+
+    assert (stats["succeeded"], stats["failed"], stats["next_block"]) == (2, 0, 100)
+    assert stats["replay"] == {"wallets": 1, "swaps": 3, "positions": 1}
+    db.expire_all()
+    stored = {swap.tx_hash: swap.timestamp for swap in db.query(Swap).all()}
+    assert stored[tx_hash(2)].replace(tzinfo=timezone.utc) == datetime.fromtimestamp(BLOCK_TIME + 20, timezone.utc)
+
+    position = Position.get_positions(db, [(WALLET, TOKEN)])[(WALLET, TOKEN)]
+    assert position.amount == Decimal(0)
+    assert position.trade_count == 3
+    assert float(position.realized_pnl_mon) == pytest.approx(2.0)  # 5 sold at 0.4, then 5 at 0.2, bought at 0.1
+    assert BackfillCheckpoint.get_checkpoint(db, default_job_name([WALLET])).status == BackfillCheckpoint.STATUS_DONE
+
+
+def test_backfill_stops_before_the_checkpoint_when_a_window_fails(db, chain):
+    broken_pool = "0x" + "99" * 20
+    pool_registry.mark_failed(broken_pool)  # token0()/token1() reverted
+    chain["logs"] = [swap_log(2, 5, WALLET, 1.0, -10.0), swap_log(3, 25, WALLET, 1.0, -10.0, pool=broken_pool)]
+
+    stats = asyncio.run(backfill([WALLET], from_block=0, to_block=99, chunk_blocks=10, concurrency=1, force=True))
+
+    assert (stats["succeeded"], stats["failed"], stats["next_block"]) == (1, 1, 20)
+    checkpoint = BackfillCheckpoint.get_checkpoint(db, default_job_name([WALLET]))
+    assert (checkpoint.next_block, checkpoint.status) == (20, BackfillCheckpoint.STATUS_RUNNING)
+    # Swaps that did make it are still applied to positions
+    assert Position.get_positions(db, [(WALLET, TOKEN)])[(WALLET, TOKEN)].amount == Decimal(10)
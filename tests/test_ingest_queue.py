@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from app.config.config import config
+from app.db.models.ingest_queue import IngestQueueItem
+from app.services.ingest_pause import ingest_gate
+from app.services.ingest_queue import _claim_next, _ingest_item, replay, run_ingest_consumer
+
+
+def _status(db, item_id):
+    db.expire_all()
+    return db.get(IngestQueueItem, item_id).status
+
+
+def _ingest(item, response):
+    async def process(payload):
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    asyncio.run(_ingest_item(item, process))
+
+
+def test_payloads_are_claimed_once_in_order(db):
+    first = IngestQueueItem.enqueue(db, json.dumps({"swaps": [1]}))
+    second = IngestQueueItem.enqueue(db, json.dumps({"swaps": [2]}))
+
+    claimed = _claim_next()
+    assert (claimed["id"], claimed["attempts"]) == (first, 1)
+    assert _claim_next()["id"] == second
+    assert _claim_next() is None
+    assert _status(db, first) == IngestQueueItem.STATUS_PROCESSING
+
+    assert IngestQueueItem.release_claimed(db) == 2
+    assert _status(db, first) == IngestQueueItem.STATUS_PENDING
+
+
+def test_payloads_with_failed_events_are_retried_until_attempts_run_out(db, monkeypatch):
+    monkeypatch.setattr(config, "INGEST_MAX_ATTEMPTS", 2)
+    item_id = IngestQueueItem.enqueue(db, json.dumps({"swaps": []}))
+
+    _ingest(_claim_next(), {"status": "ok", "errors": 1})
+    assert _status(db, item_id) == IngestQueueItem.STATUS_PENDING
+
+    _ingest(_claim_next(), RuntimeError("database is down"))
+    assert _status(db, item_id) == IngestQueueItem.STATUS_FAILED
+    assert db.get(IngestQueueItem, item_id).error == "database is down"
+
+    assert replay(db, item_id, failed_only=True) == 1
+    _ingest(_claim_next(), {"status": "ok", "errors": 0})
+    assert _status(db, item_id) == IngestQueueItem.STATUS_DONE
+
+
+def test_replay_requeues_a_range_but_not_claimed_payloads(db):
+    ids = [IngestQueueItem.enqueue(db, "{}") for _ in range(4)]
+    for _ in ids[:3]:
+        item = _claim_next()
+        if item["id"] != ids[2]:
+            IngestQueueItem.mark_done(db, item["id"])
+
+    assert replay(db, ids[1]) == 2  # ids[1] done, ids[3] pending; ids[2] is being processed
+    assert replay(db, ids[0], ids[0], failed_only=True) == 0
+    assert [_status(db, item_id) for item_id in ids] == [
+        IngestQueueItem.STATUS_DONE,
+        IngestQueueItem.STATUS_PENDING,
+        IngestQueueItem.STATUS_PROCESSING,
+        IngestQueueItem.STATUS_PENDING,
+    ]
+
+
+def test_consumer_does_not_claim_while_ingestion_is_paused(db):
+    item_id = IngestQueueItem.enqueue(db, json.dumps({"swaps": []}))
+    processed = []
+
+    async def process(payload):
+        processed.append(payload)
+        return {"status": "ok", "errors": 0}
+
+    async def run():
+        consumer = asyncio.create_task(run_ingest_consumer(process, 0.01))
+        try:
+            await asyncio.sleep(0.1)
+            assert processed == []
+            ingest_gate.set_paused(False)
+            for _ in range(100):
+                if processed:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+
+    ingest_gate.set_paused(True)
+    try:
+        asyncio.run(run())
+    finally:
+        ingest_gate.set_paused(False)
+
+    assert processed == [{"swaps": []}]
+    assert _status(db, item_id) == IngestQueueItem.STATUS_DONE
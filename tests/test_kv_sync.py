@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.kv_sync import WalletListSync
+
+from conftest import OTHER_WALLET, WALLET
+
+THIRD_WALLET = "0x" + "cc" * 20
+UNTRACKED_WALLET = "0x" + "dd" * 20
+
+
+@pytest.fixture
+def patches(monkeypatch):
+    """Records PATCH calls to the KV wallet list; set patches.fail to fail them"""
+    class Patches(list):
+        fail = False
+
+    calls = Patches()
+
+    def update(add_items=[], remove_items=[]):
+        calls.append((list(add_items), list(remove_items)))
+        return not calls.fail
+
+    monkeypatch.setattr("app.services.kv_sync.update_wallet_key_value_list", update)
+    return calls
+
+
+def test_changes_to_an_address_coalesce_into_its_last_state(patches):
+    sync = WalletListSync(batch_size=10)
+    sync.request_add([WALLET, OTHER_WALLET])
+    sync.request_remove([WALLET.upper().replace("0X", "0x")])
+    sync.request_add([THIRD_WALLET, ""])
+
+    assert sync.flush() == {"added": 2, "removed": 1, "failed": 0, "requests": 1}
+    assert patches == [([OTHER_WALLET, THIRD_WALLET], [WALLET])]
+    assert len(sync) == 0
+
+
+def test_flush_sends_batches_of_batch_size(patches):
+    sync = WalletListSync(batch_size=2)
+    sync.request_add([WALLET, OTHER_WALLET, THIRD_WALLET])
+    sync.request_remove([UNTRACKED_WALLET])
+
+    assert sync.flush()["requests"] == 2
+    assert patches == [([WALLET, OTHER_WALLET], [UNTRACKED_WALLET]), ([THIRD_WALLET], [])]
+
+
+def test_failed_patches_are_requeued_behind_newer_requests(patches):
+    sync = WalletListSync(batch_size=10)
+    sync.request_add([WALLET, OTHER_WALLET])
+    patches.fail = True
+
+    assert sync.flush()["failed"] == 2
+
+    sync.request_remove([WALLET])  # newer than the failed add
+    patches.fail = False
+    sync.flush()
+    assert patches[-1] == ([OTHER_WALLET], [WALLET])
+
+
+def test_reconcile_queues_missing_and_extra_addresses(db, patches, monkeypatch):
+    monkeypatch.setattr("app.services.kv_sync.get_wallet_key_value_list",
+                        lambda: [WALLET, UNTRACKED_WALLET, THIRD_WALLET])
+    sync = WalletListSync(batch_size=10)
+    sync.request_add([THIRD_WALLET])  # pending, left to the next flush
+
+    assert sync.reconcile(db) == {"missing": 1, "extra": 1}
+
+    sync.flush()
+    assert patches == [([OTHER_WALLET, THIRD_WALLET], [UNTRACKED_WALLET])]
+
+
+def test_reconcile_fails_without_the_wallet_list(db, monkeypatch):
+    monkeypatch.setattr("app.services.kv_sync.get_wallet_key_value_list", lambda: None)
+    sync = WalletListSync(batch_size=10)
+
+    with pytest.raises(RuntimeError):
+        sync.reconcile(db)
+    assert sync.last_reconcile_at is None
@@ -0,0 +1,81 @@
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services.leaderboard import LeaderboardTrade, RankedScores, WalletLeaderboards, WindowLeaderboard
+from app.services.swaps import process_swap_batch
+
+from conftest import OTHER_WALLET, WALLET, swap_event
+
+DAY = 86400
+NOW = 1_700_000_000.0
+
+
+def _trade(timestamp: float, block: int, wallet: str, pnl: str, volume: str = "1") -> LeaderboardTrade:
+    return LeaderboardTrade(timestamp, block, wallet, Decimal(pnl), Decimal(volume))
+
+
+def test_ranked_scores_stay_sorted_through_updates():
+    scores = RankedScores()
+    scores.add("a", Decimal(1))
+    scores.add("b", Decimal(3))
+    scores.add("c", Decimal(2))
+    scores.add("a", Decimal(5))
+    scores.discard("b")
+
+    assert scores.top(2) == [("a", Decimal(6)), ("c", Decimal(2))]
+    assert scores.top(0) == []
+    assert len(scores) == 2
+
+
+def test_window_evicts_trades_that_fall_out():
+    window = WindowLeaderboard("1d", DAY)
+    window.add(_trade(NOW - DAY - 1, 1, "a", "4"))
+    window.add(_trade(NOW - 10, 2, "a", "-1"))
+    window.add(_trade(NOW - 5, 3, "b", "2"))
+
+    assert window.evict(NOW) == 1
+    assert window.rankings["pnl"].top(5) == [("b", Decimal(2)), ("a", Decimal(-1))]
+
+    assert window.evict(NOW + DAY) == 2
+    assert len(window.rankings["pnl"]) == len(window.rankings["volume"]) == 0
+
+
+def test_window_drops_trades_of_orphaned_blocks():
+    window = WindowLeaderboard("1d", DAY)
+    for block, wallet, pnl in [(10, "a", "1"), (11, "b", "2"), (12, "a", "3"), (13, "b", "4")]:
+        window.add(_trade(NOW, block, wallet, pnl))
+
+    assert window.remove_from_block(12) == 2
+    assert len(window) == 2
+    assert window.rankings["pnl"].top(5) == [("b", Decimal(2)), ("a", Decimal(1))]
+
+
+def test_trades_land_in_the_windows_of_their_block_time(monkeypatch):
+    monkeypatch.setattr("app.services.leaderboard.time", SimpleNamespace(time=lambda: NOW))
+    boards = WalletLeaderboards(("1d", "7d", "30d"))
+
+    boards.record_trade("a", 1, Decimal(1), Decimal(10), timestamp=NOW - 3 * DAY)
+    boards.record_trade("b", 2, Decimal(2), Decimal(20), timestamp=NOW - 60)
+
+    assert [entry["wallet"] for entry in boards.top("1d", "volume", 10)["entries"]] == ["b"]
+    assert [entry["wallet"] for entry in boards.top("7d", "volume", 10)["entries"]] == ["b", "a"]
+    assert boards.top("30d", "pnl", 1)["wallets"] == 2
+
+
+def test_windows_load_from_the_swaps_table(db):
+    recent = int(time.time()) - 60
+    process_swap_batch([
+        {**swap_event(1, 100, WALLET, 1.0, -10.0), "timestamp": recent},
+        {**swap_event(2, 101, WALLET, -0.6, 4.0), "timestamp": recent},
+        {**swap_event(3, 102, OTHER_WALLET, 2.0, -5.0), "timestamp": recent},
+        swap_event(4, 103, OTHER_WALLET, 1.0, -1.0),  # block time out of the window
+    ], db)
+    boards = WalletLeaderboards(("1d",))
+
+    assert boards.load(db) == 3
+    assert boards.loaded
+    assert [entry["wallet"] for entry in boards.top("1d", "volume", 10)["entries"]] == [OTHER_WALLET, WALLET]
+    assert boards.remove_from_block(101) == 2
+    [entry] = boards.top("1d", "volume", 10)["entries"]
+    assert (entry["wallet"], Decimal(entry["value_mon"])) == (WALLET, Decimal(1))
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.db.models.nft import NFTTrade
+from app.services.nfts import get_wallet_nft_summary, process_nft_batch
+from app.services.swaps import process_swap_batch
+
+from conftest import E18, OTHER_WALLET, WALLET, swap_event, tx_hash
+
+CONTRACT = "0x" + "55" * 20
+THIRD_WALLET = "0x" + "cc" * 20
+
+
+def nft_sale(tx: int, block: int, seller: str, buyer: str, price: float, token_id: str = "1", **fields) -> dict:
+    """Webhook NFT sale event of CONTRACT"""
+    return {
+        "txHash": tx_hash(tx),
+        "blockNumber": block,
+        "blockHash": f"0x{block:064x}",
+        "logIndex": 0,
+        "contract": CONTRACT,
+        "tokenId": token_id,
+        "price": str(int(price * E18)),
+        "seller": seller,
+        "buyer": buyer,
+        **fields,
+    }
+
+
+def test_sales_without_a_price_are_rejected(db):
+    sale = nft_sale(1, 100, WALLET, OTHER_WALLET, 1.0)
+    del sale["price"]
+
+    results = process_nft_batch([sale, nft_sale(2, 100, WALLET, OTHER_WALLET, 1.0, token_id="2")], db)
+
+    assert [result["success"] for result in results] == [False, True]
+    assert {trade.token_id for trade in db.query(NFTTrade).all()} == {"2"}
+
+
+def test_sales_are_stamped_with_their_block_time(db):
+    process_nft_batch([nft_sale(1, 100, WALLET, OTHER_WALLET, 1.0, timestamp=hex(1_600_000_000))], db)
+
+    db.expire_all()
+    stamps = {trade.timestamp.replace(tzinfo=timezone.utc) for trade in db.query(NFTTrade).all()}
+    assert stamps == {datetime.fromtimestamp(1_600_000_000, timezone.utc)}
+
+
+def _sells(db, wallet=WALLET):
+    db.expire_all()
+    trades = db.query(NFTTrade).filter(NFTTrade.wallet == wallet, NFTTrade.is_sell.is_(True))
+    return [trade.realized_pnl_mon for trade in trades.order_by(NFTTrade.block_number)]
+
+
+@pytest.mark.parametrize("batches", [1, 2], ids=["one batch", "two batches"])
+def test_a_sale_realizes_its_value_minus_the_last_buy(db, batches):
+    sales = [
+        nft_sale(1, 100, THIRD_WALLET, WALLET, 1.0),
+        nft_sale(2, 101, WALLET, OTHER_WALLET, 1.5),
+    ]
+    for batch in ([sales] if batches == 1 else [[sale] for sale in sales]):
+        process_nft_batch(batch, db)
+
+    assert _sells(db) == [Decimal("0.5")]
+
+
+def test_a_sale_without_a_known_buy_has_no_pnl(db):
+    process_nft_batch([nft_sale(1, 100, WALLET, OTHER_WALLET, 2.0)], db)
+
+    assert _sells(db) == [None]
+
+
+def test_the_cost_basis_is_used_by_one_sale_only(db):
+    process_nft_batch([
+        nft_sale(1, 100, THIRD_WALLET, WALLET, 1.0),
+        nft_sale(2, 101, WALLET, OTHER_WALLET, 0.4),
+    ], db)
+    # Got the NFT back without buying it (e.g. a transfer), then sold it again
+    process_nft_batch([nft_sale(3, 102, WALLET, OTHER_WALLET, 3.0)], db)
+
+    assert _sells(db) == [Decimal("-0.6"), None]
+
+
+def test_wallet_summary_adds_swap_volume(db):
+    process_nft_batch([
+        nft_sale(1, 100, THIRD_WALLET, WALLET, 1.0),
+        nft_sale(2, 101, WALLET, OTHER_WALLET, 1.5),
+    ], db)
+    process_swap_batch([swap_event(3, 102, WALLET, 1.0, -10.0)], db)
+
+    summary = get_wallet_nft_summary(WALLET, db)
+
+    assert (summary["nft"]["trades"], summary["nft"]["buys"], summary["nft"]["sells"]) == (2, 1, 1)
+    assert Decimal(summary["nft"]["volume_mon"]) == Decimal("2.5")
+    assert Decimal(summary["nft"]["realized_pnl_mon"]) == Decimal("0.5")
+    assert Decimal(summary["swaps"]["volume_mon"]) == 1
+    assert Decimal(summary["total_volume_mon"]) == Decimal("3.5")
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.rpc_async import async_rpc
+from app.db.models.pool import Pool
+from app.services.pools import PoolRegistry, get_or_create_pool_info, get_pools_info, pool_registry, prefetch_pools
+
+from conftest import MON, POOL, TOKEN
+
+NEW_POOL = "0x" + "33" * 20
+NEW_TOKEN = "0x" + "44" * 20
+
+
+@pytest.fixture
+def rpc(monkeypatch):
+    """Sync RPC batch that resolves NEW_POOL only, recording what was asked"""
+    calls = []
+
+    def get_pool_tokens_many(addresses):
+        calls.append(sorted(addresses))
+        return {address: (MON, NEW_TOKEN) for address in addresses if address == NEW_POOL}
+
+    monkeypatch.setattr("app.services.pools.get_pool_tokens_many", get_pool_tokens_many)
+    return calls
+
+
+@pytest.fixture
+def flaky_insert(monkeypatch):
+    """Pool.add_pools_bulk fails on its first call"""
+    calls = []
+    add_pools_bulk = Pool.add_pools_bulk.__func__
+
+    def flaky(cls, db, pools):
+        calls.append(dict(pools))
+        if len(calls) == 1:
+            raise RuntimeError("database is down")
+        return add_pools_bulk(cls, db, pools)
+
+    monkeypatch.setattr(Pool, "add_pools_bulk", classmethod(flaky))
+    return calls
+
+
+def test_prefetched_pools_are_kept_until_stored(db, monkeypatch, flaky_insert):
+    async def get_pool_tokens_many(addresses):
+        return {NEW_POOL: (MON, NEW_TOKEN)}
+
+    monkeypatch.setattr(async_rpc, "get_pool_tokens_many", get_pool_tokens_many)
+    asyncio.run(prefetch_pools([NEW_POOL]))
+
+    get_pools_info([NEW_POOL], db)
+    assert Pool.get_pool(db, NEW_POOL) is None
+
+    get_pools_info([NEW_POOL], db)
+    assert Pool.get_pool(db, NEW_POOL).token1 == NEW_TOKEN
+    assert flaky_insert == [{NEW_POOL: (MON, NEW_TOKEN)}] * 2
+    assert pool_registry.take_unsaved() == {}
+
+
+def test_known_pools_are_served_from_memory(db, rpc):
+    assert get_pools_info([POOL], db) == {POOL: (MON, TOKEN)}
+    assert rpc == []
+
+
+def test_unknown_pools_are_resolved_once_and_stored(db, rpc):
+    broken_pool = "0x" + "99" * 20
+
+    assert get_pools_info([NEW_POOL, broken_pool], db) == {NEW_POOL: (MON, NEW_TOKEN)}
+    assert get_pools_info([NEW_POOL, broken_pool], db) == {NEW_POOL: (MON, NEW_TOKEN)}
+
+    assert rpc == [sorted([NEW_POOL, broken_pool])]
+    assert Pool.get_pool(db, NEW_POOL).token0 == MON
+    assert pool_registry.is_failed(broken_pool)
+    with pytest.raises(ValueError):
+        get_or_create_pool_info(broken_pool, db)
+
+
+def test_failed_pools_are_retried_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.pools.time", SimpleNamespace(monotonic=lambda: now[0]))
+    registry = PoolRegistry(negative_ttl=60)
+
+    registry.mark_failed(NEW_POOL)
+    now[0] += 59
+    assert registry.is_failed(NEW_POOL)
+    now[0] += 1
+    assert not registry.is_failed(NEW_POOL)
+
+    registry.mark_failed(NEW_POOL)
+    registry.put(NEW_POOL, MON, NEW_TOKEN)
+    assert not registry.is_failed(NEW_POOL)
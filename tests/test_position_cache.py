@@ -0,0 +1,109 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.db.models.position import Position
+from app.services.position_cache import PositionCache
+from app.services.swaps import process_swap_batch
+
+from conftest import OTHER_WALLET, TOKEN, WALLET, swap_event
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = PositionCache(max_dirty=1000, max_entries=1)
+    monkeypatch.setattr("app.services.swaps.position_cache", cache)
+    monkeypatch.setattr("app.services.reorg.position_cache", cache)
+    return cache
+
+
+def _stored(db, wallet):
+    db.rollback()  # see the flush's commit
+    return Position.get_positions(db, [(wallet, TOKEN)]).get((wallet, TOKEN))
+
+
+def test_positions_are_written_on_flush(db, cache):
+    results = process_swap_batch([
+        swap_event(1, 100, WALLET, 1.0, -10.0),
+        swap_event(2, 101, WALLET, -0.5, 4.0),
+    ], db)
+
+    assert all(result["success"] for result in results)
+    assert _stored(db, WALLET) is None
+    assert cache.dirty_count == 1
+
+    assert cache.flush(db) == 1
+    position = _stored(db, WALLET)
+    assert position.amount == Decimal(6)
+    assert position.trade_count == 2
+    assert cache.dirty_count == 0
+
+
+def test_eviction_prunes_versions(db, cache):
+    for tx, wallet in enumerate([WALLET, OTHER_WALLET, WALLET]):
+        process_swap_batch([swap_event(tx, 100 + tx, wallet, 1.0, -10.0)], db)
+        cache.flush(db)
+
+    assert len(cache) == 1
+    assert set(cache._versions) == set(cache._entries)
+
+
+def test_commit_is_rejected_when_its_key_was_evicted_meanwhile(db, cache):
+    key = (WALLET, TOKEN)
+    stale, versions = cache.checkout(db, [key])
+    assert stale == {}
+
+    # Another batch changes the position, which is flushed and evicted
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0)], db)
+    process_swap_batch([swap_event(2, 101, OTHER_WALLET, 1.0, -10.0)], db)
+    cache.flush(db)
+    assert key not in cache._versions
+
+    position = Position(wallet=WALLET, token=TOKEN, amount=Decimal(1), average_entry_price_mon=Decimal(1))
+    assert not cache.commit(db, {key: position}, versions)
+    assert _stored(db, WALLET).amount == Decimal(10)
+
+
+def test_invalidate_flushes_and_rejects_checked_out_positions(db, cache):
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0)], db)
+    positions, versions = cache.checkout(db, [(WALLET, TOKEN)])
+
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+    assert _stored(db, WALLET).amount == Decimal(10)
+    assert not cache.commit(db, positions, versions)
+
+
+def test_checkouts_wait_until_the_suspension_ends(db, cache):
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0)], db)
+    checked_out = []
+
+    def checkout():
+        session = SessionLocal()
+        try:
+            checked_out.append(cache.checkout(session, [(WALLET, TOKEN)]))
+        finally:
+            session.close()
+
+    with cache.suspended() as written:
+        assert written == 1
+        worker = threading.Thread(target=checkout)
+        worker.start()
+        worker.join(timeout=0.2)
+        assert worker.is_alive() and not checked_out
+
+    worker.join(timeout=5)
+    positions, versions = checked_out[0]
+    assert positions[(WALLET, TOKEN)].amount == Decimal(10)
+    assert cache.commit(db, positions, versions)
+
+
+def test_reorg_rolls_back_cached_positions(db, cache):
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0), swap_event(2, 101, WALLET, 1.0, -10.0)], db)
+
+    process_swap_batch([swap_event(3, 101, WALLET, 0.5, -2.0, block_hash="0x" + "ff" * 32)], db)
+    cache.flush(db)
+
+    assert _stored(db, WALLET).amount == Decimal(12)
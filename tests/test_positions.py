@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.db.models.position import Position
+from app.services.position_cache import PositionCache
+from app.services.positions import decode_leaderboard_cursor, reprice_positions
+from app.services.swaps import process_swap_batch
+
+from conftest import OTHER_WALLET, TOKEN, WALLET, swap_event
+
+
+def _position(db, wallet=WALLET):
+    db.rollback()  # see other sessions' commits
+    return Position.get_positions(db, [(wallet, TOKEN)]).get((wallet, TOKEN))
+
+
+def test_reprice_marks_open_positions_to_market(db):
+    process_swap_batch([
+        swap_event(1, 100, WALLET, 1.0, -10.0),
+        swap_event(2, 101, OTHER_WALLET, 1.0, -10.0),
+        swap_event(3, 102, OTHER_WALLET, -3.0, 10.0),
+    ], db)
+
+    assert reprice_positions({TOKEN: Decimal("0.3")}, db) == {TOKEN: 1}
+
+    position = _position(db)
+    assert float(position.unrealized_pnl_mon) == pytest.approx(2.0)  # 10 held at 0.1, marked at 0.3
+    assert float(position.total_pnl_mon) == pytest.approx(2.0)
+    assert float(_position(db, OTHER_WALLET).unrealized_pnl_mon) == 0
+
+
+@pytest.mark.parametrize("sold", [10.0, 14.0], ids=["flat", "short"])
+def test_closing_a_repriced_position_drops_its_unrealized_pnl(db, sold):
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0)], db)
+    reprice_positions({TOKEN: Decimal("0.3")}, db)
+
+    process_swap_batch([swap_event(2, 101, WALLET, -0.2 * sold, sold)], db)
+
+    position = _position(db)
+    assert position.unrealized_pnl_mon == 0
+    assert float(position.realized_pnl_mon) == pytest.approx(0.1 * sold)  # sold 0.1 above entry
+    assert float(position.total_pnl_mon) == pytest.approx(0.1 * sold)
+
+
+def test_cached_close_of_a_repriced_position_drops_its_unrealized_pnl(db, monkeypatch):
+    cache = PositionCache(max_dirty=1000, max_entries=100)
+    monkeypatch.setattr("app.services.swaps.position_cache", cache)
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0)], db)
+    cache.flush(db)
+    reprice_positions({TOKEN: Decimal("0.3")}, db)
+
+    process_swap_batch([swap_event(2, 101, WALLET, -2.0, 10.0)], db)
+    cache.flush(db)
+
+    position = _position(db)
+    assert position.unrealized_pnl_mon == 0
+    assert float(position.total_pnl_mon) == pytest.approx(1.0)
+
+
+def _ranked_positions(db):
+    """Open positions with tied total PnL, and a closed one"""
+    rows = []
+    for index, total_pnl in enumerate(["5", "3", "3", "3", "1", "-2"]):
+        position = Position.new_position(f"0x{index:040x}", TOKEN, Decimal(1), Decimal(1))
+        position.realized_pnl_mon = position.total_pnl_mon = Decimal(total_pnl)
+        rows.append(position.to_row())
+    closed = Position.new_position("0x" + "ee" * 20, TOKEN, Decimal(0), Decimal(1))
+    closed.total_pnl_mon = Decimal(100)
+    rows.append(closed.to_row())
+
+    for row in rows:
+        row.pop("first_trade_at")
+    db.execute(Position.__table__.insert(), rows)
+    db.commit()
+
+
+def test_leaderboard_pages_with_a_keyset_cursor(db):
+    _ranked_positions(db)
+    client = TestClient(app)
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/positions/leaderboard", params=params).json()
+        pages.append([(entry["wallet"], Decimal(entry["total_pnl_mon"])) for entry in body["positions"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    entries = [entry for page in pages for entry in page]
+    assert [len(page) for page in pages] == [2, 2, 2, 0]
+    assert [pnl for _, pnl in entries] == [5, 3, 3, 3, 1, -2]
+    assert len({wallet for wallet, _ in entries}) == 6
+    # Ties are ordered by wallet, descending
+    assert [wallet for wallet, pnl in entries if pnl == 3] == [f"0x{index:040x}" for index in (3, 2, 1)]
+
+
+def test_malformed_cursors_are_rejected(db):
+    with pytest.raises(ValueError):
+        decode_leaderboard_cursor("not-a-cursor")
+
+    response = TestClient(app).get("/positions/leaderboard", params={"cursor": "abc:0x1"})
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+from app.db.models.position import Position
+from app.services.prices import PriceOracle, TokenPrice, mark_positions_to_market
+from app.services.swaps import process_swap_batch
+
+from conftest import TOKEN, WALLET, swap_event
+
+OTHER_TOKEN = "0x" + "33" * 20
+
+
+def test_vwap_weights_prices_by_volume_over_the_window():
+    price = TokenPrice()
+    price.add(100.0, Decimal("1"), Decimal("10"))
+    price.add(110.0, Decimal("2"), Decimal("30"))
+
+    assert price.vwap == Decimal("1.75")  # 70 MON / 40 tokens
+    assert price.last_price == Decimal("2")
+
+    price.evict(105.0)
+    assert price.vwap == Decimal("2")
+
+    price.evict(200.0)
+    assert price.snapshot()["window_trades"] == 0
+    assert price.vwap == Decimal("2")  # falls back to the last price
+
+
+def test_oracle_ignores_stale_and_invalid_trades():
+    oracle = PriceOracle(window_seconds=300)
+    now = time.time()
+
+    oracle.record_trade(TOKEN, Decimal("1"), Decimal("5"), timestamp=now - 301)
+    oracle.record_trade(TOKEN, Decimal("0"), Decimal("5"))
+    oracle.record_trade(TOKEN, Decimal("1"), Decimal("-5"))
+
+    assert oracle.get(TOKEN) is None
+    assert oracle.take_dirty_prices("vwap") == {}
+
+
+def test_dirty_prices_are_taken_once_per_trade():
+    oracle = PriceOracle(window_seconds=300)
+    oracle.record_trade(TOKEN, Decimal("1"), Decimal("10"))
+    oracle.record_trade(TOKEN, Decimal("4"), Decimal("10"))
+    oracle.record_trade(OTHER_TOKEN, Decimal("3"), Decimal("1"))
+
+    assert oracle.take_dirty_prices("vwap") == {TOKEN: Decimal("2.5"), OTHER_TOKEN: Decimal("3")}
+    assert oracle.take_dirty_prices("vwap") == {}
+
+    oracle.mark_dirty({TOKEN, "0x" + "44" * 20})
+    assert oracle.take_dirty_prices("last") == {TOKEN: Decimal("4")}
+
+
+def test_mark_to_market_reprices_positions_with_the_vwap(db, monkeypatch):
+    oracle = PriceOracle(window_seconds=300)
+    monkeypatch.setattr("app.services.prices.price_oracle", oracle)
+    monkeypatch.setattr("app.services.prices.position_cache", None)
+    process_swap_batch([swap_event(1, 100, WALLET, 1.0, -10.0)], db)
+
+    oracle.record_trade(TOKEN, Decimal("0.2"), Decimal("10"))
+    oracle.record_trade(TOKEN, Decimal("0.4"), Decimal("10"))
+
+    assert mark_positions_to_market(db) == 1
+    assert mark_positions_to_market(db) == 0  # nothing traded since
+
+    db.rollback()
+    position = Position.get_positions(db, [(WALLET, TOKEN)])[(WALLET, TOKEN)]
+    assert float(position.unrealized_pnl_mon) == pytest.approx(2.0)  # 10 held at 0.1, marked at 0.3
+
+
+def test_failed_mark_to_market_keeps_tokens_dirty(db, monkeypatch):
+    oracle = PriceOracle(window_seconds=300)
+    monkeypatch.setattr("app.services.prices.price_oracle", oracle)
+    monkeypatch.setattr("app.services.prices.position_cache", None)
+    oracle.record_trade(TOKEN, Decimal("0.3"), Decimal("10"))
+
+    def fail(prices, db):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr("app.services.prices.reprice_positions", fail)
+    with pytest.raises(RuntimeError):
+        mark_positions_to_market(db)
+
+    assert oracle.take_dirty_prices("last") == {TOKEN: Decimal("0.3")}
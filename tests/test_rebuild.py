@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.db.models.ingest_pause import IngestPause
+from app.db.models.position import Position
+from app.db.models.position_delta import PositionDelta
+from app.services.ingest_pause import IngestPausedError, ingest_gate, sync_ingest_pause
+from app.services.rebuild import rebuild_positions
+from app.services.swaps import process_swap_batch
+
+from conftest import OTHER_WALLET, WALLET, swap_event
+
+COMPARED = ("amount", "average_entry_price_mon", "total_cost_mon", "realized_pnl_mon",
+            "total_bought", "total_sold", "trade_count")
+
+
+def _positions(db):
+    positions = {
+        (position.wallet, position.token): {name: float(getattr(position, name)) for name in COMPARED}
+        for position in db.query(Position).all()
+    }
+    db.rollback()  # end the read transaction, so the next read sees other sessions' writes
+    return positions
+
+
+def _ingest_history(db):
+    """Buys and sells of both wallets over several webhook batches"""
+    trades = [
+        (WALLET, 1.0, -10.0), (OTHER_WALLET, 2.0, -8.0), (WALLET, -0.6, 4.0),
+        (WALLET, 3.0, -12.0), (OTHER_WALLET, -1.5, 5.0), (WALLET, -2.0, 10.0),
+        (OTHER_WALLET, 0.5, -1.0), (WALLET, 0.2, -1.0),
+    ]
+    events = [swap_event(index, 100 + index, wallet, mon, tokens) for index, (wallet, mon, tokens) in enumerate(trades)]
+    for start in range(0, len(events), 3):
+        results = process_swap_batch(events[start:start + 3], db)
+        assert all(result["success"] for result in results)
+
+
+def test_rebuild_reproduces_incremental_positions(db):
+    _ingest_history(db)
+    incremental = _positions(db)
+    assert len(incremental) == 2
+
+    stats = rebuild_positions(workers=2, fetch_size=2, flush_size=1, force=True)
+
+    assert stats["swaps"] == 8
+    assert stats["positions"] == 2
+    rebuilt = _positions(db)
+    assert rebuilt.keys() == incremental.keys()
+    for key, values in incremental.items():
+        assert rebuilt[key] == pytest.approx(values)
+    assert db.query(PositionDelta).count() == 0
+    assert IngestPause.get_all(db) == []
+
+
+def test_rebuild_waits_for_ingestion_to_pause(db):
+    _ingest_history(db)
+    done = threading.Event()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["stats"] = rebuild_positions(workers=1)
+        finally:
+            done.set()
+
+    rebuild = threading.Thread(target=run)
+    rebuild.start()
+    try:
+        while not done.is_set() and not outcome.get("paused"):
+            session = SessionLocal()
+            try:
+                sync_ingest_pause(session)
+            finally:
+                session.close()
+            outcome["paused"] = ingest_gate.paused
+        with pytest.raises(IngestPausedError):
+            with ingest_gate.admit():
+                pass
+    finally:
+        rebuild.join()
+
+    assert outcome["stats"]["positions"] == 2
+    sync_ingest_pause(db)
+    assert not ingest_gate.paused
+
+
+def test_rebuild_fails_without_acknowledgement(db, monkeypatch):
+    monkeypatch.setattr("app.config.config.config.INGEST_PAUSE_TIMEOUT", 0.0)
+    _ingest_history(db)
+    before = _positions(db)
+
+    with pytest.raises(TimeoutError):
+        rebuild_positions(workers=1)
+
+    assert _positions(db) == before
+    assert IngestPause.get_all(db) == []
@@ -0,0 +1,77 @@
+import pytest
+
+from app.services.reorg import chain_tracker, handle_reorg
+from app.services.swaps import process_swap_batch
+
+from conftest import WALLET, swap_event
+
+
+def _hash(block: int, fork: int = 0) -> str:
+    return f"0x{fork:02x}{block:062x}"
+
+
+def _track(db, *blocks):
+    chain_tracker.record([(block, _hash(block)) for block in blocks], db)
+    db.commit()
+
+
+def test_fork_is_the_lowest_block_with_another_hash(db):
+    _track(db, 100, 101, 102)
+
+    assert chain_tracker.find_fork([(100, _hash(100)), (103, _hash(103, 1))]) is None
+    assert chain_tracker.find_fork([(102, _hash(102, 1)), (101, _hash(101, 1))]) == 101
+
+
+def test_fork_is_found_from_parent_hashes(db):
+    _track(db, 100, 101)
+
+    # Block 102 is new, but built on another block 101
+    assert chain_tracker.find_fork([(102, _hash(102, 1))], {102: _hash(101)}) is None
+    assert chain_tracker.find_fork([(102, _hash(102, 1))], {102: _hash(101, 1)}) == 101
+
+
+def test_ring_keeps_the_newest_blocks(db, monkeypatch):
+    monkeypatch.setattr(chain_tracker, "capacity", 3)
+    _track(db, 100, 101, 102, 103)
+
+    assert len(chain_tracker) == 3
+    assert chain_tracker.get(100) is None
+    assert chain_tracker.record([(99, _hash(99))], db) == {}
+
+
+def test_discard_keeps_blocks_tracked_by_other_batches(db):
+    _track(db, 100)
+    mine = chain_tracker.record([(100, _hash(100)), (101, _hash(101))], db)
+    theirs = chain_tracker.record([(102, _hash(102))], db)
+
+    chain_tracker.discard(mine)
+
+    assert mine == {101: _hash(101)}
+    assert [chain_tracker.get(block) for block in (100, 101, 102)] == [_hash(100), None, theirs[102]]
+
+
+def test_failed_batch_forgets_only_its_blocks(db, monkeypatch):
+    _track(db, 100)
+
+    def fail():
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(db, "commit", fail)
+    results = process_swap_batch([swap_event(1, 101, WALLET, 1.0, -10.0)], db)
+
+    assert not results[0]["success"]
+    assert chain_tracker.get(100) == _hash(100)
+    assert chain_tracker.get(101) is None
+
+
+def test_failed_reorg_cleanup_keeps_tracking_the_blocks(db, monkeypatch):
+    _track(db, 100, 101, 102)
+
+    def fail():
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(db, "commit", fail)
+    with pytest.raises(RuntimeError):
+        handle_reorg(101, db)
+
+    assert [chain_tracker.get(block) for block in (100, 101, 102)] == [_hash(100), _hash(101), _hash(102)]
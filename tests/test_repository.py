@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import pytest
+
+from app.db.models.position import Position
+from app.db.models.processed_transactions import ProcessedTransaction
+from app.db.models.wallet import Wallet
+from app.db.repository import insert_ignore, insert_ignore_one, upsert
+
+from conftest import TOKEN, WALLET, tx_hash
+
+
+def _marker(tx: int) -> dict:
+    return {"tx_hash": tx_hash(tx), "block_number": 100 + tx, "block_hash": "0x" + "01" * 32}
+
+
+def test_insert_ignore_returns_only_inserted_rows(db):
+    assert len(insert_ignore(db, ProcessedTransaction, [_marker(1), _marker(2)])) == 2
+    inserted = insert_ignore(db, ProcessedTransaction, [_marker(2), _marker(3)])
+    db.commit()
+
+    assert [row.tx_hash for row in inserted] == [tx_hash(3)]
+    assert db.query(ProcessedTransaction).count() == 3
+
+
+def test_insert_ignore_one_returns_none_for_existing_rows(db):
+    assert insert_ignore_one(db, ProcessedTransaction, _marker(1)).tx_hash == tx_hash(1)
+    assert insert_ignore_one(db, ProcessedTransaction, _marker(1)) is None
+
+
+def test_upsert_keep_existing_only_overwrites_with_values(db):
+    address = "0x" + "cc" * 20
+    Wallet.add_wallet(db, address, twitter_name="alice", twitter_pfp="https://pfp/alice")
+
+    upsert(db, Wallet, [{"address": address, "twitter_name": "alice2", "twitter_pfp": None}],
+           ["twitter_name", "twitter_pfp"], keep_existing=True)
+    db.commit()
+    db.expire_all()
+
+    wallet = Wallet.get_wallet(db, address)
+    assert (wallet.twitter_name, wallet.twitter_pfp) == ("alice2", "https://pfp/alice")
+
+
+def test_position_upserts_open_and_update_in_sql(db):
+    Position.update_on_buy(db, WALLET, TOKEN, Decimal(10), Decimal("0.1"))
+    Position.update_on_buy(db, WALLET, TOKEN, Decimal(10), Decimal("0.3"))
+    sold = Position.update_on_sell(db, WALLET, TOKEN, Decimal(5), Decimal("0.4"))
+    db.commit()
+
+    assert float(sold.last_trade_pnl_mon) == pytest.approx(1.0)  # 5 * (0.4 - 0.2)
+    db.expire_all()
+    position = Position.get_positions(db, [(WALLET, TOKEN)])[(WALLET, TOKEN)]
+    assert position.amount == Decimal(15)
+    assert float(position.average_entry_price_mon) == pytest.approx(0.2)
+    assert float(position.total_cost_mon) == pytest.approx(3.0)
+    assert float(position.realized_pnl_mon) == pytest.approx(1.0)
+    assert position.trade_count == 3
+
+
+def test_first_sell_opens_a_short_position_without_pnl(db):
+    Position.update_on_sell(db, WALLET, TOKEN, Decimal(4), Decimal("0.5"))
+    db.commit()
+    db.expire_all()
+
+    position = Position.get_positions(db, [(WALLET, TOKEN)])[(WALLET, TOKEN)]
+    assert position.amount == Decimal(-4)
+    assert position.realized_pnl_mon == 0
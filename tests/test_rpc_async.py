@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.api.rpc_async import AsyncRpcClient
+from app.api.rpc_endpoints import EndpointPool
+
+GOOD = "http://good.rpc/"
+BAD = "http://bad.rpc/"
+
+
+def _client(handler, slow_threshold: float = 5) -> AsyncRpcClient:
+    pool = EndpointPool([BAD, GOOD], max_concurrency=4, failure_threshold=2, reset_timeout=60,
+                        slow_threshold=slow_threshold)
+    client = AsyncRpcClient(pool, max_concurrency=4)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._semaphores = {endpoint.url: asyncio.Semaphore(4) for endpoint in pool.endpoints}
+    return client
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if str(request.url) == BAD:
+        return httpx.Response(200, text="<html>502 Bad Gateway</html>")
+    return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": "0x10"})
+
+
+def test_undecodable_responses_fail_over_and_count_as_endpoint_failures():
+    client = _client(_handler)
+    bad = client.endpoints.endpoints[0]
+
+    async def run():
+        try:
+            return [await client.call("eth_blockNumber", []) for _ in range(10)]
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == ["0x10"] * 10
+    # Ejected after failure_threshold bad bodies, like after connection errors
+    assert bad.failures == bad.requests == 2
+    assert not bad.healthy
+
+
+def test_block_timestamps_are_fetched_in_one_batch():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls = json.loads(request.content)
+        requests.append(calls)
+        return httpx.Response(200, json=[
+            {"jsonrpc": "2.0", "id": call["id"], "result": {"timestamp": hex(1000 + int(call["params"][0], 16))}}
+            for call in calls
+        ])
+
+    client = _client(handler)
+
+    async def run():
+        try:
+            return await client.get_block_timestamps([5, 3, 5])
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == {3: 1003, 5: 1005}
+    assert len(requests) == 1
+    assert [call["method"] for call in requests[0]] == ["eth_getBlockByNumber"] * 2
+
+
+def _ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": []})
+
+
+def test_get_logs_latency_does_not_eject_endpoints():
+    client = _client(_ok, slow_threshold=0)  # every timed call is "slow"
+
+    async def run():
+        try:
+            for _ in range(4):
+                await client.get_logs(0, 99_999, [])
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    assert all(endpoint.healthy and endpoint.latency is None for endpoint in client.endpoints.endpoints)
+
+
+def test_the_last_healthy_endpoint_is_not_ejected_for_slowness():
+    client = _client(_ok, slow_threshold=0)
+
+    async def run():
+        try:
+            return [await client.call("eth_blockNumber", []) for _ in range(6)]
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == [[]] * 6
+    assert [endpoint.healthy for endpoint in client.endpoints.endpoints].count(True) == 1
+
+
+def test_get_logs_timeouts_are_not_endpoint_failures():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client = _client(handler)
+
+    async def run():
+        try:
+            for _ in range(4):
+                with pytest.raises(httpx.ReadTimeout):
+                    await client.get_logs(0, 99_999, [])
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    assert all(endpoint.healthy and endpoint.failures == 0 for endpoint in client.endpoints.endpoints)
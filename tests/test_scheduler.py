@@ -0,0 +1,45 @@
+from app.services.scheduler import PartitionedScheduler
+
+
+def _key(event):
+    return event.get("key")
+
+
+def _order(event):
+    return event["block"]
+
+
+def test_split_orders_each_partition_and_keeps_unkeyed_events_apart():
+    scheduler = PartitionedScheduler(4)
+    events = [
+        {"key": "a", "block": 3},
+        {"key": None, "block": 1},
+        {"key": "a", "block": 1},
+        {"key": "a", "block": 1},
+        {"key": "b", "block": 2},
+    ]
+
+    lanes = scheduler.split(events, _key, _order)
+
+    assert [index for index, _ in lanes.pop(None)] == [1]
+    assert scheduler.partition_of("a") != scheduler.partition_of("b")
+    assert [index for index, _ in lanes[scheduler.partition_of("a")]] == [2, 3, 0]
+    assert [index for index, _ in lanes[scheduler.partition_of("b")]] == [4]
+
+
+def test_run_exclusive_holds_every_partition():
+    scheduler = PartitionedScheduler(3)
+    held = []
+
+    def handler(event):
+        held.append([lock.locked() for lock in scheduler._locks])
+        if event.get("fail"):
+            raise ValueError("boom")
+        return event["block"]
+
+    results = scheduler.run_exclusive([(0, {"block": 7}), (1, {"block": 8, "fail": True})], handler)
+
+    assert held == [[True, True, True]] * 2
+    assert results[0] == (0, 7)
+    assert isinstance(results[1][1], ValueError)
+    assert not any(lock.locked() for lock in scheduler._locks)
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import pytest
+
+from app.db.models.pool import Pool
+from app.db.models.position import Position
+from app.db.models.position_delta import PositionDelta
+from app.db.models.processed_transactions import ProcessedTransaction
+from app.db.models.swap import Swap
+from app.services.pools import pool_registry
+from app.services.swaps import process_swap_batch, process_swap_event
+from app.services.tokens import token_registry
+
+from conftest import MON, OTHER_WALLET, TOKEN, WALLET, swap_event, tx_hash
+
+
+def _position(db, wallet, token=TOKEN):
+    db.expire_all()
+    return Position.get_positions(db, [(wallet, token)]).get((wallet, token))
+
+
+def test_batch_ingests_swaps_positions_and_markers(db):
+    results = process_swap_batch([
+        swap_event(1, 100, WALLET, 1.0, -10.0),
+        swap_event(2, 101, WALLET, -0.6, 4.0),
+        swap_event(3, 101, OTHER_WALLET, 2.0, -5.0, log_index=1),
+    ], db)
+
+    assert [result["success"] for result in results] == [True, True, True]
+    assert db.query(Swap).count() == 3
+    hashes = {tx_hash(tx) for tx in (1, 2, 3)}
+    assert ProcessedTransaction.get_processed_hashes(db, hashes) == hashes
+
+    position = _position(db, WALLET)
+    assert position.amount == Decimal(6)
+    assert position.trade_count == 2
+    assert float(position.realized_pnl_mon) == pytest.approx(0.2)  # 4 sold at 0.05 above the 0.1 entry
+    assert _position(db, OTHER_WALLET).amount == Decimal(5)
+
+
+def test_batch_skips_processed_transactions(db):
+    events = [swap_event(1, 100, WALLET, 1.0, -10.0), swap_event(2, 101, WALLET, 1.0, -10.0)]
+    process_swap_batch(events, db)
+
+    results = process_swap_batch(events + [swap_event(3, 102, WALLET, 1.0, -10.0)], db)
+
+    assert all(result["success"] for result in results)
+    assert db.query(Swap).count() == 3
+    assert _position(db, WALLET).amount == Decimal(30)
+
+
+def test_batch_matches_single_event_path(db):
+    trades = [(1.0, -10.0), (-0.3, 2.0), (2.0, -4.0), (-3.0, 12.0), (0.5, -1.0)]
+    process_swap_batch([
+        swap_event(index, 100 + index, WALLET, mon, tokens) for index, (mon, tokens) in enumerate(trades)
+    ], db)
+    for index, (mon, tokens) in enumerate(trades):
+        assert process_swap_event(swap_event(100 + index, 100 + index, OTHER_WALLET, mon, tokens), db)
+
+    batch, single = _position(db, WALLET), _position(db, OTHER_WALLET)
+    for field in Position.STATE_FIELDS:
+        assert float(getattr(batch, field)) == pytest.approx(float(getattr(single, field))), field
+
+
+def test_swaps_of_tokens_without_decimals_fail_and_stay_unprocessed(db):
+    pool, token = "0x" + "33" * 20, "0x" + "44" * 20
+    Pool.add_pool(db, pool, MON, token)
+    pool_registry.put(pool, MON, token)
+    token_registry.mark_failed(token)  # decimals() reverted
+    event = {**swap_event(1, 100, WALLET, 1.0, -10.0), "pool": pool}
+
+    results = process_swap_batch([event, swap_event(2, 100, WALLET, 1.0, -10.0, log_index=1)], db)
+
+    assert [result["success"] for result in results] == [False, True]
+    assert not ProcessedTransaction.is_processed(db, event["txHash"])
+    assert _position(db, WALLET, token) is None
+
+
+def test_reorg_rolls_back_orphaned_blocks(db):
+    process_swap_batch([
+        swap_event(1, 100, WALLET, 1.0, -10.0),
+        swap_event(2, 101, WALLET, 2.0, -10.0),
+        swap_event(3, 102, WALLET, -1.0, 5.0),
+        swap_event(4, 102, OTHER_WALLET, 1.0, -10.0, log_index=1),
+    ], db)
+
+    # Block 101 is replaced: its new version has a different hash and trade
+    results = process_swap_batch([swap_event(5, 101, WALLET, 0.5, -2.0, block_hash="0x" + "ff" * 32)], db)
+
+    assert results[0]["success"]
+    position = _position(db, WALLET)
+    assert position.amount == Decimal(12)
+    assert position.trade_count == 2
+    assert float(position.total_cost_mon) == pytest.approx(1.5)
+    assert _position(db, OTHER_WALLET) is None
+    assert sorted(swap.block_number for swap in db.query(Swap).all()) == [100, 101]
+    assert not ProcessedTransaction.is_processed(db, tx_hash(3))
+    assert {delta.block_number for delta in db.query(PositionDelta).all()} == {100, 101}
@@ -0,0 +1,33 @@
+import asyncio
+
+from app.api.rpc_async import async_rpc
+from app.db.models.token import Token
+from app.services.tokens import get_token_decimals_many, prefetch_tokens, token_registry
+
+NEW_TOKEN = "0x" + "44" * 20
+
+
+def test_prefetched_tokens_are_kept_until_stored(db, monkeypatch):
+    calls = []
+    add_tokens_bulk = Token.add_tokens_bulk.__func__
+
+    def flaky(cls, db, tokens):
+        calls.append(dict(tokens))
+        if len(calls) == 1:
+            raise RuntimeError("database is down")
+        return add_tokens_bulk(cls, db, tokens)
+
+    async def get_token_metadata_many(addresses):
+        return {NEW_TOKEN: (6, "USDC")}
+
+    monkeypatch.setattr(Token, "add_tokens_bulk", classmethod(flaky))
+    monkeypatch.setattr(async_rpc, "get_token_metadata_many", get_token_metadata_many)
+    asyncio.run(prefetch_tokens([NEW_TOKEN]))
+
+    assert get_token_decimals_many([NEW_TOKEN], db) == {NEW_TOKEN: 6}
+    assert Token.get_tokens(db, [NEW_TOKEN]) == {}
+
+    get_token_decimals_many([NEW_TOKEN], db)
+    assert Token.get_tokens(db, [NEW_TOKEN])[NEW_TOKEN].decimals == 6
+    assert calls == [{NEW_TOKEN: (6, "USDC")}] * 2
+    assert token_registry.take_unsaved() == {}
@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.api.wallets import parse_csv_wallets, parse_json_wallets
+from app.db.models.wallet import Wallet
+from app.services.kv_sync import wallet_list_sync
+from app.services.wallets import import_wallets, wallet_index
+
+from conftest import WALLET
+
+NEW_WALLET = "0x" + "cc" * 20
+
+
+def test_import_normalizes_deduplicates_and_reports_invalid(db):
+    stats = import_wallets([
+        {"address": NEW_WALLET.upper().replace("0X", "0x"), "twitter_name": "first"},
+        {"address": "not-an-address"},
+        {"address": NEW_WALLET, "twitter_name": "second"},
+        {"address": WALLET},
+    ], db)
+
+    assert stats == {"received": 4, "imported": 2, "new": 1, "invalid": ["not-an-address"]}
+    assert NEW_WALLET in wallet_index
+    assert NEW_WALLET in wallet_list_sync.pending_addresses()
+    assert Wallet.get_wallet(db, NEW_WALLET).twitter_name == "second"
+
+
+def test_reimport_keeps_metadata_the_list_does_not_give(db):
+    import_wallets([{"address": NEW_WALLET, "twitter_name": "alice", "twitter_pfp": "https://pfp/alice"}], db)
+
+    stats = import_wallets([{"address": NEW_WALLET, "twitter_name": "alice2", "twitter_pfp": ""}], db)
+
+    assert stats["new"] == 0
+    db.expire_all()
+    wallet = Wallet.get_wallet(db, NEW_WALLET)
+    assert (wallet.twitter_name, wallet.twitter_pfp) == ("alice2", "https://pfp/alice")
+
+
+def test_wallet_lists_parse_with_and_without_header():
+    assert parse_csv_wallets(f"twitter_name,address\nalice,{NEW_WALLET}\n\n") == [
+        {"address": NEW_WALLET, "twitter_name": "alice"}
+    ]
+    assert parse_csv_wallets(f"{NEW_WALLET},alice") == [
+        {"address": NEW_WALLET, "twitter_name": "alice", "twitter_pfp": None}
+    ]
+    assert parse_json_wallets({"wallets": [NEW_WALLET]}) == [{"address": NEW_WALLET}]
+
+
+def test_export_round_trips_through_import(db):
+    import_wallets([{"address": NEW_WALLET, "twitter_name": "alice", "twitter_pfp": "https://pfp/alice"}], db)
+
+    response = TestClient(app).get("/wallets/bulk", headers={"auth": "test-token"})
+
+    assert response.status_code == 200
+    exported = {entry["address"]: entry for entry in parse_csv_wallets(response.text)}
+    assert len(exported) == 3
+    assert exported[NEW_WALLET]["twitter_name"] == "alice"
+    assert exported[NEW_WALLET]["twitter_pfp"] == "https://pfp/alice"
+    assert exported[WALLET]["twitter_name"] == ""
@@ -0,0 +1,50 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.api import webhook
+from app.api.main import app
+from app.db.models.swap import Swap
+from app.services.ingest_pause import ingest_gate
+from app.services.pools import pool_registry
+
+from conftest import OTHER_WALLET, WALLET, swap_event
+
+AUTH = {"auth": "test-token"}
+
+
+def test_webhook_ingests_a_batch_inline(db):
+    swaps = [swap_event(1, 100, WALLET, 1.0, -10.0), swap_event(2, 100, OTHER_WALLET, 1.0, -10.0, log_index=1)]
+
+    response = TestClient(app).post("/webhook", json={"swaps": swaps}, headers=AUTH)
+
+    assert response.status_code == 200
+    assert (response.json()["successful"], response.json()["errors"]) == (2, 0)
+    assert db.query(Swap).count() == 2
+
+
+def test_webhook_answers_503_while_ingestion_is_paused(db):
+    ingest_gate.set_paused(True)
+    try:
+        response = TestClient(app).post("/webhook", json={"swaps": [swap_event(1, 100, WALLET, 1.0, -10.0)]},
+                                        headers=AUTH)
+    finally:
+        ingest_gate.set_paused(False)
+
+    assert response.status_code == 503
+    assert db.query(Swap).count() == 0
+
+
+def test_partitioned_mode_runs_unresolved_pools_after_the_partitions(db):
+    broken_pool = "0x" + "99" * 20
+    pool_registry.mark_failed(broken_pool)
+    swaps = [
+        swap_event(1, 100, WALLET, 1.0, -10.0),
+        {**swap_event(2, 100, WALLET, 1.0, -10.0, log_index=1), "pool": broken_pool},
+        swap_event(3, 101, OTHER_WALLET, 1.0, -10.0),
+    ]
+
+    results = asyncio.run(webhook.run_partitioned(swaps))
+
+    assert [result["success"] for result in results] == [True, False, True]
+    assert db.query(Swap).count() == 2